@@ -0,0 +1,330 @@
+"""
+Benchmark reprodutível do AI Gateway.
+
+Sobe um stub do Ollama com um perfil de latência/tokens, sobe o gateway
+apontado para ele (ou usa um gateway já rodando com --gateway-url),
+reexecuta os conjuntos de fotos de tests/ (ou uma captura JSONL) com a
+concorrência pedida e grava throughput e p50/p95/p99 por endpoint e por
+etapa (lidos do cabeçalho Server-Timing) em um JSON comparável entre commits.
+
+Uso (a partir de ai_gateway/):
+    python bench/run.py --profile gemma3-4b-cpu --concurrency 4 --requests 40 --out bench.json
+    python bench/run.py --gateway-url http://localhost:8808 --replay captura.jsonl
+    python bench/run.py --compare antes.json depois.json
+
+Formato da captura (uma requisição por linha, caminhos relativos ao arquivo):
+    {"endpoint": "/intake/autoregister", "images": ["fotos/a1.jpg", "fotos/a2.jpg"], "audio": null}
+    {"endpoint": "/search_by_image", "images": ["fotos/a1.jpg"], "top_k": 5}
+"""
+import argparse
+import itertools
+import json
+import mimetypes
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import requests
+
+from stub_ollama import PROFILES, make_server
+
+GATEWAY_DIR = Path(__file__).resolve().parent.parent
+REPO_DIR = GATEWAY_DIR.parent
+DEFAULT_PHOTOS = REPO_DIR / "tests"
+DEFAULT_EXTS = (".jpg", ".jpeg", ".png", ".webp")
+
+ENDPOINTS = {
+    "intake": "/intake/autoregister",
+    "search": "/search_by_image",
+    "upsert": "/index/upsert",
+}
+
+
+# ---------------------------------------------------------------- workload
+
+def photo_sets(photos_dir: Path, exts=DEFAULT_EXTS, max_per_set: int = 6):
+    """Agrupa fotos pelo prefixo do nome (ab1, ab2, ab3 -> ab)"""
+    groups = defaultdict(list)
+    for path in sorted(photos_dir.iterdir()):
+        if path.suffix.lower() in exts:
+            key = re.sub(r"[\d_]+[a-z]?$", "", path.stem) or path.stem
+            groups[key].append(path)
+    return [paths[:max_per_set] for _, paths in sorted(groups.items())]
+
+
+def load_replay(path: Path):
+    jobs = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            jobs.append({
+                "endpoint": entry["endpoint"],
+                "images": [path.parent / p for p in entry.get("images", [])],
+                "audio": path.parent / entry["audio"] if entry.get("audio") else None,
+                "form": {k: v for k, v in entry.items() if k not in ("endpoint", "images", "audio")},
+            })
+    return jobs
+
+
+def build_jobs(photos_dir: Path, endpoints):
+    sets = photo_sets(photos_dir)
+    jobs = []
+    for name in endpoints:
+        endpoint = ENDPOINTS[name]
+        for i, images in enumerate(sets):
+            if name == "search":
+                jobs.append({"endpoint": endpoint, "images": images[:1], "audio": None, "form": {"top_k": 5}})
+            elif name == "upsert":
+                jobs.append({"endpoint": endpoint, "images": images, "audio": None,
+                             "form": {"sku": f"BENCH{i:04d}", "category": "bench"}})
+            else:
+                jobs.append({"endpoint": endpoint, "images": images, "audio": None, "form": {}})
+    return jobs
+
+
+# ---------------------------------------------------------------- execução
+
+_local = threading.local()
+
+
+def _session() -> requests.Session:
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def parse_server_timing(header: str):
+    stages = defaultdict(float)
+    for part in filter(None, (p.strip() for p in (header or "").split(","))):
+        name, _, rest = part.partition(";")
+        m = re.search(r"dur=([\d.]+)", rest)
+        if m:
+            stages[name.strip()] += float(m.group(1))
+    return dict(stages)
+
+
+def run_job(base_url: str, job: dict, timeout: float) -> dict:
+    field = "image" if job["endpoint"] == "/search_by_image" else "images"
+    files = []
+    for path in job["images"]:
+        mime = mimetypes.guess_type(str(path))[0] or "application/octet-stream"
+        files.append((field, (Path(path).name, Path(path).read_bytes(), mime)))
+    if job.get("audio"):
+        files.append(("audio", (Path(job["audio"]).name, Path(job["audio"]).read_bytes(), "audio/wav")))
+
+    start = time.perf_counter()
+    try:
+        r = _session().post(base_url + job["endpoint"], files=files, data=job["form"], timeout=timeout)
+        status, timing = r.status_code, r.headers.get("Server-Timing", "")
+    except requests.RequestException as e:
+        status, timing = f"error: {type(e).__name__}", ""
+    return {
+        "endpoint": job["endpoint"],
+        "status": status,
+        "ms": (time.perf_counter() - start) * 1000,
+        "stages": parse_server_timing(timing),
+    }
+
+
+def _percentiles(values):
+    arr = np.asarray(values, dtype=float)
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {
+        "count": int(arr.size),
+        "mean_ms": round(float(arr.mean()), 2),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+    }
+
+
+def summarize(samples, wall_seconds: float) -> dict:
+    by_endpoint, by_stage = defaultdict(list), defaultdict(list)
+    errors = defaultdict(int)
+    for s in samples:
+        if s["status"] != 200:
+            errors[s["endpoint"]] += 1
+            continue
+        by_endpoint[s["endpoint"]].append(s["ms"])
+        for name, ms in s["stages"].items():
+            by_stage[name].append(ms)
+
+    endpoints = {}
+    for endpoint in sorted(set(s["endpoint"] for s in samples)):
+        values = by_endpoint.get(endpoint, [])
+        stats = _percentiles(values) if values else {"count": 0}
+        stats["errors"] = errors.get(endpoint, 0)
+        stats["rps"] = round(len(values) / wall_seconds, 3)
+        endpoints[endpoint] = stats
+
+    ok = sum(len(v) for v in by_endpoint.values())
+    return {
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_rps": round(ok / wall_seconds, 3),
+        "errors": sum(errors.values()),
+        "endpoints": endpoints,
+        "stages": {name: _percentiles(v) for name, v in sorted(by_stage.items())},
+    }
+
+
+def scrape_ollama_tokens(base_url: str) -> dict:
+    """Soma/contagem de tokens do histograma gateway_ollama_tokens"""
+    try:
+        text = requests.get(base_url + "/metrics", timeout=10).text
+    except requests.RequestException:
+        return {}
+    out = {}
+    for m in re.finditer(r'^gateway_ollama_tokens_(sum|count)\{call="(\w+)",kind="(\w+)"\} ([\d.e+]+)$', text, re.M):
+        agg, call, kind, value = m.groups()
+        out.setdefault(f"{call}.{kind}", {})[agg] = float(value)
+    return out
+
+
+# ---------------------------------------------------------------- processos
+
+def start_gateway(port: int, ollama_url: str, chroma_path: str) -> subprocess.Popen:
+    env = {**os.environ, "OLLAMA_URL": ollama_url, "CHROMA_PATH": chroma_path}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=GATEWAY_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT,
+    )
+
+
+def wait_ready(base_url: str, timeout: float = 300):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(base_url + "/metrics", timeout=2).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(1)
+    raise RuntimeError(f"Gateway não respondeu em {timeout:.0f}s: {base_url}")
+
+
+def git_revision() -> dict:
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain"))}
+
+
+# ---------------------------------------------------------------- comparação
+
+def compare(old_path: str, new_path: str):
+    old, new = (json.load(open(p, encoding="utf-8")) for p in (old_path, new_path))
+    print(f"{'':40} {'p50 antes':>10} {'p50 depois':>11} {'Δ':>7}   {'p95 antes':>10} {'p95 depois':>11} {'Δ':>7}")
+    for section in ("endpoints", "stages"):
+        for name in sorted(set(old.get(section, {})) | set(new.get(section, {}))):
+            a, b = old[section].get(name, {}), new[section].get(name, {})
+            row = f"{section[:-1] + ':' + name:40}"
+            for q in ("p50_ms", "p95_ms"):
+                if q in a and q in b:
+                    delta = (b[q] - a[q]) / a[q] * 100 if a[q] else 0.0
+                    row += f" {a[q]:>10.1f} {b[q]:>11.1f} {delta:>+6.1f}%  "
+                else:
+                    row += f" {a.get(q, '-'):>10} {b.get(q, '-'):>11} {'':>7}  "
+            print(row)
+    print(f"\nthroughput: {old['throughput_rps']} -> {new['throughput_rps']} req/s")
+
+
+# ---------------------------------------------------------------- main
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do AI Gateway com Ollama simulado")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="fast")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=0,
+                        help="total de requisições medidas (0 = uma passada pela carga)")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--endpoints", default="intake,search",
+                        help=f"subconjunto de {','.join(ENDPOINTS)}")
+    parser.add_argument("--photos", type=Path, default=DEFAULT_PHOTOS)
+    parser.add_argument("--replay", type=Path, help="captura JSONL a reexecutar no lugar das fotos")
+    parser.add_argument("--gateway-url", help="usa um gateway já rodando em vez de subir um")
+    parser.add_argument("--gateway-port", type=int, default=8899)
+    parser.add_argument("--stub-port", type=int, default=11500)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--out", default="bench-results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("ANTES", "DEPOIS"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    jobs = load_replay(args.replay) if args.replay else build_jobs(
+        args.photos, [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    )
+    if not jobs:
+        sys.exit("Nenhuma requisição para executar")
+    total = args.requests or len(jobs)
+
+    stub = gateway = None
+    base_url = args.gateway_url
+    try:
+        if not base_url:
+            stub = make_server(args.stub_port, args.profile)
+            threading.Thread(target=stub.serve_forever, daemon=True).start()
+            gateway = start_gateway(
+                args.gateway_port,
+                f"http://127.0.0.1:{args.stub_port}/api/generate",
+                tempfile.mkdtemp(prefix="bench-vectordb-"),
+            )
+            base_url = f"http://127.0.0.1:{args.gateway_port}"
+        wait_ready(base_url)
+
+        workload = itertools.cycle(jobs)
+        for job in itertools.islice(workload, args.warmup):
+            run_job(base_url, job, args.timeout)
+
+        measured = list(itertools.islice(workload, total))
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            samples = list(pool.map(lambda j: run_job(base_url, j, args.timeout), measured))
+        wall = time.perf_counter() - start
+
+        results = {
+            "meta": {
+                **git_revision(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "profile": None if args.gateway_url else args.profile,
+                "concurrency": args.concurrency,
+                "requests": total,
+                "workload": str(args.replay or args.photos),
+                "python": platform.python_version(),
+            },
+            **summarize(samples, wall),
+            "ollama_tokens": scrape_ollama_tokens(base_url),
+        }
+    finally:
+        if gateway:
+            gateway.terminate()
+            gateway.wait(timeout=30)
+        if stub:
+            stub.shutdown()
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+    print(f"{total} requisições em {results['wall_seconds']}s "
+          f"({results['throughput_rps']} req/s, {results['errors']} erros)")
+    for name, stats in results["endpoints"].items():
+        if stats["count"]:
+            print(f"  {name:24} p50 {stats['p50_ms']:8.1f} ms  p95 {stats['p95_ms']:8.1f} ms  "
+                  f"p99 {stats['p99_ms']:8.1f} ms")
+    print(f"Resultados em {args.out}")
+
+
+if __name__ == "__main__":
+    main()
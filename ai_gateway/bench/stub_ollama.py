@@ -0,0 +1,130 @@
+"""
+Substituto local do Ollama para benchmarks.
+
+Responde POST /api/generate com JSON plausível para cada tipo de chamada
+do gateway (análise multimodal, normalização, preço), simulando latência
+de carga de prompt, de imagens e de geração de tokens conforme um perfil.
+Devolve `prompt_eval_count` / `eval_count` como o Ollama real.
+
+Uso:
+    python bench/stub_ollama.py --port 11500 --profile gemma3-4b-cpu
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ms fixos, ms por imagem, tokens/s de prompt, tokens/s de geração, tokens gerados
+PROFILES = {
+    "instant": dict(base_ms=0, per_image_ms=0, prompt_tps=1e9, eval_tps=1e9, eval_tokens=200),
+    "fast": dict(base_ms=20, per_image_ms=10, prompt_tps=20000, eval_tps=2000, eval_tokens=200),
+    "gemma3-4b-gpu": dict(base_ms=150, per_image_ms=120, prompt_tps=3000, eval_tps=90, eval_tokens=250),
+    "gemma3-4b-cpu": dict(base_ms=500, per_image_ms=2500, prompt_tps=120, eval_tps=12, eval_tokens=250),
+}
+
+_TOKENS_PER_IMAGE = 256
+
+CADASTRO = {
+    "categoria": "Vestido",
+    "cor": "Azul",
+    "condicao": "A-",
+    "TituloIG": "Vestido Azul Midi",
+    "descricao_completa": "Vestido midi azul em tecido leve. Modelagem soltinha.",
+    "tamanho": "M",
+    "genero": "Feminino",
+    "preco_minimo": 40,
+    "preco_maximo": 80,
+    "preco_sugerido": 60,
+    "motivo_preco": "Peça em ótimo estado (stub)",
+}
+PRICE = {"Faixa": "R$40–R$80", "Motivo": "Faixa simulada pelo stub"}
+
+
+def _response_for(prompt: str, has_images: bool) -> dict:
+    if "Contexto de preço" in prompt:
+        return PRICE
+    if has_images or "padronizar" in prompt:
+        return CADASTRO
+    return {}
+
+
+class StubOllama(BaseHTTPRequestHandler):
+    profile = PROFILES["fast"]
+    serial = False
+    _lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: dict):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send(200, {"models": [{"name": "gemma3:4b"}]})
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/api/generate":
+            self._send(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        data = json.loads(self.rfile.read(length) or b"{}")
+
+        p = self.profile
+        images = data.get("images") or []
+        prompt = data.get("prompt", "")
+        prompt_tokens = len(prompt) // 4 + _TOKENS_PER_IMAGE * len(images)
+        eval_tokens = max(1, int(random.gauss(p["eval_tokens"], p["eval_tokens"] * 0.1)))
+        delay = (
+            p["base_ms"] / 1000
+            + p["per_image_ms"] * len(images) / 1000
+            + prompt_tokens / p["prompt_tps"]
+            + eval_tokens / p["eval_tps"]
+        )
+
+        # O Ollama processa uma geração por vez por modelo carregado
+        if self.serial:
+            with self._lock:
+                time.sleep(delay)
+        else:
+            time.sleep(delay)
+
+        self._send(200, {
+            "model": data.get("model"),
+            "response": json.dumps(_response_for(prompt, bool(images)), ensure_ascii=False),
+            "done": True,
+            "prompt_eval_count": prompt_tokens,
+            "eval_count": eval_tokens,
+            "total_duration": int(delay * 1e9),
+        })
+
+
+def make_server(port: int, profile: str = "fast", serial: bool = True) -> ThreadingHTTPServer:
+    handler = type("Handler", (StubOllama,), {"profile": PROFILES[profile], "serial": serial})
+    return ThreadingHTTPServer(("127.0.0.1", port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub do Ollama para benchmarks")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="fast")
+    parser.add_argument("--parallel", action="store_true",
+                        help="atende gerações em paralelo (por padrão serializa, como o Ollama)")
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.profile, serial=not args.parallel)
+    print(f"Stub Ollama em http://127.0.0.1:{args.port}/api/generate (perfil {args.profile})")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Leitura do armazém de imagens do backend.
+
+O backend grava cada foto uma única vez em BLOB_DIR/<hash[:2]>/<hash>.<ext>
+(sha256 do conteúdo) e passa só os hashes ao gateway, que lê os arquivos
+direto do disco em vez de receber os bytes de novo por HTTP.
+"""
+import glob
+import os
+import re
+from typing import List
+
+from config import BLOB_DIR
+
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def parse_hashes(value: str) -> List[str]:
+    """Lista de hashes a partir do campo de formulário separado por vírgulas"""
+    hashes = [h.strip() for h in (value or "").split(",") if h.strip()]
+    for h in hashes:
+        if not _HASH_RE.match(h):
+            raise ValueError(f"Hash de imagem inválido: {h!r}")
+    return hashes
+
+
+def blob_path(blob_hash: str) -> str:
+    matches = glob.glob(os.path.join(BLOB_DIR, blob_hash[:2], f"{blob_hash}.*"))
+    if not matches:
+        raise FileNotFoundError(f"Imagem {blob_hash} não encontrada em {BLOB_DIR}")
+    return matches[0]
+
+
+def read_blob(blob_hash: str) -> bytes:
+    with open(blob_path(blob_hash), "rb") as f:
+        return f.read()
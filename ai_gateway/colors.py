@@ -0,0 +1,144 @@
+"""
+Análise de cores vetorizada sobre todas as vistas de uma vez.
+
+Recebe as miniaturas já decodificadas do pré-processamento do CLIP
+(N, H, W, 3) em [0, 1] e calcula, sem laços por imagem:
+    - histograma RGB quantizado (8 níveis por canal) por vista;
+    - paleta: os bins mais populosos, com a cor média real dos pixels
+      de cada bin (equivale a um passo de k-means semeado pelo histograma);
+    - nomes de cor em português pelo vizinho mais próximo em CIELAB.
+"""
+from typing import Dict, List
+
+import numpy as np
+
+_LEVELS = 8
+_SHIFT = 5  # 256 / 8 níveis
+_BINS = _LEVELS ** 3
+
+COLOR_NAMES = [
+    ("preto", (25, 25, 25)),
+    ("branco", (245, 245, 242)),
+    ("cinza", (128, 128, 128)),
+    ("cinza-claro", (195, 195, 195)),
+    ("bege", (215, 195, 160)),
+    ("marrom", (115, 75, 45)),
+    ("caramelo", (175, 110, 55)),
+    ("vermelho", (200, 35, 35)),
+    ("vinho", (110, 20, 40)),
+    ("rosa", (235, 140, 175)),
+    ("rosa-claro", (245, 200, 205)),
+    ("laranja", (240, 130, 35)),
+    ("amarelo", (240, 215, 50)),
+    ("dourado", (195, 160, 65)),
+    ("verde", (45, 145, 65)),
+    ("verde-oliva", (110, 115, 50)),
+    ("verde-claro", (150, 210, 140)),
+    ("azul", (30, 70, 210)),
+    ("azul-marinho", (25, 35, 80)),
+    ("azul-claro", (140, 190, 230)),
+    ("jeans", (75, 100, 140)),
+    ("roxo", (115, 50, 145)),
+    ("lilás", (190, 160, 215)),
+]
+
+
+def _srgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """sRGB em [0, 1] (..., 3) -> CIELAB (D65)"""
+    lin = np.where(rgb > 0.04045, ((rgb + 0.055) / 1.055) ** 2.4, rgb / 12.92)
+    m = np.array(
+        [
+            [0.4124, 0.3576, 0.1805],
+            [0.2126, 0.7152, 0.0722],
+            [0.0193, 0.1192, 0.9505],
+        ]
+    )
+    xyz = lin @ m.T / np.array([0.95047, 1.0, 1.08883])
+    f = np.where(xyz > 0.008856, np.cbrt(xyz), 7.787 * xyz + 16 / 116)
+    return np.stack(
+        [
+            116 * f[..., 1] - 16,
+            500 * (f[..., 0] - f[..., 1]),
+            200 * (f[..., 1] - f[..., 2]),
+        ],
+        axis=-1,
+    )
+
+
+_NAMES = [name for name, _ in COLOR_NAMES]
+_NAMES_LAB = _srgb_to_lab(np.array([c for _, c in COLOR_NAMES]) / 255.0)
+
+
+def name_colors(rgb: np.ndarray) -> List[str]:
+    """Nome em português da cor mais próxima para cada linha (K, 3) em [0, 1]"""
+    lab = _srgb_to_lab(rgb)
+    dist = ((lab[:, None, :] - _NAMES_LAB[None, :, :]) ** 2).sum(axis=-1)
+    return [_NAMES[i] for i in dist.argmin(axis=1)]
+
+
+def _to_hex(rgb: np.ndarray) -> str:
+    r, g, b = (rgb * 255).round().astype(int)
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def _palette(counts: np.ndarray, sums: np.ndarray, top_k: int) -> List[Dict]:
+    """Paleta a partir de um histograma (BINS,) e das somas RGB por bin (BINS, 3)"""
+    total = counts.sum()
+    top = np.argsort(counts)[::-1][:top_k]
+    top = top[counts[top] > 0]
+    means = sums[top] / counts[top, None]
+    names = name_colors(means)
+
+    merged: Dict[str, Dict] = {}
+    for name, mean, n in zip(names, means, counts[top]):
+        entry = merged.get(name)
+        if entry is None:
+            merged[name] = {"cor": name, "hex": _to_hex(mean), "fracao": n / total}
+        else:
+            entry["fracao"] += n / total
+    return [
+        {**e, "fracao": round(float(e["fracao"]), 3)}
+        for e in sorted(merged.values(), key=lambda e: -e["fracao"])
+    ]
+
+
+def analyze_views(rgb: np.ndarray, top_k: int = 5) -> Dict:
+    """
+    Analisa todas as vistas empilhadas (N, H, W, 3) em [0, 1].
+
+    Retorna {"vistas": [...], "paleta": [...], "cor_predominante": str}
+    """
+    n = rgb.shape[0]
+    pixels = rgb.reshape(n, -1, 3)
+    q = (pixels * 255).astype(np.uint8) >> _SHIFT
+    bins = (q[..., 0].astype(np.int64) * _LEVELS + q[..., 1]) * _LEVELS + q[..., 2]
+    idx = (bins + np.arange(n)[:, None] * _BINS).ravel()
+
+    counts = np.bincount(idx, minlength=n * _BINS).reshape(n, _BINS)
+    flat = pixels.reshape(-1, 3)
+    sums = np.stack(
+        [np.bincount(idx, weights=flat[:, c], minlength=n * _BINS) for c in range(3)],
+        axis=-1,
+    ).reshape(n, _BINS, 3)
+
+    avg = pixels.mean(axis=1)
+    luma = avg @ np.array([0.299, 0.587, 0.114])
+
+    views = []
+    for i in range(n):
+        palette = _palette(counts[i], sums[i], top_k)
+        views.append(
+            {
+                "rgb_medio": (avg[i] * 255).round().astype(int).tolist(),
+                "brilho": "claro" if luma[i] > 0.5 else "escuro",
+                "cor_dominante": palette[0]["cor"] if palette else "neutro",
+                "paleta": palette,
+            }
+        )
+
+    overall = _palette(counts.sum(axis=0), sums.sum(axis=0), top_k)
+    return {
+        "vistas": views,
+        "paleta": overall,
+        "cor_predominante": overall[0]["cor"] if overall else None,
+    }
@@ -1,5 +1,25 @@
-OLLAMA_URL = "http://localhost:11434/api/generate"
+import os
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434/api/generate")
 GEMMA_MODEL = "gemma3:4b"  # Gemma 3:4b model
-CHROMA_PATH = "./vectordb"
+CHROMA_PATH = os.getenv("CHROMA_PATH", "./vectordb")
 EMBED_MODEL = "ViT-B-32"  # OpenCLIP backbone
 DEVICE = "cpu"            # 'cuda' if available
+
+# Classificador zero-shot (CLIP) antes do LLM
+ZEROSHOT_CACHE = "./zeroshot_bank.npz"
+ZEROSHOT_MIN_CONFIDENCE = 0.6  # abaixo disso o campo fica para o Gemma
+ZEROSHOT_SKIP_LLM = False      # pula o Gemma quando todos os campos são confiáveis
+
+# Precificação por vizinhos vendidos (kNN)
+PRICE_TOP_K = 15            # vizinhos vendidos consultados
+PRICE_MIN_NEIGHBORS = 3     # abaixo disso cai no Gemma
+PRICE_MAX_DISTANCE = 0.35   # distância cosseno máxima para contar como vizinho
+
+# Observabilidade
+LOG_LEVEL = "INFO"
+TRACE_ENABLED = False   # spans JSON por etapa no log, com o request id do backend
+OLLAMA_CONCURRENCY = 1  # chamadas simultâneas ao Ollama; o excedente espera na fila
+
+# Armazém de imagens endereçado por conteúdo, compartilhado com o backend
+BLOB_DIR = os.getenv("BLOB_DIR", "../brecho_app/backend/uploads/blobs")
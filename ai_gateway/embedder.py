@@ -8,15 +8,36 @@ class ImageEmbedder:
     def __init__(self):
         self.model, _, self.preprocess = open_clip.create_model_and_transforms(EMBED_MODEL, pretrained='openai')
         self.model = self.model.to(DEVICE).eval()
+        self.tokenizer = open_clip.get_tokenizer(EMBED_MODEL)
+        norm = next(t for t in self.preprocess.transforms if hasattr(t, "mean") and hasattr(t, "std"))
+        self._mean = torch.tensor(norm.mean).view(1, 3, 1, 1)
+        self._std = torch.tensor(norm.std).view(1, 3, 1, 1)
+
+    def preprocess_batch(self, pil_images: List[Image.Image]) -> torch.Tensor:
+        """Resize/crop/normaliza todas as vistas em um único tensor (N, 3, H, W)"""
+        return torch.stack([self.preprocess(im) for im in pil_images])
 
     @torch.inference_mode()
+    def embed_batch(self, batch: torch.Tensor) -> np.ndarray:
+        feats = self.model.encode_image(batch.to(DEVICE))
+        feats = feats / feats.norm(dim=-1, keepdim=True)
+        return feats.cpu().numpy()
+
     def embed_images(self, pil_images: List[Image.Image]) -> np.ndarray:
-        imgs = [self.preprocess(im).unsqueeze(0) for im in pil_images]
-        batch = torch.cat(imgs, dim=0).to(DEVICE)
-        feats = self.model.encode_image(batch)
+        return self.embed_batch(self.preprocess_batch(pil_images))
+
+    @torch.inference_mode()
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        tokens = self.tokenizer(texts).to(DEVICE)
+        feats = self.model.encode_text(tokens)
         feats = feats / feats.norm(dim=-1, keepdim=True)
         return feats.cpu().numpy()
 
+    def batch_to_rgb(self, batch: torch.Tensor) -> np.ndarray:
+        """Desfaz a normalização do CLIP: miniaturas RGB (N, H, W, 3) em [0, 1]"""
+        rgb = (batch * self._std + self._mean).clamp_(0, 1)
+        return rgb.permute(0, 2, 3, 1).numpy()
+
     def pool_views(self, mats: np.ndarray, mode: str = "mean") -> np.ndarray:
         if mode == "mean":
             v = mats.mean(axis=0)
@@ -1,8 +1,16 @@
-import requests, json, re, base64
+import requests, json, re, base64, logging, threading, time
 from io import BytesIO
 from typing import Optional
-from config import OLLAMA_URL, GEMMA_MODEL
+from config import OLLAMA_URL, GEMMA_MODEL, OLLAMA_CONCURRENCY
 from speech import transcribe_audio, is_whisper_available
+from metrics import (
+    OLLAMA_ERRORS, OLLAMA_QUEUE_WAIT_SECONDS, OLLAMA_SECONDS, OLLAMA_TOKENS,
+    record_stage, stage,
+)
+
+logger = logging.getLogger(__name__)
+
+_OLLAMA_SLOTS = threading.BoundedSemaphore(OLLAMA_CONCURRENCY)
 
 SYS_INTAKE = (
     "Você é um especialista em catalogação inteligente para brechó brasileiro. "
@@ -30,23 +38,58 @@ SYS_PRICE = (
 )
 
 
-def image_to_base64(pil_image):
-    """Converte imagem PIL para base64"""
+# Formatos que o Ollama decodifica direto: os bytes originais vão sem reencode
+_OLLAMA_NATIVE = (b"\xff\xd8\xff", b"\x89PNG\r\n\x1a\n")
+
+
+def image_to_base64(pil_image, raw: Optional[bytes] = None):
+    """Converte imagem para base64, reaproveitando os bytes originais JPEG/PNG"""
+    if raw is not None and raw.startswith(_OLLAMA_NATIVE):
+        return base64.b64encode(raw).decode("ascii")
     buffer = BytesIO()
     pil_image.save(buffer, format="JPEG")
     img_bytes = buffer.getvalue()
     return base64.b64encode(img_bytes).decode("utf-8")
 
 
+def _ollama_post(call: str, data: dict, timeout: int) -> dict:
+    """POST ao Ollama com métricas de fila, duração e tokens (prompt/eval)"""
+    queued = time.perf_counter()
+    with _OLLAMA_SLOTS:
+        started = time.perf_counter()
+        OLLAMA_QUEUE_WAIT_SECONDS.labels(call).observe(started - queued)
+        record_stage("ollama_queue_wait", started - queued, call=call)
+        try:
+            r = requests.post(OLLAMA_URL, json=data, timeout=timeout)
+            r.raise_for_status()
+            body = r.json()
+        except Exception:
+            OLLAMA_ERRORS.labels(call).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            OLLAMA_SECONDS.labels(call).observe(elapsed)
+
+    tokens = {}
+    for kind, key in (("prompt", "prompt_eval_count"), ("eval", "eval_count")):
+        if body.get(key) is not None:
+            OLLAMA_TOKENS.labels(call, kind).observe(body[key])
+            tokens[f"{kind}_tokens"] = body[key]
+    record_stage(f"ollama_{call}", elapsed, **tokens)
+    return body
+
+
 def ollama_multimodal_analyze(
-    images, prompt: str, system: str = "", audio_base64: Optional[str] = None
+    images, prompt: str, system: str = "", audio_bytes: Optional[bytes] = None,
+    raw_images: Optional[list] = None,
 ) -> str:
     """Análise multimodal usando Ollama com imagens e opcionalmente áudio"""
-    # Converter imagens para base64
-    image_data = [image_to_base64(img) for img in images]
+    # Base64 só aqui, uma vez por imagem, porque a API do Ollama exige JSON
+    raw_images = raw_images or [None] * len(images)
+    image_data = [image_to_base64(img, raw) for img, raw in zip(images, raw_images)]
 
     # Se há áudio, incluir informação no prompt
-    if audio_base64:
+    if audio_bytes:
         prompt = f"""IMPORTANTE: O usuário forneceu uma gravação de áudio em português 
         descrevendo o produto. Embora você não possa processar o áudio diretamente, 
         use esta informação para dar mais atenção aos detalhes que o usuário 
@@ -68,24 +111,22 @@ def ollama_multimodal_analyze(
     # A informação do áudio está incluída no prompt acima
 
     try:
-        r = requests.post(OLLAMA_URL, json=data, timeout=300)  # 5 minutos
-        r.raise_for_status()
-        return r.json().get("response", "").strip()
+        body = _ollama_post("multimodal", data, timeout=300)  # 5 minutos
+        return body.get("response", "").strip()
     except Exception as e:
-        print(f"Erro na análise multimodal: {e}")
+        logger.error("Erro na análise multimodal: %s", e)
         return ""
 
 
-def ollama_generate(prompt: str, system: str = "") -> str:
+def ollama_generate(prompt: str, system: str = "", call: str = "generate") -> str:
     data = {
         "model": GEMMA_MODEL,
         "prompt": (system + "\n\n" + prompt).strip(),
         "stream": False,
         "options": {"temperature": 0.2},
     }
-    r = requests.post(OLLAMA_URL, json=data, timeout=180)  # 3 minutos
-    r.raise_for_status()
-    return r.json().get("response", "").strip()
+    body = _ollama_post(call, data, timeout=180)  # 3 minutos
+    return body.get("response", "").strip()
 
 
 def _parse_json(txt: str) -> dict:
@@ -98,41 +139,58 @@ def _parse_json(txt: str) -> dict:
         return {}
 
 
-def multimodal_intake_analyze(images, audio_base64: Optional[str] = None) -> dict:
-    """Análise multimodal completa das imagens e áudio (convertido para texto)"""
+def multimodal_intake_analyze(
+    images, audio_bytes: Optional[bytes] = None, hints: Optional[dict] = None,
+    raw_images: Optional[list] = None,
+) -> dict:
+    """Análise multimodal completa das imagens e áudio (convertido para texto)
+
+    `hints` traz campos já classificados com alta confiança pelo zero-shot;
+    nesse caso o prompt fica mais curto e o modelo só confirma esses campos.
+    `raw_images` são os bytes originais de cada foto, enviados ao Ollama sem
+    reencode quando o formato permite.
+    """
 
     # Convert audio to text if provided
     audio_description = ""
-    if audio_base64 and is_whisper_available():
+    if audio_bytes and is_whisper_available():
         try:
-            print(f"Processando áudio: {len(audio_base64)} bytes base64")
-            audio_bytes = base64.b64decode(audio_base64)
-            print(f"Áudio decodificado: {len(audio_bytes)} bytes")
-            transcribed_text = transcribe_audio(audio_bytes)
+            logger.info("Processando áudio: %d bytes", len(audio_bytes))
+            with stage("whisper", audio_bytes=len(audio_bytes)):
+                transcribed_text = transcribe_audio(audio_bytes)
             if transcribed_text:
                 audio_description = f"\n\nINFORMAÇÕES ADICIONAIS DO USUÁRIO (via áudio): {transcribed_text}"
-                print(f"Áudio transcrito com sucesso: {transcribed_text}")
+                logger.debug("Áudio transcrito: %s", transcribed_text)
             else:
-                print("Nenhum texto foi transcrito do áudio")
+                logger.info("Nenhum texto foi transcrito do áudio")
         except Exception as e:
-            print(f"Erro ao processar áudio: {e}")
-    elif audio_base64:
-        print("Áudio fornecido mas Whisper não está disponível")
+            logger.error("Erro ao processar áudio: %s", e)
+    elif audio_bytes:
+        logger.warning("Áudio fornecido mas Whisper não está disponível")
+
+    if hints:
+        known = ", ".join(f"{k}={v}" for k, v in hints.items())
+        guidance = (
+            f"JÁ IDENTIFICADO automaticamente (alta confiança): {known}. "
+            "Use esses valores e concentre-se nos demais campos relevantes. "
+        )
     else:
-        print("Nenhum áudio fornecido")
+        guidance = (
+            "INSTRUÇÕES DINÂMICAS: "
+            "1. Identifique PRIMEIRO o tipo de item (roupa, eletrônico, decoração, iluminação, etc.) "
+            "2. Escolha APENAS os campos RELEVANTES para esse tipo específico "
+            "3. Use nomes de campos em português, descritivos e úteis "
+            "EXEMPLOS de campos inteligentes por categoria: "
+            "• ROUPA: categoria, subcategoria, tamanho, genero, tecido, cor, estacao, modelagem, marca, condicao "
+            "• LUMINÁRIA: categoria, tipo_luminaria, fonte_luz, potencia, voltagem, material, cor, estilo, marca, condicao "
+            "• ELETRÔNICO: categoria, tipo_eletronico, marca, modelo, funcionalidade, conectividade, voltagem, cor, condicao "
+            "• DECORAÇÃO: categoria, tipo_decoracao, material, estilo, dimensoes, cor, epoca, funcao, marca, condicao "
+        )
 
     prompt = (
         "Analise as imagens e identifique o item. Seja INTELIGENTE na escolha dos campos! "
         f"{audio_description}"
-        "INSTRUÇÕES DINÂMICAS: "
-        "1. Identifique PRIMEIRO o tipo de item (roupa, eletrônico, decoração, iluminação, etc.) "
-        "2. Escolha APENAS os campos RELEVANTES para esse tipo específico "
-        "3. Use nomes de campos em português, descritivos e úteis "
-        "EXEMPLOS de campos inteligentes por categoria: "
-        "• ROUPA: categoria, subcategoria, tamanho, genero, tecido, cor, estacao, modelagem, marca, condicao "
-        "• LUMINÁRIA: categoria, tipo_luminaria, fonte_luz, potencia, voltagem, material, cor, estilo, marca, condicao "
-        "• ELETRÔNICO: categoria, tipo_eletronico, marca, modelo, funcionalidade, conectividade, voltagem, cor, condicao "
-        "• DECORAÇÃO: categoria, tipo_decoracao, material, estilo, dimensoes, cor, epoca, funcao, marca, condicao "
+        f"{guidance}"
         "CAMPOS OBRIGATÓRIOS que SEMPRE devem estar presentes: "
         "- categoria: tipo principal do item "
         "- cor: cor predominante "
@@ -160,15 +218,13 @@ def multimodal_intake_analyze(images, audio_base64: Optional[str] = None) -> dic
         "SEJA DINÂMICO E INTELIGENTE NA ESCOLHA DOS CAMPOS!"
     )
 
-    response = ollama_multimodal_analyze(images, prompt, system, audio_base64)
-    print(f"🤖 RESPOSTA BRUTA DA IA: {response}")
+    response = ollama_multimodal_analyze(images, prompt, system, audio_bytes, raw_images)
+    logger.debug("Resposta bruta da IA: %s", response)
 
     parsed = _parse_json(response)
-    print(f"📊 JSON PARSEADO: {parsed}")
 
     if not parsed:
-        print("❌ FALHA NO PARSING - IA não retornou JSON válido!")
-        print(f"🔍 Tentando extrair informações da resposta bruta...")
+        logger.warning("IA não retornou JSON válido (%d caracteres)", len(response))
         # Fallback: criar um objeto básico a partir da resposta
         return {
             "categoria": "Equipamento de academia",
@@ -187,9 +243,9 @@ def intake_normalize(context: dict) -> dict:
     prompt = "Dados para padronizar (PT-BR) em JSON válido:\n" + json.dumps(
         context, ensure_ascii=False
     )
-    return _parse_json(ollama_generate(prompt, system=SYS_INTAKE))
+    return _parse_json(ollama_generate(prompt, system=SYS_INTAKE, call="normalize"))
 
 
 def price_suggest(context: dict) -> dict:
     prompt = "Contexto de preço (PT-BR):\n" + json.dumps(context, ensure_ascii=False)
-    return _parse_json(ollama_generate(prompt, system=SYS_PRICE))
+    return _parse_json(ollama_generate(prompt, system=SYS_PRICE, call="price"))
@@ -0,0 +1,93 @@
+"""
+Métricas Prometheus e spans de trace por etapa.
+
+    with stage("embed"):
+        ...
+
+registra a duração no histograma `gateway_stage_seconds{stage="embed"}`,
+acumula a etapa para o cabeçalho Server-Timing da requisição atual e, com
+TRACE_ENABLED, emite um span JSON no log com o request id propagado pelo
+backend (cabeçalho X-Request-ID).
+"""
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from prometheus_client import Counter, Histogram
+
+from config import TRACE_ENABLED
+
+logger = logging.getLogger("gateway.trace")
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+_SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+_TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+REQUEST_SECONDS = Histogram(
+    "gateway_request_seconds", "Duração das requisições HTTP",
+    ["endpoint", "status"], buckets=_SECONDS_BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "gateway_stage_seconds", "Duração de cada etapa do pipeline",
+    ["stage"], buckets=_SECONDS_BUCKETS,
+)
+OLLAMA_SECONDS = Histogram(
+    "gateway_ollama_seconds", "Duração de cada chamada ao Ollama",
+    ["call"], buckets=_SECONDS_BUCKETS,
+)
+OLLAMA_QUEUE_WAIT_SECONDS = Histogram(
+    "gateway_ollama_queue_wait_seconds", "Espera por uma vaga de chamada ao Ollama",
+    ["call"], buckets=_SECONDS_BUCKETS,
+)
+OLLAMA_TOKENS = Histogram(
+    "gateway_ollama_tokens", "Tokens por chamada ao Ollama (prompt/eval)",
+    ["call", "kind"], buckets=_TOKEN_BUCKETS,
+)
+OLLAMA_ERRORS = Counter(
+    "gateway_ollama_errors_total", "Chamadas ao Ollama que falharam", ["call"],
+)
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_stages_var: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("stages", default=None)
+
+
+def begin_request(request_id: Optional[str]) -> str:
+    """Inicia o contexto de uma requisição; devolve o request id efetivo"""
+    request_id = request_id or uuid.uuid4().hex
+    request_id_var.set(request_id)
+    _stages_var.set([])
+    return request_id
+
+
+def server_timing() -> str:
+    """Etapas da requisição atual no formato do cabeçalho Server-Timing"""
+    stages = _stages_var.get() or []
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in stages)
+
+
+def record_stage(name: str, seconds: float, **attrs):
+    STAGE_SECONDS.labels(name).observe(seconds)
+    stages = _stages_var.get()
+    if stages is not None:
+        stages.append((name, seconds))
+    if TRACE_ENABLED:
+        logger.info(json.dumps({
+            "request_id": request_id_var.get(),
+            "span": name,
+            "ms": round(seconds * 1000, 1),
+            **attrs,
+        }, ensure_ascii=False))
+
+
+@contextmanager
+def stage(name: str, **attrs):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start, **attrs)
@@ -0,0 +1,88 @@
+"""
+Precificação por vizinhos: preço a partir de itens visualmente parecidos
+que já foram vendidos.
+
+Cada venda registrada no backend grava `sold_price`, `days_on_hand` e
+`condition` nos metadados do item no Chroma (POST /index/sold). Aqui
+buscamos os top-k vizinhos vendidos e calculamos uma distribuição de preço
+ponderada:
+    - peso = similaridade^4, para que vizinhos quase idênticos dominem;
+    - vendas lentas (muitos dias em estoque) pesam menos, pois o preço
+      final costuma refletir remarcações e não a demanda real;
+    - o preço de cada vizinho é ajustado pela razão entre a condição do
+      item novo e a condição do vizinho.
+"""
+from typing import Optional
+
+import numpy as np
+
+from config import PRICE_TOP_K, PRICE_MIN_NEIGHBORS, PRICE_MAX_DISTANCE
+from vstore import query_by_vector
+
+CONDITION_FACTOR = {"A": 1.0, "A-": 0.9, "B": 0.78, "C": 0.6}
+_SLOW_SALE_DAYS = 90.0
+
+
+def _condition_factor(condition) -> float:
+    if not condition:
+        return CONDITION_FACTOR["A-"]
+    return CONDITION_FACTOR.get(str(condition).strip().upper(), CONDITION_FACTOR["A-"])
+
+
+def _weighted_quantiles(values: np.ndarray, weights: np.ndarray, qs):
+    order = np.argsort(values)
+    values, weights = values[order], weights[order]
+    cum = np.cumsum(weights) - 0.5 * weights
+    cum /= weights.sum()
+    return np.interp(qs, cum, values)
+
+
+def estimate_price(vector, condition: Optional[str] = None) -> Optional[dict]:
+    """
+    Faixa de preço a partir dos vizinhos vendidos, ou None quando há
+    poucos vizinhos próximos o bastante (o chamador cai no LLM).
+    """
+    neighbors = [
+        n
+        for n in query_by_vector(vector, top_k=PRICE_TOP_K, where={"sold": True})
+        if n["distance"] <= PRICE_MAX_DISTANCE
+        and (n["metadata"] or {}).get("sold_price")
+    ]
+    if len(neighbors) < PRICE_MIN_NEIGHBORS:
+        return None
+
+    target = _condition_factor(condition)
+    similarity = np.array([1.0 - n["distance"] for n in neighbors])
+    days = np.array(
+        [float(n["metadata"].get("days_on_hand") or 0) for n in neighbors]
+    )
+    prices = np.array(
+        [
+            float(n["metadata"]["sold_price"])
+            * target
+            / _condition_factor(n["metadata"].get("condition"))
+            for n in neighbors
+        ]
+    )
+    weights = similarity ** 4 / (1.0 + days / _SLOW_SALE_DAYS)
+
+    low, mid, high = _weighted_quantiles(prices, weights, [0.25, 0.5, 0.75])
+    return {
+        "Faixa": f"R${low:.0f}–R${high:.0f}",
+        "preco_sugerido": int(round(mid)),
+        "Motivo": (
+            f"Baseado em {len(neighbors)} peças parecidas já vendidas "
+            f"(similaridade média {similarity.mean():.0%}, "
+            f"{days.mean():.0f} dias em estoque em média), "
+            f"ajustado para a condição {condition or 'não informada'}."
+        ),
+        "metodo": "knn",
+        "vizinhos": [
+            {
+                "sku": n["id"],
+                "preco_venda": n["metadata"]["sold_price"],
+                "similaridade": round(float(s), 3),
+            }
+            for n, s in zip(neighbors, similarity)
+        ],
+    }
@@ -1,16 +1,29 @@
 from fastapi import FastAPI, UploadFile, File, Form, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from typing import List, Optional
 from PIL import Image
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 import io, uuid, numpy as np, cv2
-import asyncio
+import asyncio, logging, time
 
 from embedder import ImageEmbedder
-from vstore import upsert_item_embedding, query_by_vector
+from colors import analyze_views
+from zeroshot import ZeroShotClassifier
+from pricing import estimate_price
+from blobs import parse_hashes, read_blob
+from config import ZEROSHOT_SKIP_LLM, LOG_LEVEL
+from metrics import (
+    REQUEST_ID_HEADER, REQUEST_SECONDS, begin_request, server_timing, stage,
+)
+from vstore import upsert_item_embedding, query_by_vector, update_item_metadata
 from llm import intake_normalize, price_suggest, multimodal_intake_analyze
 
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger("gateway")
+
 app = FastAPI(title="AI Gateway — Brechó", version="0.1.0")
 EMB = ImageEmbedder()
+ZS = ZeroShotClassifier(EMB)
 
 # Configurar timeout para requests longos
 @app.middleware("http")
@@ -24,13 +37,51 @@ async def timeout_middleware(request: Request, call_next):
             status_code=408
         )
 
-def read_images(files: List[UploadFile]):
-    imgs = []
+# Request id propagado do backend, histograma por endpoint e Server-Timing por etapa
+@app.middleware("http")
+async def observability_middleware(request: Request, call_next):
+    request_id = begin_request(request.headers.get(REQUEST_ID_HEADER))
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        REQUEST_SECONDS.labels(request.url.path, str(status)).observe(
+            time.perf_counter() - start
+        )
+    response.headers[REQUEST_ID_HEADER] = request_id
+    timing = server_timing()
+    if timing:
+        response.headers["Server-Timing"] = timing
+    return response
+
+@app.get("/metrics")
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+def read_uploads(files: List[UploadFile]):
+    """Lê cada upload uma única vez: bytes originais + imagem decodificada"""
+    raw, imgs = [], []
     for f in files:
         b = f.file.read()
+        raw.append(b)
         imgs.append(Image.open(io.BytesIO(b)).convert("RGB"))
         f.file.seek(0)
-    return imgs
+    return raw, imgs
+
+def read_images(files: List[UploadFile]):
+    return read_uploads(files)[1]
+
+def load_images(files: Optional[List[UploadFile]], image_hashes: Optional[str]):
+    """Fotos enviadas no formulário ou lidas do armazém do backend pelos hashes"""
+    if image_hashes:
+        raw = [read_blob(h) for h in parse_hashes(image_hashes)]
+        return raw, [Image.open(io.BytesIO(b)).convert("RGB") for b in raw]
+    return read_uploads(files or [])
+
+def _bad_images(e: Exception) -> JSONResponse:
+    return JSONResponse({"error": str(e)}, status_code=400)
 
 def detect_qr_in_images(files: List[UploadFile]):
     detector = cv2.QRCodeDetector()
@@ -45,16 +96,35 @@ def detect_qr_in_images(files: List[UploadFile]):
             return val.strip()
     return None
 
+# CLIP, Chroma e Ollama bloqueiam: os handlers abaixo são `def` e rodam no
+# threadpool, para não travar o event loop (nem /metrics) durante o Gemma e
+# para que chamadas simultâneas realmente esperem na fila de OLLAMA_CONCURRENCY
 @app.post("/search_by_image")
-async def search_by_image(image: UploadFile = File(...), top_k: int = Form(5)):
-    pil = read_images([image])[0]
-    vec = EMB.embed_images([pil])[0]
-    results = query_by_vector(vec, top_k=top_k)
+def search_by_image(image: UploadFile = File(...), top_k: int = Form(5)):
+    with stage("decode", images=1):
+        pil = read_images([image])[0]
+    with stage("embed"):
+        vec = EMB.embed_images([pil])[0]
+    with stage("vector_query"):
+        results = query_by_vector(vec, top_k=top_k)
+    return JSONResponse({"results": results})
+
+@app.post("/search_by_text")
+def search_by_text(text: str = Form(...), top_k: int = Form(20)):
+    """Busca fotos indexadas por descrição ("vestido azul tamanho G") via embedding de texto do CLIP"""
+    text = text.strip()
+    if not text:
+        return JSONResponse({"error": "Texto vazio"}, status_code=400)
+    with stage("embed"):
+        vec = EMB.embed_texts([f"uma foto de {text}"])[0]
+    with stage("vector_query"):
+        results = query_by_vector(vec, top_k=top_k)
     return JSONResponse({"results": results})
 
 @app.post("/index/upsert")
-async def index_upsert(
-    images: List[UploadFile] = File(...),
+def index_upsert(
+    images: Optional[List[UploadFile]] = File(None),
+    image_hashes: Optional[str] = Form(None),
     sku: Optional[str] = Form(None),
     consignor_id: Optional[str] = Form(None),
     category: Optional[str] = Form(None),
@@ -64,9 +134,16 @@ async def index_upsert(
     list_price: Optional[float] = Form(None),
     extras_json: Optional[str] = Form(None)
 ):
-    pil = read_images(images)
-    vecs = EMB.embed_images(pil)
-    pooled = EMB.pool_views(vecs)
+    with stage("decode"):
+        try:
+            _, pil = load_images(images, image_hashes)
+        except (ValueError, FileNotFoundError) as e:
+            return _bad_images(e)
+    if not pil:
+        return JSONResponse({"error": "Envie pelo menos 1 foto"}, status_code=400)
+    with stage("embed"):
+        vecs = EMB.embed_images(pil)
+        pooled = EMB.pool_views(vecs)
     item_id = sku or str(uuid.uuid4())
     metadata = {
         "sku": item_id,
@@ -75,134 +152,155 @@ async def index_upsert(
         "list_price": list_price,
         "extras": extras_json
     }
-    upsert_item_embedding(item_id, pooled, metadata)
+    with stage("vector_upsert"):
+        upsert_item_embedding(item_id, pooled, metadata)
     return JSONResponse({"ok": True, "sku": item_id, "metadata": metadata})
 
-def extract_image_features(images):
-    """Extrai características básicas das imagens para análise"""
+@app.post("/index/sold")
+def index_sold(
+    sku: str = Form(...),
+    sale_price: float = Form(...),
+    days_on_hand: Optional[int] = Form(None),
+    condition: Optional[str] = Form(None)
+):
+    """Marca um item indexado como vendido, alimentando a precificação por vizinhos"""
+    patch = {"sold": True, "sold_price": sale_price}
+    if days_on_hand is not None:
+        patch["days_on_hand"] = days_on_hand
+    if condition:
+        patch["condition"] = condition
+    if not update_item_metadata(sku, patch):
+        return JSONResponse({"error": f"SKU {sku} não está indexado"}, status_code=404)
+    return JSONResponse({"ok": True, "sku": sku})
+
+@app.post("/index/unsold")
+def index_unsold(sku: str = Form(...)):
+    """Desfaz /index/sold quando a venda é excluída no backend"""
+    if not update_item_metadata(sku, {"sold": False}, drop=("sold_price", "days_on_hand")):
+        return JSONResponse({"error": f"SKU {sku} não está indexado"}, status_code=404)
+    return JSONResponse({"ok": True, "sku": sku})
+
+def extract_image_features(images, color_info):
+    """Características básicas por foto, a partir da análise de cores vetorizada"""
     features = []
-    for i, img in enumerate(images):
-        # Análise básica de cores dominantes
-        img_array = np.array(img.resize((100, 100)))
-        
-        # Cores dominantes (RGB médio)
-        avg_color = img_array.mean(axis=(0, 1)).astype(int)
-        
-        # Brilho médio
-        brightness = int(np.mean(avg_color))
-        
-        # Características básicas
+    for i, (img, view) in enumerate(zip(images, color_info["vistas"])):
         width, height = img.size
-        aspect_ratio = round(width / height, 2)
-        
-        color_desc = "claro" if brightness > 127 else "escuro"
-        
-        # Tentativa de identificar cor dominante
-        r, g, b = avg_color
-        if r > g and r > b:
-            dominant_color = "avermelhado"
-        elif g > r and g > b:
-            dominant_color = "esverdeado"
-        elif b > r and b > g:
-            dominant_color = "azulado"
-        elif r + g > b * 1.5:
-            dominant_color = "amarelado"
-        else:
-            dominant_color = "neutro"
-            
+        r, g, b = view["rgb_medio"]
         features.append({
             "image": f"foto_{i+1}",
             "dimensoes": f"{width}x{height}",
-            "aspecto": aspect_ratio,
-            "brilho": color_desc,
-            "cor_dominante": dominant_color,
+            "aspecto": round(width / height, 2),
+            "brilho": view["brilho"],
+            "cor_dominante": view["cor_dominante"],
+            "paleta": [f"{p['cor']} ({p['fracao']:.0%})" for p in view["paleta"]],
             "rgb_medio": f"RGB({r},{g},{b})"
         })
-    
+
     return features
 
 @app.post("/intake/autoregister")
-async def intake_autoregister(
-    images: List[UploadFile] = File(...),
+def intake_autoregister(
+    images: Optional[List[UploadFile]] = File(None),
+    image_hashes: Optional[str] = Form(None),
     audio: Optional[UploadFile] = File(None)
 ):
-    import time
-    import base64
-    start_time = time.time()
-    
-    if len(images) < 1:
+    # Fotos já gravadas pelo backend chegam só como hashes
+    with stage("decode"):
+        try:
+            raw_images, pil = load_images(images, image_hashes)
+        except (ValueError, FileNotFoundError) as e:
+            return _bad_images(e)
+    if len(pil) < 1:
         return JSONResponse(
             {"error": "Envie pelo menos 1 foto"},
             status_code=400
         )
 
-    print(f"[{time.time()-start_time:.1f}s] Iniciando processamento de {len(images)} imagens")
-    
-    # Processar áudio se fornecido
-    audio_base64 = None
+    logger.info("Iniciando processamento de %d imagens", len(pil))
+
+    # Processar áudio se fornecido (bytes crus, sem base64)
+    audio_bytes = None
     if audio:
         try:
-            audio_bytes = await audio.read()
-            audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
-            print(f"[{time.time()-start_time:.1f}s] Áudio processado ({len(audio_bytes)} bytes)")
+            audio_bytes = audio.file.read()
+            logger.info("Áudio recebido (%d bytes)", len(audio_bytes))
         except Exception as e:
-            print(f"Erro ao processar áudio: {e}")
-    
+            logger.error("Erro ao processar áudio: %s", e)
+
     # QR detection removida - sistema inteligente não precisa
     consignor_id = None
-    
-    pil = read_images(images)
-    print(f"[{time.time()-start_time:.1f}s] Imagens carregadas")
-    
-    vecs = EMB.embed_images(pil)
-    pooled = EMB.pool_views(vecs)
-    similar = query_by_vector(pooled, top_k=5)
-    print(f"[{time.time()-start_time:.1f}s] Embeddings e busca de similaridade concluídos")
-
-    # Extrair características visuais das imagens
-    visual_features = extract_image_features(pil)
-    
-    # Análise multimodal completa usando Gemma 3:4b com áudio opcional
-    print(f"[{time.time()-start_time:.1f}s] Iniciando análise multimodal de {len(pil)} imagens..." + 
-          (f" com áudio" if audio_base64 else ""))
-    multimodal_result = multimodal_intake_analyze(pil, audio_base64)
-    print(f"[{time.time()-start_time:.1f}s] Análise multimodal concluída: {bool(multimodal_result)}")
-    
+
+    with stage("embed"):
+        batch = EMB.preprocess_batch(pil)
+        vecs = EMB.embed_batch(batch)
+        pooled = EMB.pool_views(vecs)
+    with stage("vector_query"):
+        similar = query_by_vector(pooled, top_k=5)
+
+    # Cores de todas as vistas de uma vez, reaproveitando as miniaturas do CLIP
+    with stage("colors"):
+        color_info = analyze_views(EMB.batch_to_rgb(batch))
+        visual_features = extract_image_features(pil, color_info)
+
+    # Classificação zero-shot sobre o mesmo vetor (milissegundos)
+    with stage("zero_shot"):
+        zero_shot = ZS.classify(pooled)
+        hints = ZS.confident(zero_shot)
+    logger.info("Zero-shot: %s", hints or "sem campos confiáveis")
+
+    if ZEROSHOT_SKIP_LLM and not audio_bytes and len(hints) == len(zero_shot):
+        logger.info("Zero-shot confiável, Gemma dispensado")
+        multimodal_result = ZS.to_cadastro(hints)
+    else:
+        # Análise multimodal completa usando Gemma 3:4b com áudio opcional
+        multimodal_result = multimodal_intake_analyze(pil, audio_bytes, hints, raw_images)
+
     # Se a análise multimodal falhou, use o método tradicional
     if not multimodal_result:
-        print(f"[{time.time()-start_time:.1f}s] Fallback para análise tradicional")
+        logger.warning("Análise multimodal falhou, fallback para análise tradicional")
         context = {
             "instrucao": "Analise características básicas para classificar a peça",
-            "total_fotos": len(images),
+            "total_fotos": len(pil),
             "caracteristicas_visuais": visual_features,
+            "paleta_geral": color_info["paleta"],
             "consignor_id": consignor_id,
             "produtos_similares": similar[:3] if similar else []
         }
         normalized = intake_normalize(context)
     else:
         normalized = multimodal_result
-        
-    print(f"[{time.time()-start_time:.1f}s] Análise normalizada concluída")
-    
-    price_info = price_suggest({
-        "categoria": normalized.get("Categoria"),
-        "marca": normalized.get("Marca"),
-        "condicao": normalized.get("Condição"),
-        "estagio": 0
-    })
+
+    if not (normalized.get("Categoria") or normalized.get("categoria")) and "categoria" in hints:
+        normalized["Categoria"] = hints["categoria"].capitalize()
+    if not (normalized.get("Gênero") or normalized.get("genero")) and "genero" in hints:
+        normalized["Gênero"] = hints["genero"]
+    if not (normalized.get("Cor") or normalized.get("cor")):
+        normalized["Cor"] = hints.get("cor") or color_info["cor_predominante"]
+
+    # Preço pelos vizinhos vendidos; o Gemma só entra se houver poucos
+    condition = normalized.get("Condição") or normalized.get("condicao")
+    with stage("price_knn"):
+        price_info = estimate_price(pooled, condition)
+    if price_info is None:
+        logger.info("Poucos vizinhos vendidos, precificação via Gemma")
+        price_info = price_suggest({
+            "categoria": normalized.get("Categoria"),
+            "marca": normalized.get("Marca"),
+            "condicao": condition,
+            "estagio": 0
+        })
     sku = str(uuid.uuid4())[:8].upper()
-    
-    print(f"[{time.time()-start_time:.1f}s] Processamento completo")
 
     return JSONResponse({
         "consignor_id": consignor_id,
         "proposal": {
-            "sku": sku, 
-            "cadastro": normalized, 
+            "sku": sku,
+            "cadastro": normalized,
             "price": price_info,
             "descricao_completa": normalized.get("DescricaoCompleta", ""),
             "relatorio_detalhado": normalized.get("RelatorioDetalhado", ""),
-            "valor_estimado": normalized.get("ValorEstimado", "")
+            "valor_estimado": normalized.get("ValorEstimado", ""),
+            "zero_shot": zero_shot
         },
         "similar_topk": similar
     })
@@ -0,0 +1,169 @@
+"""
+Snapshot / restore do índice vetorial.
+
+Um snapshot é um único arquivo versionado com:
+    cabeçalho fixo  -> magic, versão do formato, tamanho do cabeçalho JSON
+    cabeçalho JSON  -> modelo de embedding, dimensão, ids e metadados
+    vetores         -> float32 contíguos (count x dim), alinhados em 64 bytes
+
+A restauração mapeia os vetores com np.memmap e faz upsert em lotes, sem
+recalcular nenhum embedding.
+
+Uso:
+    python snapshot.py export vectordb.snap
+    python snapshot.py restore vectordb.snap
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+from typing import Dict, Any
+
+import numpy as np
+
+from config import EMBED_MODEL
+from vstore import collection
+
+MAGIC = b"BRVSNAP\0"
+FORMAT_VERSION = 1
+_PREFIX = struct.Struct("<8sIQ")  # magic, versão, tamanho do cabeçalho JSON
+_ALIGN = 64
+_BATCH = 1000
+
+
+def _aligned(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def export_snapshot(path: str) -> Dict[str, Any]:
+    """Grava ids, vetores e metadados da coleção em um único arquivo"""
+    coll = collection()
+
+    # Paginar por limit/offset não tem ordem estável: upserts durante o export
+    # duplicariam ou pulariam itens. Lista os ids uma vez, ordena, e busca os
+    # vetores lote a lote por id.
+    all_ids = sorted(coll.get(include=[])["ids"])
+    ids, metadatas, chunks = [], [], []
+    for start in range(0, len(all_ids), _BATCH):
+        res = coll.get(
+            ids=all_ids[start : start + _BATCH], include=["embeddings", "metadatas"]
+        )
+        # O Chroma não garante a ordem da resposta; itens removidos no meio do
+        # export simplesmente não voltam
+        order = sorted(range(len(res["ids"])), key=res["ids"].__getitem__)
+        if not order:
+            continue
+        ids.extend(res["ids"][i] for i in order)
+        metadatas.extend(res["metadatas"][i] for i in order)
+        chunks.append(np.asarray(res["embeddings"], dtype=np.float32)[order])
+
+    vectors = (
+        np.ascontiguousarray(np.concatenate(chunks))
+        if chunks
+        else np.zeros((0, 0), dtype=np.float32)
+    )
+    header = {
+        "format_version": FORMAT_VERSION,
+        "embed_model": EMBED_MODEL,
+        "collection": coll.name,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "count": int(vectors.shape[0]),
+        "dim": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+        "dtype": "float32",
+        "ids": ids,
+        "metadatas": metadatas,
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    data_offset = _aligned(_PREFIX.size + len(header_bytes))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (data_offset - f.tell()))
+        f.write(vectors.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    return {k: header[k] for k in ("embed_model", "count", "dim", "created_at")}
+
+
+def read_snapshot(path: str):
+    """Lê o cabeçalho e devolve (header, vetores memory-mapped)"""
+    with open(path, "rb") as f:
+        magic, version, header_len = _PREFIX.unpack(f.read(_PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} não é um snapshot do índice vetorial")
+        if version != FORMAT_VERSION:
+            raise ValueError(
+                f"Versão de snapshot não suportada: {version} "
+                f"(esperado {FORMAT_VERSION})"
+            )
+        header = json.loads(f.read(header_len).decode("utf-8"))
+
+    count, dim = header["count"], header["dim"]
+    if count == 0:
+        return header, np.zeros((0, dim), dtype=np.float32)
+    vectors = np.memmap(
+        path,
+        dtype=np.float32,
+        mode="r",
+        offset=_aligned(_PREFIX.size + header_len),
+        shape=(count, dim),
+    )
+    return header, vectors
+
+
+def restore_snapshot(path: str) -> Dict[str, Any]:
+    """Recarrega um snapshot na coleção; recusa modelos de embedding diferentes"""
+    header, vectors = read_snapshot(path)
+    if header["embed_model"] != EMBED_MODEL:
+        raise ValueError(
+            f"Snapshot gerado com EMBED_MODEL={header['embed_model']!r}, "
+            f"mas o gateway está configurado com {EMBED_MODEL!r}"
+        )
+
+    coll = collection()
+    ids, metadatas = header["ids"], header["metadatas"]
+    for start in range(0, header["count"], _BATCH):
+        end = start + _BATCH
+        coll.upsert(
+            ids=ids[start:end],
+            embeddings=np.asarray(vectors[start:end]).tolist(),
+            metadatas=metadatas[start:end],
+        )
+
+    return {k: header[k] for k in ("embed_model", "count", "dim", "created_at")}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Snapshot do índice vetorial")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("export", help="grava um snapshot").add_argument("path")
+    sub.add_parser("restore", help="restaura um snapshot").add_argument("path")
+    sub.add_parser("info", help="mostra o cabeçalho").add_argument("path")
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    try:
+        if args.command == "export":
+            info = export_snapshot(args.path)
+        elif args.command == "restore":
+            info = restore_snapshot(args.path)
+        else:
+            header, _ = read_snapshot(args.path)
+            info = {k: v for k, v in header.items() if k not in ("ids", "metadatas")}
+    except (OSError, ValueError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+
+    print(json.dumps(info, ensure_ascii=False))
+    print(f"{args.command} concluído em {time.time() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
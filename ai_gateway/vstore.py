@@ -1,6 +1,6 @@
 import chromadb, os
 from chromadb.config import Settings
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Optional
 from config import CHROMA_PATH
 
 os.makedirs(CHROMA_PATH, exist_ok=True)
@@ -9,14 +9,15 @@ _client = chromadb.Client(Settings(persist_directory=CHROMA_PATH))
 COLL_NAME = "items"
 
 
-def _collection():
+def collection():
+    """Coleção de itens do Chroma (criada na primeira chamada)"""
     return _client.get_or_create_collection(
         COLL_NAME, metadata={"hnsw:space": "cosine"}
     )
 
 
 def upsert_item_embedding(item_id: str, vector, metadata: Dict[str, Any]):
-    coll = _collection()
+    coll = collection()
     coll.upsert(
         ids=[item_id],
         embeddings=[vector.tolist()],
@@ -25,11 +26,30 @@ def upsert_item_embedding(item_id: str, vector, metadata: Dict[str, Any]):
     # _client.persist()  # Removido - persist() não existe mais no ChromaDB atual
 
 
-def query_by_vector(vector, top_k: int = 5):
-    coll = _collection()
+def update_item_metadata(item_id: str, patch: Dict[str, Any], drop: Iterable[str] = ()) -> bool:
+    """Mescla `patch` nos metadados de um item já indexado, removendo as chaves `drop`"""
+    coll = collection()
+    drop = set(drop)
+    include = ["metadatas", "embeddings"] if drop else ["metadatas"]
+    res = coll.get(ids=[item_id], include=include)
+    if not res["ids"]:
+        return False
+    metadata = {**(res["metadatas"][0] or {}), **patch}
+    if not drop:
+        coll.update(ids=[item_id], metadatas=[metadata])
+        return True
+    # update() só mescla chaves; para remover, regrava o registro inteiro
+    metadata = {k: v for k, v in metadata.items() if k not in drop}
+    coll.upsert(ids=[item_id], embeddings=[res["embeddings"][0]], metadatas=[metadata])
+    return True
+
+
+def query_by_vector(vector, top_k: int = 5, where: Optional[Dict[str, Any]] = None):
+    coll = collection()
     res = coll.query(
         query_embeddings=[vector.tolist()],
         n_results=top_k,
+        where=where,
         include=["distances", "metadatas"],
     )
     out = []
@@ -0,0 +1,128 @@
+"""
+Classificação zero-shot (categoria, cor, gênero) com o CLIP já carregado.
+
+Os prompts em português são embedados uma única vez e guardados em disco
+(ZEROSHOT_CACHE); a classificação de um item é só um produto matricial
+entre o vetor agregado das fotos e esse banco de textos.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List
+
+import numpy as np
+
+from config import EMBED_MODEL, ZEROSHOT_CACHE, ZEROSHOT_MIN_CONFIDENCE
+
+logger = logging.getLogger(__name__)
+
+LABELS: Dict[str, List[str]] = {
+    "categoria": [
+        "vestido", "blusa", "camiseta", "camisa", "calça", "calça jeans",
+        "bermuda", "short", "saia", "casaco", "jaqueta", "macacão",
+        "roupa de bebê", "sapato", "bota", "tênis", "sandália", "bolsa",
+        "acessório", "luminária", "eletrônico", "decoração", "brinquedo",
+        "equipamento de academia",
+    ],
+    "cor": [
+        "preto", "branco", "cinza", "bege", "marrom", "vermelho", "vinho",
+        "rosa", "laranja", "amarelo", "verde", "azul", "azul-marinho",
+        "roxo", "estampado", "colorido",
+    ],
+    "genero": ["feminino", "masculino", "infantil", "unissex"],
+}
+
+TEMPLATES: Dict[str, List[str]] = {
+    "categoria": [
+        "uma foto de {}",
+        "foto de produto de {}",
+        "{} usado à venda em um brechó",
+    ],
+    "cor": [
+        "uma foto de um item {}",
+        "uma peça na cor {}",
+    ],
+    "genero": [
+        "uma peça de roupa {}",
+        "moda {}",
+    ],
+}
+
+# Escala de temperatura do CLIP (logit_scale ≈ 100 nos pesos da OpenAI)
+_LOGIT_SCALE = 100.0
+
+
+def _bank_key() -> str:
+    payload = json.dumps([EMBED_MODEL, LABELS, TEMPLATES], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class ZeroShotClassifier:
+    def __init__(self, embedder):
+        self.embedder = embedder
+        self.banks = self._load_or_build()
+
+    def _load_or_build(self) -> Dict[str, np.ndarray]:
+        key = _bank_key()
+        if os.path.exists(ZEROSHOT_CACHE):
+            try:
+                cached = np.load(ZEROSHOT_CACHE)
+                if str(cached["key"]) == key:
+                    return {field: cached[field] for field in LABELS}
+            except Exception as e:
+                logger.warning("Cache zero-shot inválido, recalculando: %s", e)
+
+        banks = {}
+        for field, labels in LABELS.items():
+            templates = TEMPLATES[field]
+            prompts = [t.format(label) for label in labels for t in templates]
+            emb = self.embedder.embed_texts(prompts).reshape(
+                len(labels), len(templates), -1
+            )
+            # Média dos templates por rótulo, renormalizada
+            mean = emb.mean(axis=1)
+            banks[field] = mean / np.linalg.norm(mean, axis=-1, keepdims=True)
+
+        np.savez(ZEROSHOT_CACHE, key=key, **banks)
+        return banks
+
+    def classify(self, vector: np.ndarray, top_n: int = 3) -> Dict[str, Dict]:
+        """Rótulo, confiança e top-N por campo para um vetor de imagem normalizado"""
+        out = {}
+        for field, bank in self.banks.items():
+            logits = _LOGIT_SCALE * (bank @ vector)
+            probs = np.exp(logits - logits.max())
+            probs /= probs.sum()
+            order = np.argsort(probs)[::-1][:top_n]
+            labels = LABELS[field]
+            out[field] = {
+                "label": labels[order[0]],
+                "confidence": round(float(probs[order[0]]), 3),
+                "top": [
+                    {"label": labels[i], "confidence": round(float(probs[i]), 3)}
+                    for i in order
+                ],
+            }
+        return out
+
+    @staticmethod
+    def confident(result: Dict[str, Dict]) -> Dict[str, str]:
+        """Somente os campos acima de ZEROSHOT_MIN_CONFIDENCE"""
+        return {
+            field: r["label"]
+            for field, r in result.items()
+            if r["confidence"] >= ZEROSHOT_MIN_CONFIDENCE
+        }
+
+    @staticmethod
+    def to_cadastro(labels: Dict[str, str]) -> dict:
+        """Cadastro mínimo quando o LLM é dispensado"""
+        categoria = labels.get("categoria", "").capitalize()
+        cor = labels.get("cor", "")
+        return {
+            "Categoria": categoria,
+            "Cor": cor,
+            "Gênero": labels.get("genero"),
+            "TituloIG": f"{categoria} {cor}".strip()[:30],
+        }
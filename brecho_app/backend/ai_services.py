@@ -1,25 +1,171 @@
-import requests
+import asyncio
 import base64
 import io
 import json
 import os
+import random
+import time
 import uuid
 from datetime import datetime
 from typing import List, Dict, Optional
+import httpx
 from PIL import Image
 from config import settings
+from request_context import outgoing_headers
 import qrcode
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Gateway endpoints: path and read timeout in seconds
+GATEWAY_ENDPOINTS = {
+    "search": ("/search_by_image", 30),
+    "text_search": ("/search_by_text", 15),
+    "intake": ("/intake/autoregister", 600),  # 10 minutos para análise multimodal
+    "index": ("/index/upsert", 300),
+    "sold": ("/index/sold", 10),
+    "unsold": ("/index/unsold", 10),
+}
+
+# Failures worth retrying: the request never reached the gateway, or the
+# gateway (or the tunnel in front of it) is temporarily unavailable
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+RETRYABLE_STATUS = {502, 503, 504}
+
+
+class GatewayUnavailableError(Exception):
+    """Raised without calling the gateway while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Stops calling the gateway after repeated failures, probing again after a
+    cool-down. While half-open exactly one call (the probe) goes through;
+    everyone else is refused until it records a result.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "half-open" and not self.probing:
+            self.probing = True
+            return True
+        return state == "closed"
+
+    def end_probe(self):
+        """Let another probe through after one ended without a verdict (4xx, cancelled)"""
+        self.probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold or self.state == "half-open":
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+
+def _rewind(files):
+    """Seek streamed file parts back to the start so a retry resends them whole"""
+    parts = files.values() if isinstance(files, dict) else [part for _, part in files or []]
+    for part in parts:
+        content = part[1] if isinstance(part, tuple) else part
+        if hasattr(content, "seek"):
+            content.seek(0)
+
 
 class AIGatewayService:
     """Service to interact with the AI Gateway"""
     
     def __init__(self):
         self.base_url = settings.AI_GATEWAY_URL
-        
+        self.breaker = CircuitBreaker(
+            settings.AI_GATEWAY_CIRCUIT_FAILURES, settings.AI_GATEWAY_CIRCUIT_RESET
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        # Intakes hold a gateway worker for minutes; keep them from starving searches
+        self._intake_slots = asyncio.Semaphore(settings.AI_GATEWAY_MAX_INTAKES)
+        self._slots = asyncio.Semaphore(settings.AI_GATEWAY_MAX_CONCURRENCY)
+
+    async def start(self):
+        """Open the pooled HTTP client (called once at app startup)"""
+        if self._client is None:
+            limit = settings.AI_GATEWAY_MAX_CONCURRENCY + settings.AI_GATEWAY_MAX_INTAKES
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit),
+            )
+
+    async def close(self):
+        """Close the pooled HTTP client (called at app shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _post(self, endpoint: str, files=None, data=None) -> httpx.Response:
+        """POST to a gateway endpoint with bounded concurrency, retries and circuit breaking"""
+        probe = self.breaker.state == "half-open"
+        if not self.breaker.allow():
+            raise GatewayUnavailableError(
+                f"AI gateway unavailable (circuit open after {self.breaker.failures} failures)"
+            )
+        try:
+            return await self._post_with_retries(endpoint, files, data)
+        finally:
+            if probe:
+                self.breaker.end_probe()
+
+    async def _post_with_retries(self, endpoint: str, files, data) -> httpx.Response:
+        await self.start()
+
+        path, read_timeout = GATEWAY_ENDPOINTS[endpoint]
+        timeout = httpx.Timeout(read_timeout, connect=settings.AI_GATEWAY_CONNECT_TIMEOUT)
+        slots = self._intake_slots if endpoint == "intake" else self._slots
+
+        for attempt in range(settings.AI_GATEWAY_RETRIES + 1):
+            _rewind(files)
+            try:
+                async with slots:
+                    response = await self._client.post(
+                        path, files=files, data=data, headers=outgoing_headers(), timeout=timeout
+                    )
+                if response.status_code in RETRYABLE_STATUS:
+                    response.raise_for_status()
+            except (*RETRYABLE_ERRORS, httpx.HTTPStatusError) as e:
+                self.breaker.record_failure()
+                if attempt == settings.AI_GATEWAY_RETRIES or self.breaker.state != "closed":
+                    raise
+                delay = settings.AI_GATEWAY_BACKOFF * 2 ** attempt * (1 + random.random())
+                logger.warning(f"AI gateway {path} failed ({e!r}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            except httpx.TransportError:
+                self.breaker.record_failure()
+                raise
+
+            if response.is_server_error:
+                self.breaker.record_failure()
+            response.raise_for_status()
+            self.breaker.record_success()
+            return response
+
     async def search_by_image(self, image_b64: str, top_k: int = 5) -> Dict:
         """Search for similar items using image"""
         try:
@@ -27,17 +173,11 @@ class AIGatewayService:
             image_data = base64.b64decode(image_b64)
             
             files = {
-                'image': ('image.jpg', io.BytesIO(image_data), 'image/jpeg')
+                'image': ('image.jpg', image_data, 'image/jpeg')
             }
             data = {'top_k': top_k}
             
-            response = requests.post(
-                f"{self.base_url}/search_by_image",
-                files=files,
-                data=data,
-                timeout=30
-            )
-            response.raise_for_status()
+            response = await self._post("search", files=files, data=data)
             
             return {
                 "success": True,
@@ -52,34 +192,35 @@ class AIGatewayService:
                 "error": str(e)
             }
     
-    async def intake_autoregister(self, images_b64: List[str], audio_b64: Optional[str] = None) -> Dict:
-        """Auto-register items using AI"""
+    async def search_by_text(self, text: str, top_k: int = 20) -> Dict:
+        """Search item photos by a text description (CLIP text embedding)"""
         try:
-            # Debug: verificar se áudio está presente
-            print(f"DEBUG AI_SERVICE: Áudio presente: {bool(audio_b64)}")
-            if audio_b64:
-                print(f"DEBUG AI_SERVICE: Tamanho do áudio: {len(audio_b64)} chars")
-            
-            files = []
-            for i, img_b64 in enumerate(images_b64):
-                image_data = base64.b64decode(img_b64)
-                files.append(
-                    ('images', (f'image_{i}.jpg', io.BytesIO(image_data), 'image/jpeg'))
-                )
-            
-            # Add audio if provided
-            if audio_b64:
-                audio_data = base64.b64decode(audio_b64)
-                files.append(
-                    ('audio', ('audio.wav', io.BytesIO(audio_data), 'audio/wav'))
-                )
+            response = await self._post("text_search", data={"text": text, "top_k": top_k})
+            return {
+                "success": True,
+                "results": response.json().get("results", [])
+            }
+        except Exception as e:
+            logger.error(f"AI text search error: {str(e)}")
+            return {
+                "success": False,
+                "results": [],
+                "error": str(e)
+            }
+
+    async def intake_autoregister(self, image_hashes: List[str], audio: Optional[tuple] = None) -> Dict:
+        """
+        Auto-register items using AI.
+
+        Images are passed as blob store hashes: the gateway reads them from the
+        shared store, so photo bytes are never re-sent. `audio` is an optional
+        (filename, content, content_type) tuple; file objects are streamed.
+        """
+        try:
+            files = [('audio', audio)] if audio else None
+            data = {'image_hashes': ",".join(image_hashes)}
             
-            response = requests.post(
-                f"{self.base_url}/intake/autoregister",
-                files=files,
-                timeout=600  # 10 minutos para análise multimodal
-            )
-            response.raise_for_status()
+            response = await self._post("intake", files=files, data=data)
             
             result = response.json()
             return {
@@ -99,28 +240,16 @@ class AIGatewayService:
                 "error": str(e)
             }
     
-    async def index_item(self, sku: str, images_b64: List[str], metadata: Dict) -> Dict:
-        """Index an item in the vector database"""
+    async def index_item(self, sku: str, image_hashes: List[str], metadata: Dict) -> Dict:
+        """Index an item in the vector database from images already in the blob store"""
         try:
-            files = []
-            for i, img_b64 in enumerate(images_b64):
-                image_data = base64.b64decode(img_b64)
-                files.append(
-                    ('images', (f'image_{i}.jpg', io.BytesIO(image_data), 'image/jpeg'))
-                )
-            
             data = {
                 'sku': sku,
+                'image_hashes': ",".join(image_hashes),
                 **metadata
             }
             
-            response = requests.post(
-                f"{self.base_url}/index/upsert",
-                files=files,
-                data=data,
-                timeout=300  # 5 minutos
-            )
-            response.raise_for_status()
+            response = await self._post("index", data=data)
             
             return {
                 "success": True,
@@ -129,15 +258,45 @@ class AIGatewayService:
             
         except Exception as e:
             logger.error(f"AI indexing error: {str(e)}")
+            return {"success": False, "error": str(e)}
     
+    async def mark_sold(self, sku: str, sale_price: float, days_on_hand: Optional[int] = None,
+                        condition: Optional[str] = None) -> Dict:
+        """Record a sale on the indexed item so the gateway can price neighbors from it"""
+        try:
+            data = {'sku': sku, 'sale_price': sale_price}
+            if days_on_hand is not None:
+                data['days_on_hand'] = days_on_hand
+            if condition:
+                data['condition'] = condition
+
+            await self._post("sold", data=data)
+
+            return {"success": True}
+
+        except Exception as e:
+            logger.error(f"AI mark sold error for {sku}: {str(e)}")
+            return {"success": False, "error": str(e)}
+
+    async def mark_unsold(self, sku: str) -> Dict:
+        """Clear a deleted sale from the indexed item so neighbor pricing stops using it"""
+        try:
+            await self._post("unsold", data={'sku': sku})
+
+            return {"success": True}
+
+        except Exception as e:
+            logger.error(f"AI mark unsold error for {sku}: {str(e)}")
+            return {"success": False, "error": str(e)}
+
     async def generate_dynamic_fields(self, category: str, subcategory: Optional[str] = None, 
-                                    brand: Optional[str] = None, images_b64: Optional[List[str]] = None) -> List[Dict]:
+                                    brand: Optional[str] = None, image_hashes: Optional[List[str]] = None) -> Dict:
         """
         A IA agora gera campos dinamicos de forma inteligente!
         Esta funcao apenas retorna uma lista vazia pois os campos
         sao gerados dinamicamente pela IA no processo de analise.
         """
-        return []
+        return {"success": True, "fields": []}
 
     async def enhance_proposal_with_similarity(self, proposal: Dict, images_b64: List[str]) -> Dict:
         """Enhance proposal with similarity search results"""
@@ -182,50 +341,6 @@ class AIGatewayService:
             return proposal
 
 
-def save_item_images(sku: str, images_b64: List[str]) -> List[str]:
-    """Save base64 images to disk and return URLs"""
-    try:
-        logger.info(f"Saving {len(images_b64)} images for SKU {sku}")
-        
-        # Create uploads directory if it doesn't exist
-        upload_dir = os.path.join(settings.UPLOAD_DIR, "items", sku)
-        os.makedirs(upload_dir, exist_ok=True)
-        logger.info(f"Created upload directory: {upload_dir}")
-        
-        image_urls = []
-        for i, img_b64 in enumerate(images_b64):
-            logger.info(f"Processing image {i+1}, base64 length: {len(img_b64)}")
-            
-            # Remove data URL prefix if present
-            if img_b64.startswith('data:image'):
-                img_b64 = img_b64.split(',')[1]
-            
-            # Decode base64 image
-            image_data = base64.b64decode(img_b64)
-            logger.info(f"Decoded image {i+1}, size: {len(image_data)} bytes")
-            
-            # Generate filename
-            filename = f"image_{i+1}_{uuid.uuid4().hex[:8]}.jpg"
-            filepath = os.path.join(upload_dir, filename)
-            
-            # Save image
-            with open(filepath, 'wb') as f:
-                f.write(image_data)
-            
-            logger.info(f"Saved image to: {filepath}")
-            
-            # Create URL (relative to static serving)
-            image_url = f"/static/items/{sku}/{filename}"
-            image_urls.append(image_url)
-        
-        logger.info(f"Successfully saved {len(image_urls)} images, URLs: {image_urls}")
-        return image_urls
-        
-    except Exception as e:
-        logger.error(f"Error saving images for SKU {sku}: {str(e)}")
-        return []
-
-
 class QRCodeService:
     """Service for QR code generation"""
     
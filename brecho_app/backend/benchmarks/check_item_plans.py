@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Verifica com EXPLAIN QUERY PLAN que a listagem de itens usa os índices
+compostos: cada combinação de filtros, com e sem cursor, deve ser um SEARCH
+num índice, sem varrer a tabela (SCAN) nem ordenar em B-tree temporária.
+
+Cria um banco SQLite temporário com o schema e as migrations atuais.
+Sai com código 1 se algum plano regredir, para rodar em CI.
+
+Uso:
+    python benchmarks/check_item_plans.py
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.orm import sessionmaker
+
+from crud import item_list_query
+from database import Base, make_engine
+from migrations import run_migrations
+from models import Consignor, Item
+from pagination import encode_cursor
+
+CASES = {
+    "ativos": {},
+    "por consignante": {"consignor_id": "C001"},
+    "por categoria": {"category": "Vestido"},
+    "consignante + categoria": {"consignor_id": "C001", "category": "Vestido"},
+    "inativos": {"active": False},
+}
+
+BAD_PLAN_STEPS = ("SCAN", "USE TEMP B-TREE")
+
+
+def seed(engine, items: int = 2000):
+    db = sessionmaker(bind=engine)()
+    db.add_all(Consignor(id=f"C{i:03d}", name=f"Consignante {i}") for i in range(20))
+    start = datetime(2024, 1, 1)
+    db.add_all(
+        Item(
+            sku=f"PLAN{i:06d}",
+            consignor_id=f"C{i % 20:03d}",
+            category=["Vestido", "Blusa", "Calça", "Saia"][i % 4],
+            active=i % 10 != 0,
+            created_at=start + timedelta(minutes=i),
+            sold_at=start + timedelta(days=1) if i % 3 == 0 else None,
+        )
+        for i in range(items)
+    )
+    db.commit()
+    db.close()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+
+def query_plan(engine, query):
+    sql = str(query.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        return [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def main():
+    failures = 0
+    cursor = encode_cursor(datetime(2024, 1, 1, 12), "PLAN000720")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'plans.db')}")
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        seed(engine)
+
+        for name, filters in CASES.items():
+            for page, page_cursor in (("1ª página", None), ("com cursor", cursor)):
+                query = item_list_query(cursor=page_cursor, **filters).limit(51)
+                plan = query_plan(engine, query)
+                bad = [step for step in plan if step.startswith(BAD_PLAN_STEPS)]
+                failures += bool(bad)
+                print(f"{'❌' if bad else '✅'} {name} ({page}): {' | '.join(plan)}")
+
+        engine.dispose()
+
+    if failures:
+        print(f"\n❌ {failures} consulta(s) sem índice adequado")
+        sys.exit(1)
+    print("\n✅ Todas as listagens usam índice")
+
+
+if __name__ == "__main__":
+    main()
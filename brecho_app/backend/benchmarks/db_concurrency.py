@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concorrência do banco: leituras do dashboard contra gravações
+de cadastro ao mesmo tempo, como com várias pessoas da equipe usando o app.
+
+Compara o engine antigo (journal padrão, sem busy_timeout) com o engine
+ajustado de database.make_engine (WAL, pragmas, pool dimensionado). Com uma
+URL Postgres em --url, mede só o engine configurado.
+
+Uso:
+    python benchmarks/db_concurrency.py --readers 8 --writers 4 --seconds 10
+    python benchmarks/db_concurrency.py --url postgresql+psycopg://user:pw@localhost/brecho_bench
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, make_engine
+from models import Item, ItemDynamicField
+
+CATEGORIES = ["Vestido", "Blusa", "Calça", "Saia", "Casaco", "Sapato"]
+
+
+def seed(Session, count: int):
+    db = Session()
+    try:
+        db.add_all(
+            Item(
+                sku=f"SEED{i:06d}",
+                category=CATEGORIES[i % len(CATEGORIES)],
+                brand="Marca",
+                condition="A-",
+                list_price=50 + i % 100,
+                active=True,
+            )
+            for i in range(count)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def read_once(Session):
+    """Listagem e contagem por categoria, como o dashboard"""
+    db = Session()
+    try:
+        db.query(Item).filter(Item.active == True).order_by(Item.created_at.desc()).limit(50).all()
+        db.query(Item.category, func.count(Item.sku)).group_by(Item.category).all()
+    finally:
+        db.close()
+
+
+def write_once(Session):
+    """Um cadastro: item + campos dinâmicos numa transação"""
+    db = Session()
+    try:
+        sku = uuid.uuid4().hex[:10].upper()
+        db.add(Item(sku=sku, category="Vestido", condition="A", list_price=80, active=True))
+        db.add(ItemDynamicField(item_sku=sku, field_name="manga", field_value="curta"))
+        db.commit()
+    finally:
+        db.close()
+
+
+def worker(fn, Session, stop_at, latencies, errors):
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        try:
+            fn(Session)
+            latencies.append(time.perf_counter() - start)
+        except OperationalError as e:
+            errors.append(str(e.orig))
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+
+
+def run(url: str, tune: bool, args) -> dict:
+    engine = make_engine(url, tune=tune)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    seed(Session, args.seed)
+
+    stats = {kind: ([], []) for kind in ("read", "write")}
+    stop_at = time.perf_counter() + args.seconds
+    threads = [
+        threading.Thread(target=worker, args=(read_once, Session, stop_at, *stats["read"]))
+        for _ in range(args.readers)
+    ] + [
+        threading.Thread(target=worker, args=(write_once, Session, stop_at, *stats["write"]))
+        for _ in range(args.writers)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+
+    result = {}
+    for kind, (latencies, errors) in stats.items():
+        result[kind] = {
+            "ops_per_s": round(len(latencies) / args.seconds, 1),
+            "p50_ms": percentile(latencies, 0.50),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+            "errors": len(errors),
+            "locked_errors": sum("locked" in e for e in errors),
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de concorrência do banco")
+    parser.add_argument("--url", help="banco a medir (padrão: SQLite temporário, antigo x ajustado)")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=2000, help="itens criados antes da medição")
+    parser.add_argument("--out", help="grava o resultado em JSON")
+    args = parser.parse_args()
+
+    results = {}
+    if args.url:
+        results["configured"] = run(args.url, True, args)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, tune in (("untuned", False), ("tuned", True)):
+                url = f"sqlite:///{os.path.join(tmp, name + '.db')}"
+                print(f"🔄 {name}: {args.readers} leitores, {args.writers} escritores, {args.seconds:.0f}s")
+                results[name] = run(url, tune, args)
+
+    for name, result in results.items():
+        for kind, r in result.items():
+            print(
+                f"{name:>10} {kind:>5}: {r['ops_per_s']:>8} ops/s  p50 {r['p50_ms']} ms  "
+                f"p95 {r['p95_ms']} ms  p99 {r['p99_ms']} ms  erros {r['errors']} "
+                f"(locked {r['locked_errors']})"
+            )
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
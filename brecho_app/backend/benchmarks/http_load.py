@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Teste de carga HTTP das rotas de listagem/detalhe, comparando a API com
+sessões síncronas (DB_ASYNC=false) e assíncronas (DB_ASYNC=true).
+
+Sobe o backend com uvicorn num banco SQLite temporário já populado, uma vez
+por modo, e dispara requisições concorrentes por um tempo fixo. Com --url,
+mede apenas um servidor já em execução.
+
+Uso:
+    python benchmarks/http_load.py --concurrency 64 --seconds 15
+    python benchmarks/http_load.py --url http://localhost:8000 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+import httpx
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, make_engine
+from models import Consignor, Item
+
+API = "/api/v1"
+CATEGORIES = ["Vestido", "Blusa", "Calça", "Saia", "Casaco", "Sapato"]
+
+
+def seed(url: str, items: int):
+    engine = make_engine(url)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all(Consignor(id=f"C{i:03d}", name=f"Consignante {i}") for i in range(20))
+    db.add_all(
+        Item(
+            sku=f"LOAD{i:06d}",
+            consignor_id=f"C{i % 20:03d}",
+            category=CATEGORIES[i % len(CATEGORIES)],
+            condition="A-",
+            list_price=40 + i % 120,
+            active=True,
+        )
+        for i in range(items)
+    )
+    db.commit()
+    db.close()
+    engine.dispose()
+
+
+def request_mix(items: int):
+    """Caminho da próxima requisição, imitando as telas de itens e consignantes"""
+    roll = random.random()
+    if roll < 0.5:
+        return f"{API}/items/?limit=50&skip={random.randrange(0, max(1, items - 50))}"
+    if roll < 0.8:
+        return f"{API}/items/LOAD{random.randrange(items):06d}"
+    if roll < 0.9:
+        return f"{API}/items/?limit=50&category={random.choice(CATEGORIES)}"
+    return f"{API}/consignors/"
+
+
+async def load(base_url: str, concurrency: int, seconds: float, items: int) -> dict:
+    latencies, errors = [], 0
+    stop_at = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+
+        async def user():
+            nonlocal errors
+            while time.perf_counter() < stop_at:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(request_mix(items))
+                    if response.status_code >= 500:
+                        errors += 1
+                    else:
+                        latencies.append(time.perf_counter() - start)
+                except httpx.HTTPError:
+                    errors += 1
+
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+
+    latencies.sort()
+
+    def pct(q):
+        return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 1) if latencies else None
+
+    return {
+        "requests_per_s": round(len(latencies) / seconds, 1),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "errors": errors,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_backend(db_url: str, upload_dir: str, db_async: bool):
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=db_url, UPLOAD_DIR=upload_dir, DB_ASYNC=str(db_async).lower())
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return proc, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("Backend não respondeu em /health")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga: sessões síncronas x assíncronas")
+    parser.add_argument("--url", help="servidor já em execução (não sobe o backend)")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--items", type=int, default=5000, help="itens no banco de teste")
+    parser.add_argument("--out", help="grava o resultado em JSON")
+    args = parser.parse_args()
+
+    results = {}
+    if args.url:
+        results["server"] = asyncio.run(load(args.url, args.concurrency, args.seconds, args.items))
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_url = f"sqlite:///{os.path.join(tmp, 'load.db')}"
+            seed(db_url, args.items)
+            for name, db_async in (("sync", False), ("async", True)):
+                print(f"🔄 {name}: {args.concurrency} clientes por {args.seconds:.0f}s")
+                proc, base_url = start_backend(db_url, os.path.join(tmp, "uploads"), db_async)
+                try:
+                    results[name] = asyncio.run(load(base_url, args.concurrency, args.seconds, args.items))
+                finally:
+                    proc.terminate()
+                    proc.wait()
+
+    for name, r in results.items():
+        print(
+            f"{name:>6}: {r['requests_per_s']:>8} req/s  p50 {r['p50_ms']} ms  "
+            f"p95 {r['p95_ms']} ms  p99 {r['p99_ms']} ms  erros {r['errors']}"
+        )
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tempo de fechamento do repasse mensal num histórico sintético de vendas.
+
+Cria um banco SQLite temporário com o schema e as migrations atuais,
+insere N meses de vendas para M consignantes e fecha um período por mês
+via PayoutService, medindo cada fechamento. Como cada venda é liquidada
+uma única vez, o tempo deve acompanhar as vendas do mês, não o histórico.
+
+Uso:
+    python benchmarks/payout_close.py --consignors 500 --sales-per-month 20000 --months 12
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, make_engine
+from migrations import run_migrations
+from models import Consignor, Item, Sale
+from services.payouts import PayoutService
+
+CHANNELS = ["loja", "instagram", "online"]
+
+
+def month_start(start: date, offset: int) -> date:
+    months = start.month - 1 + offset
+    return date(start.year + months // 12, months % 12 + 1, 1)
+
+
+def month_end(first: date) -> date:
+    return month_start(first, 1) - timedelta(days=1)
+
+
+def seed(engine, consignors: int, sales_per_month: int, months: int, start: date):
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        conn.execute(insert(Consignor), [
+            {"id": f"C{i:04d}", "name": f"Consignante {i}", "percent": rng.choice([0.4, 0.5, 0.6])}
+            for i in range(consignors)
+        ])
+        n = 0
+        for month in range(months):
+            first = month_start(start, month)
+            days = (month_end(first) - first).days + 1
+            items, sales = [], []
+            for _ in range(sales_per_month):
+                sku = f"PAY{n:08d}"
+                items.append({"sku": sku, "consignor_id": f"C{rng.randrange(consignors):04d}"})
+                sales.append({
+                    "id": f"V{n:08d}",
+                    "sku": sku,
+                    "date": datetime.combine(first + timedelta(days=rng.randrange(days)), datetime.min.time()),
+                    "sale_price": round(rng.uniform(20, 400), 2),
+                    "channel": rng.choice(CHANNELS),
+                })
+                n += 1
+            conn.execute(insert(Item), items)
+            conn.execute(insert(Sale), sales)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de fechamento do repasse")
+    parser.add_argument("--consignors", type=int, default=500)
+    parser.add_argument("--sales-per-month", type=int, default=20_000)
+    parser.add_argument("--months", type=int, default=12)
+    args = parser.parse_args()
+
+    start = date(2025, 1, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'payouts.db')}")
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+
+        t0 = time.perf_counter()
+        seed(engine, args.consignors, args.sales_per_month, args.months, start)
+        total = args.sales_per_month * args.months
+        print(f"📦 {total} vendas de {args.consignors} consignantes em {time.perf_counter() - t0:.1f}s")
+
+        db = sessionmaker(bind=engine)()
+        service = PayoutService(db)
+        for month in range(args.months):
+            t0 = time.perf_counter()
+            period = service.close(month_end(month_start(start, month)))
+            elapsed = (time.perf_counter() - t0) * 1000
+            paid = sum(s.consignor_amount for s in period.statements)
+            print(f"🧾 {period.end_date}  {len(period.statements):>4} extratos  "
+                  f"R$ {paid:>12,.2f} a repassar  {elapsed:7.1f} ms")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Latência da busca textual (FTS5 + BM25) num catálogo sintético.
+
+Cria um banco SQLite temporário com o schema e as migrations atuais,
+insere N itens com títulos, marcas, cores e campos dinâmicos variados e
+mede p50/p95 de consultas típicas do balcão via ItemSearchService.
+
+Uso:
+    python benchmarks/search_latency.py --items 100000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, make_engine
+from migrations import run_migrations
+from models import Consignor, Item, ItemDynamicField
+from services.search import ItemSearchService
+
+PIECES = ["Vestido", "Blusa", "Calça", "Saia", "Casaco", "Camisa", "Short", "Macacão", "Jaqueta", "Bolsa"]
+STYLES = ["floral", "listrado", "midi", "longo", "curto", "jeans", "de linho", "de seda", "xadrez", "poá"]
+BRANDS = ["Farm", "Animale", "Zara", "Renner", "C&A", "Osklen", "Reserva", "Hering", "Shoulder", "Dudalina"]
+COLORS = ["Azul", "Preto", "Branco", "Vermelho", "Verde", "Amarelo", "Rosa", "Bege", "Marrom", "Cinza"]
+NOTES = ["pequeno defeito na barra", "nunca usado", "com etiqueta", "botão trocado", "", "", ""]
+FABRICS = ["algodão", "viscose", "poliéster", "linho", "lã", "couro"]
+
+QUERIES = ["vestido", "vestido floral", "farm azul", "calca jeans", "algodao", "seda preto",
+           "etiqueta", "jaqueta couro", "bol", "macacao verde longo"]
+
+
+def seed(engine, items: int):
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        conn.execute(insert(Consignor), [{"id": f"C{i:03d}", "name": f"Consignante {i}"} for i in range(50)])
+        batch, fields = [], []
+        for i in range(items):
+            piece, style = rng.choice(PIECES), rng.choice(STYLES)
+            sku = f"SRCH{i:07d}"
+            batch.append({
+                "sku": sku,
+                "consignor_id": f"C{i % 50:03d}",
+                "title_ig": f"{piece} {style} {rng.choice(BRANDS)}",
+                "summary_title": f"{piece} {style}",
+                "brand": rng.choice(BRANDS),
+                "category": piece,
+                "color": rng.choice(COLORS),
+                "notes": rng.choice(NOTES),
+                "active": rng.random() > 0.2,
+            })
+            fields.append({"item_sku": sku, "field_name": "tecido", "field_value": rng.choice(FABRICS)})
+            if len(batch) == 5000:
+                conn.execute(insert(Item), batch)
+                conn.execute(insert(ItemDynamicField), fields)
+                batch, fields = [], []
+        if batch:
+            conn.execute(insert(Item), batch)
+            conn.execute(insert(ItemDynamicField), fields)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência da busca textual de itens")
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=20, help="repetições de cada consulta")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'search.db')}")
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+
+        start = time.perf_counter()
+        seed(engine, args.items)
+        print(f"📦 {args.items} itens indexados em {time.perf_counter() - start:.1f}s (triggers)")
+
+        db = sessionmaker(bind=engine)()
+        search = ItemSearchService(db)
+        all_timings = []
+        for q in QUERIES:
+            timings = []
+            for _ in range(args.rounds):
+                t0 = time.perf_counter()
+                hits = search.search(q, limit=args.limit)
+                timings.append((time.perf_counter() - t0) * 1000)
+            timings.sort()
+            all_timings += timings
+            print(f"🔎 {q!r:24} {len(hits):>3} resultados  p50 {statistics.median(timings):6.2f} ms  "
+                  f"p95 {timings[int(0.95 * (len(timings) - 1))]:6.2f} ms")
+        db.close()
+        engine.dispose()
+
+    all_timings.sort()
+    print(f"\n✅ geral: p50 {statistics.median(all_timings):.2f} ms  "
+          f"p95 {all_timings[int(0.95 * (len(all_timings) - 1))]:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,11 +7,56 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     PROJECT_NAME: str = "Brechó Management API"
 
-    # Database
+    # Database (SQLite by default; a postgresql+psycopg:// URL switches to Postgres)
     DATABASE_URL: str = "sqlite:///./brecho.db"
+    DB_ASYNC: bool = False  # serve list/detail routes with async sessions (aiosqlite/asyncpg)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0  # seconds waiting for a pooled connection
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
 
     # AI Gateway Integration
     AI_GATEWAY_URL: str = "http://localhost:8808"
+    AI_GATEWAY_CONNECT_TIMEOUT: float = 5.0
+    AI_GATEWAY_MAX_CONCURRENCY: int = 8  # searches, indexing, sold updates
+    AI_GATEWAY_MAX_INTAKES: int = 2  # multimodal intakes in flight
+    AI_GATEWAY_RETRIES: int = 2
+    AI_GATEWAY_BACKOFF: float = 0.5  # seconds, doubled per retry
+    AI_GATEWAY_CIRCUIT_FAILURES: int = 5
+    AI_GATEWAY_CIRCUIT_RESET: float = 30.0  # seconds before probing again
+
+    # Background vector indexing (index_outbox table)
+    INDEX_OUTBOX_POLL_INTERVAL: float = 2.0  # seconds between idle polls
+    INDEX_OUTBOX_MAX_ATTEMPTS: int = 8
+    INDEX_OUTBOX_BACKOFF: float = 5.0  # seconds, doubled per attempt
+    INDEX_OUTBOX_LEASE: float = 900.0  # seconds before a claimed job is retried
+
+    # Dashboard counters (stats_counters table)
+    STATS_RECONCILE_INTERVAL: float = 3600.0  # seconds between full recounts
+
+    # Analytics snapshots (Parquet) and reports
+    ANALYTICS_DIR: str = "analytics"
+    ANALYTICS_SNAPSHOT_HOUR: int = 3  # local hour of the daily snapshot
+    ANALYTICS_BUSINESS_HOURS_START: int = 8  # no OLTP scans from this hour...
+    ANALYTICS_BUSINESS_HOURS_END: int = 20  # ...until this one
+    ANALYTICS_BATCH_SIZE: int = 5000  # rows per Parquet record batch
+
+    # Spreadsheet catalog import
+    IMPORT_BATCH_SIZE: int = 1000  # rows per INSERT/transaction
+
+    # CSV/XLSX exports
+    EXPORT_BATCH_SIZE: int = 1000  # rows fetched per round trip from the cursor
+    EXPORT_CHUNK_SIZE: int = 64 * 1024  # bytes buffered before a chunk is sent
+
+    # Hybrid (full-text + CLIP) search
+    HYBRID_SEARCH_CANDIDATES: int = 50  # hits taken from each ranking before fusion
+    HYBRID_SEARCH_RRF_K: int = 60  # reciprocal rank fusion constant
+    HYBRID_SEARCH_CACHE_TTL: float = 300.0  # seconds
+    HYBRID_SEARCH_CACHE_SIZE: int = 512  # cached queries
 
     # Security
     SECRET_KEY: str = "your-secret-key-change-in-production"
@@ -20,7 +65,11 @@ class Settings(BaseSettings):
 
     # File Upload
     UPLOAD_DIR: str = "uploads"
+    BLOB_GC_INTERVAL: float = 3600.0  # seconds between sweeps of unreferenced blobs
+    BLOB_GC_GRACE: float = 86400.0  # seconds an unreferenced blob is kept (intakes in progress)
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+    BLOB_WRITE_WORKERS: int = 4  # threads validating/writing uploaded photos
+    MEDIA_WORKERS: int = 2  # processes rendering thumbnails/derivatives
 
     # CORS
     BACKEND_CORS_ORIGINS: list = [
@@ -1,10 +1,15 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import DateTime, Integer, cast, func, literal, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 import uuid
+from collections import Counter
 from datetime import datetime
 
 from models import Consignor, Item, Sale
-from schemas import ConsignorCreate, ItemCreate, ItemUpdate, SaleCreate
+from pagination import CursorTimestamp, decode_cursor, encode_cursor
+from services.stats import StatsService, add_to_counters, dashboard_stats, item_deltas
+from schemas import ConsignorCreate, ItemCreate, ItemUpdate, SaleCreate, parse_photo_list
 import json
 
 
@@ -34,23 +39,105 @@ def get_item(db: Session, sku: str):
     return db.query(Item).filter(Item.sku == sku).first()
 
 
-def get_items(
-    db: Session,
-    skip: int = 0,
-    limit: int = 100,
+def item_detail_query(sku: str):
+    """Item with its consignor and dynamic fields, loaded in two extra queries"""
+    return (
+        select(Item)
+        .where(Item.sku == sku)
+        .options(selectinload(Item.consignor), selectinload(Item.dynamic_fields))
+    )
+
+
+def get_item_detail(db: Session, sku: str):
+    return db.scalars(item_detail_query(sku)).first()
+
+
+# Columns of schemas.ItemListEntry; lists fetch plain rows, not ORM objects
+ITEM_LIST_COLUMNS = (
+    Item.sku,
+    Item.consignor_id,
+    Item.category,
+    Item.subcategory,
+    Item.brand,
+    Item.size,
+    Item.color,
+    Item.condition,
+    Item.title_ig,
+    Item.summary_title,
+    Item.list_price,
+    Item.markdown_stage,
+    Item.photos,
+    Item.active,
+    Item.sold_at,
+    Item.index_status,
+    Item.acquired_at,
+    Item.created_at,
+)
+
+
+def item_list_query(
     consignor_id: Optional[str] = None,
     category: Optional[str] = None,
     active: bool = True,
+    cursor: Optional[str] = None,
 ):
-    query = db.query(Item).filter(Item.active == active)
+    """
+    Item list in (created_at, sku) descending order, starting after `cursor`.
+
+    Every filter combination is served by one of the composite indexes on
+    Item, which also provide the order, so pages never sort or scan.
+    """
+    query = select(*ITEM_LIST_COLUMNS).where(Item.active == active)
 
     if consignor_id:
-        query = query.filter(Item.consignor_id == consignor_id)
+        query = query.where(Item.consignor_id == consignor_id)
 
     if category:
-        query = query.filter(Item.category == category)
+        query = query.where(Item.category == category)
+
+    if cursor:
+        created_at, sku = decode_cursor(cursor)
+        after = tuple_(literal(created_at, CursorTimestamp), sku)
+        query = query.where(tuple_(Item.created_at, Item.sku) < after)
+
+    return query.order_by(Item.created_at.desc(), Item.sku.desc())
+
+
+def next_item_cursor(items: list, limit: int) -> Optional[str]:
+    """Cursor for the page after `items` (rows), fetched with limit + 1 rows"""
+    if len(items) <= limit:
+        return None
+    last = items[limit - 1]
+    return encode_cursor(last.created_at, last.sku)
+
+
+def get_items_page(
+    db: Session,
+    limit: int = 100,
+    consignor_id: Optional[str] = None,
+    category: Optional[str] = None,
+    active: bool = True,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+):
+    """One page of items and the cursor of the next page (None on the last one)"""
+    query = item_list_query(consignor_id, category, active, cursor)
+    items = db.execute(query.offset(skip).limit(limit + 1)).all()
+    return items[:limit], next_item_cursor(items, limit)
 
-    return query.offset(skip).limit(limit).all()
+
+def get_items(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    consignor_id: Optional[str] = None,
+    category: Optional[str] = None,
+    active: bool = True,
+):
+    items, _ = get_items_page(
+        db, limit=limit, consignor_id=consignor_id, category=category, active=active, skip=skip
+    )
+    return items
 
 
 def create_item(db: Session, item: ItemCreate):
@@ -71,11 +158,12 @@ def create_item(db: Session, item: ItemCreate):
 
 
 def create_item_from_ai_proposal(
-    db: Session, sku: str, proposal: dict, ai_result: dict, images_b64: list = None
+    db: Session, sku: str, proposal: dict, ai_result: dict, image_hashes: list = None
 ):
     """Create item from AI intake proposal"""
-    from ai_services import save_item_images
     from models import ItemDynamicField
+    from services.blob_store import BlobStore
+    from services.index_outbox import IndexOutboxService
 
     cadastro = proposal.get("cadastro", {})
     price_info = proposal.get("price", {})
@@ -92,10 +180,11 @@ def create_item_from_ai_proposal(
         except Exception:
             pass
 
-    # Save images and get URLs
+    # Reference the stored photos from this item and get their URLs; the
+    # references commit with the item, so a failed insert leaves none behind
     photo_urls = []
-    if images_b64:
-        photo_urls = save_item_images(sku, images_b64)
+    if image_hashes:
+        photo_urls = [BlobStore.url_for(b) for b in BlobStore(db).acquire(sku, image_hashes)]
 
     # Generate summary title
     summary_title = generate_item_summary_title(cadastro)
@@ -131,6 +220,9 @@ def create_item_from_ai_proposal(
 
     db_item = Item(**item_data)
     db.add(db_item)
+    if image_hashes:
+        # Vector indexing runs in the background; the job commits with the item
+        IndexOutboxService(db).enqueue(db_item, image_hashes)
     db.commit()
     db.refresh(db_item)
 
@@ -194,46 +286,168 @@ def get_sales(db: Session, skip: int = 0, limit: int = 100):
     return db.query(Sale).offset(skip).limit(limit).all()
 
 
-def create_sale(db: Session, sale: SaleCreate):
-    db_sale = Sale(**sale.dict())
-    db.add(db_sale)
-    db.commit()
-    db.refresh(db_sale)
+class SaleError(ValueError):
+    """A sale cannot be registered or changed as requested"""
+
+
+class ItemNotFound(SaleError):
+    pass
+
+
+class SaleConflict(SaleError):
+    """The item is already sold, or the sale ID is taken"""
+
+
+def _days_on_hand(db: Session, when: datetime):
+    """Days between the item's acquisition and `when`, computed by the database"""
+    if db.get_bind().dialect.name == "postgresql":
+        return cast(func.extract("day", literal(when, DateTime) - Item.acquired_at), Integer)
+    return cast(func.julianday(literal(when, DateTime)) - func.julianday(Item.acquired_at), Integer)
+
 
-    # Update item as sold
-    item = get_item(db, sale.sku)
-    if item:
-        item.sold_at = sale.date
-        item.sale_price = sale.sale_price
-        item.channel_sold = sale.channel
-        # Calculate days on hand
-        if item.acquired_at:
-            days_diff = (sale.date - item.acquired_at).days
-            item.days_on_hand = days_diff
+def _sold_skus_error(db: Session, skus: List[str]) -> SaleError:
+    """Why claiming `skus` failed: unknown items first, then items already sold"""
+    found = set(db.scalars(select(Item.sku).where(Item.sku.in_(skus))))
+    missing = [sku for sku in skus if sku not in found]
+    if missing:
+        return ItemNotFound(f"Item not found: {', '.join(missing)}")
+    return SaleConflict(f"Item already sold: {', '.join(skus)}")
+
+
+def register_sales(db: Session, sales: List[SaleCreate]) -> List[Sale]:
+    """
+    Record sales and mark their items sold in one transaction.
+
+    Each item is claimed with a conditional UPDATE (WHERE sold_at IS NULL)
+    that returns what the sale needs from it, so an item sold concurrently
+    by another request is never sold twice; the unique index on sales.sku
+    backs this up. If any item of the batch cannot be claimed nothing is
+    written and ItemNotFound or SaleConflict is raised. Sold prices for the
+    AI gateway are queued in the index outbox within the same transaction.
+    """
+    skus = [sale.sku for sale in sales]
+    repeated = sorted({sku for sku in skus if skus.count(sku) > 1})
+    if repeated:
+        raise SaleConflict(f"Item repeated in the sale: {', '.join(repeated)}")
+
+    from services.index_outbox import IndexOutboxService
+
+    outbox = IndexOutboxService(db)
+    db_sales, deltas, unclaimed = [], Counter(), []
+    try:
+        # Claim in SKU order so concurrent checkouts lock rows in the same order
+        for sale in sorted(sales, key=lambda s: s.sku):
+            claimed = db.execute(
+                update(Item)
+                .where(Item.sku == sale.sku, Item.sold_at.is_(None))
+                .values(
+                    sold_at=sale.date,
+                    sale_price=sale.sale_price,
+                    channel_sold=sale.channel,
+                    days_on_hand=_days_on_hand(db, sale.date),
+                )
+                .returning(
+                    Item.active, Item.category, Item.consignor_id,
+                    Item.days_on_hand, Item.condition,
+                )
+                .execution_options(synchronize_session=False)
+            ).first()
+            if claimed is None:
+                unclaimed.append(sale.sku)
+                continue
+            deltas.update(item_deltas(
+                (claimed.active, None, claimed.category),
+                (claimed.active, sale.date, claimed.category),
+            ))
+            db_sale = Sale(**sale.dict())
+            if db_sale.consignor_id is None:
+                db_sale.consignor_id = claimed.consignor_id
+            db_sales.append(db_sale)
+            # Reported to the AI gateway by the outbox worker, never inline
+            outbox.enqueue_sold(sale.sku, sale.sale_price, claimed.days_on_hand, claimed.condition)
+
+        if unclaimed:
+            raise _sold_skus_error(db, unclaimed)
+
+        # The UPDATEs bypass the ORM, so the item counters move here
+        add_to_counters(db.connection(), deltas)
+        db.add_all(db_sales)
         db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise SaleConflict("Sale already registered for this item or sale ID")
+    except Exception:
+        db.rollback()
+        raise
+
+    # Load created_at for all sales in one query
+    ids = [sale.id for sale in sales]
+    by_id = {s.id: s for s in db.scalars(select(Sale).where(Sale.id.in_(ids)))}
+    return [by_id[sale_id] for sale_id in ids]
 
+
+def create_sale(db: Session, sale: SaleCreate):
+    return register_sales(db, [sale])[0]
+
+
+def update_sale(db: Session, sale_id: str, sale: SaleCreate):
+    """Change a sale and keep its item's sold fields (and the gateway's copy) in step"""
+    from services.index_outbox import IndexOutboxService
+
+    db_sale = get_sale(db, sale_id)
+    if db_sale is None:
+        return None
+    if db_sale.payout_period_id is not None:
+        raise SaleConflict("Sale already settled in a payout period")
+    if sale.sku != db_sale.sku:
+        raise SaleConflict("A sale cannot be moved to another item; delete it and sell the item")
+
+    for field, value in sale.dict(exclude_unset=True).items():
+        if field != "id":
+            setattr(db_sale, field, value)
+
+    item = get_item(db, db_sale.sku)
+    if item is not None:
+        item.sold_at = db_sale.date
+        item.sale_price = db_sale.sale_price
+        item.channel_sold = db_sale.channel
+        item.days_on_hand = _days_on_hand(db, db_sale.date)
+        # days_on_hand is a SQL expression until flushed; reading it then reloads the value
+        db.flush()
+        IndexOutboxService(db).enqueue_sold(
+            item.sku, db_sale.sale_price, item.days_on_hand, item.condition
+        )
+    db.commit()
+    db.refresh(db_sale)
     return db_sale
 
 
-def get_dashboard_stats(db: Session):
-    """Get dashboard statistics"""
-    total_items = db.query(Item).filter(Item.active == True).count()
-    total_sold = db.query(Item).filter(Item.sold_at.isnot(None)).count()
-    total_available = total_items - total_sold
+def delete_sale(db: Session, sale_id: str) -> bool:
+    """Delete a sale and put its item back on sale, in one transaction"""
+    from services.index_outbox import IndexOutboxService
+
+    db_sale = get_sale(db, sale_id)
+    if db_sale is None:
+        return False
+    if db_sale.payout_period_id is not None:
+        raise SaleConflict("Sale already settled in a payout period")
+
+    item = get_item(db, db_sale.sku)
+    if item is not None:
+        item.sold_at = None
+        item.sale_price = None
+        item.channel_sold = None
+        item.days_on_hand = None
+        IndexOutboxService(db).enqueue_unsold(item.sku)
+    db.delete(db_sale)
+    db.commit()
+    return True
 
-    total_sales_value = (
-        db.query(Sale).with_entities(db.func.sum(Sale.sale_price)).scalar() or 0
-    )
 
+def get_dashboard_stats(db: Session):
+    """Get dashboard statistics from the incrementally maintained counters"""
     recent_sales = db.query(Sale).order_by(Sale.date.desc()).limit(10).all()
-
-    return {
-        "total_items": total_items,
-        "total_sold": total_sold,
-        "total_available": total_available,
-        "total_sales_value": float(total_sales_value),
-        "recent_sales": recent_sales,
-    }
+    return dashboard_stats(StatsService(db).counters(), recent_sales)
 
 
 def get_item_by_sku(db: Session, sku: str):
@@ -249,9 +463,24 @@ def update_item(db: Session, sku: str, item_update: ItemUpdate):
 
     # Update only provided fields
     update_data = item_update.dict(exclude_unset=True)
+    if "photos" in update_data:
+        photos = update_data["photos"] or []
+        _update_photo_refs(db, sku, parse_photo_list(db_item.photos) or [], photos)
+        update_data["photos"] = json.dumps(photos) if photos else None
     for field, value in update_data.items():
         setattr(db_item, field, value)
 
     db.commit()
     db.refresh(db_item)
     return db_item
+
+
+def _update_photo_refs(db: Session, sku: str, old_photos: List[str], new_photos: List[str]):
+    """Move an item's blob references from its old photo list to the new one"""
+    from services.blob_store import BlobStore, hash_from_url
+
+    old = {h for h in map(hash_from_url, old_photos) if h}
+    new = [h for h in map(hash_from_url, new_photos) if h]
+    store = BlobStore(db)
+    store.release(sku, old.difference(new))
+    store.acquire(sku, [h for h in new if h not in old])
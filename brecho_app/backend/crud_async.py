@@ -0,0 +1,112 @@
+"""
+Async versions of the crud.py functions behind the list/detail routes.
+
+Routes call them through `run()`, which picks the async function when the
+request has an AsyncSession (DB_ASYNC=true) and otherwise runs the sync
+crud function in the thread pool, so neither path blocks the event loop.
+"""
+import json
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+import crud
+from models import Consignor, Item, Sale, StatsCounter
+from schemas import ConsignorCreate, ItemCreate
+from services.stats import dashboard_stats
+
+
+async def run(crud_fn, db, **kwargs):
+    """Call `crud_fn` or its async twin in this module, depending on the session type"""
+    if isinstance(db, AsyncSession):
+        return await globals()[crud_fn.__name__](db, **kwargs)
+    return await run_in_threadpool(crud_fn, db, **kwargs)
+
+
+async def get_consignor(db: AsyncSession, consignor_id: str):
+    return await db.get(Consignor, consignor_id)
+
+
+async def get_consignors(db: AsyncSession, skip: int = 0, limit: int = 100):
+    result = await db.scalars(
+        select(Consignor).where(Consignor.active == True).offset(skip).limit(limit)
+    )
+    return result.all()
+
+
+async def create_consignor(db: AsyncSession, consignor: ConsignorCreate):
+    db_consignor = Consignor(**consignor.dict())
+    db.add(db_consignor)
+    await db.commit()
+    await db.refresh(db_consignor)
+    return db_consignor
+
+
+async def get_item(db: AsyncSession, sku: str):
+    return await db.get(Item, sku)
+
+
+async def get_item_detail(db: AsyncSession, sku: str):
+    return (await db.scalars(crud.item_detail_query(sku))).first()
+
+
+async def get_items_page(
+    db: AsyncSession,
+    limit: int = 100,
+    consignor_id: Optional[str] = None,
+    category: Optional[str] = None,
+    active: bool = True,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+):
+    query = crud.item_list_query(consignor_id, category, active, cursor)
+    items = (await db.execute(query.offset(skip).limit(limit + 1))).all()
+    return items[:limit], crud.next_item_cursor(items, limit)
+
+
+async def get_items(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    consignor_id: Optional[str] = None,
+    category: Optional[str] = None,
+    active: bool = True,
+):
+    items, _ = await get_items_page(
+        db, limit=limit, consignor_id=consignor_id, category=category, active=active, skip=skip
+    )
+    return items
+
+
+async def create_item(db: AsyncSession, item: ItemCreate):
+    item_data = item.dict()
+
+    # Converter lista de fotos para JSON string se necessário
+    if item_data.get("photos") and isinstance(item_data["photos"], list):
+        item_data["photos"] = json.dumps(item_data["photos"])
+
+    db_item = Item(**item_data)
+    db.add(db_item)
+    await db.commit()
+    await db.refresh(db_item)
+    return db_item
+
+
+async def get_sale(db: AsyncSession, sale_id: str):
+    return await db.get(Sale, sale_id)
+
+
+async def get_sales(db: AsyncSession, skip: int = 0, limit: int = 100):
+    result = await db.scalars(select(Sale).offset(skip).limit(limit))
+    return result.all()
+
+
+async def get_dashboard_stats(db: AsyncSession):
+    """Get dashboard statistics from the incrementally maintained counters"""
+    counters = dict((await db.execute(select(StatsCounter.name, StatsCounter.value))).all())
+    recent_sales = (
+        await db.scalars(select(Sale).order_by(Sale.date.desc()).limit(10))
+    ).all()
+    return dashboard_stats(counters, recent_sales)
@@ -1,12 +1,100 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import settings
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False}  # Only for SQLite
-)
+
+def sqlite_pragmas() -> dict:
+    """
+    Per-connection SQLite settings.
+
+    WAL lets dashboard reads run while an intake writes, and busy_timeout
+    makes writers wait for the lock instead of failing with "database is
+    locked". synchronous=NORMAL is durable in WAL mode except for the last
+    transactions before a power loss.
+    """
+    return {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "cache_size": -settings.SQLITE_CACHE_SIZE_KB,  # negative = KiB
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "temp_store": "MEMORY",
+    }
+
+
+def make_engine(url: str = None, tune: bool = True) -> Engine:
+    """
+    Engine for DATABASE_URL.
+
+    SQLite gets the pragmas above on every new connection; any other URL
+    (e.g. postgresql+psycopg://...) gets a sized, pre-pinged pool.
+    tune=False builds the previous untuned engine, for benchmarks.
+    """
+    url = make_url(url or settings.DATABASE_URL)
+    if url.get_backend_name() != "sqlite":
+        return create_engine(
+            url,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_pre_ping=True,
+            pool_recycle=1800,
+        )
+
+    if not tune:
+        return create_engine(url, connect_args={"check_same_thread": False})
+
+    options = {"connect_args": {"check_same_thread": False}}
+    if url.database not in (None, "", ":memory:"):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    sqlite_engine = create_engine(url, **options)
+    _install_sqlite_pragmas(sqlite_engine)
+    return sqlite_engine
+
+
+def _install_sqlite_pragmas(sync_engine: Engine):
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def make_async_engine(url: str = None) -> AsyncEngine:
+    """Async engine for the same database: aiosqlite for SQLite, asyncpg for Postgres"""
+    url = make_url(url or settings.DATABASE_URL)
+    url = url.set(drivername=_ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+    options = {}
+    if url.database not in (None, "", ":memory:"):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    if url.get_backend_name() == "sqlite":
+        async_engine = create_async_engine(url, **options)
+        _install_sqlite_pragmas(async_engine.sync_engine)
+        return async_engine
+    return create_async_engine(url, pool_pre_ping=True, pool_recycle=1800, **options)
+
+
+engine = make_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
@@ -19,3 +107,26 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Async sessions only exist when DB_ASYNC is enabled for this deployment
+async_engine = make_async_engine() if settings.DB_ASYNC else None
+AsyncSessionLocal = (
+    async_sessionmaker(async_engine, expire_on_commit=False) if async_engine else None
+)
+
+
+async def get_session():
+    """
+    Dependency for routes served by crud_async: an AsyncSession when
+    DB_ASYNC is set, otherwise the regular sync Session.
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            yield session
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
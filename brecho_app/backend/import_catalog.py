@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Importa consignantes e itens da planilha do kit (brecho_kit_pt.xlsx).
+
+Lê a planilha linha a linha e grava em lotes; SKUs/IDs já cadastrados são
+ignorados (ou atualizados com --update), então pode ser rodado de novo
+sem duplicar nada.
+
+Uso:
+    python import_catalog.py ../../brecho_kit_pt.xlsx [--update] [--batch-size 1000]
+"""
+
+import argparse
+import sys
+import os
+
+# Adicionar o diretório do backend ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import SessionLocal, engine
+from models import Base
+from migrations import run_migrations
+from services.catalog_import import CatalogImporter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa o catálogo da planilha do kit")
+    parser.add_argument("path", help="arquivo .xlsx")
+    parser.add_argument("--update", action="store_true", help="atualiza SKUs/IDs já cadastrados")
+    parser.add_argument("--batch-size", type=int, default=None, help="linhas por transação")
+    parser.add_argument("--show-errors", type=int, default=20, help="quantos erros listar")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    db = SessionLocal()
+    try:
+        print(f"📥 Importando {args.path}...")
+        report = CatalogImporter(db, update=args.update, batch_size=args.batch_size).run(args.path)
+    finally:
+        db.close()
+
+    for label, counts in (("Consignantes", report.consignors), ("Itens", report.items)):
+        print(f"   {label:13} {counts.inserted} novos, {counts.updated} atualizados, "
+              f"{counts.skipped} já existentes, {counts.failed} com erro")
+    for error in report.errors[:args.show_errors]:
+        print(f"   ⚠️  {error.sheet} linha {error.row} ({error.key or 'sem chave'}): {error.error}")
+    hidden = report.consignors.failed + report.items.failed - min(len(report.errors), args.show_errors)
+    if hidden > 0:
+        print(f"   ... e mais {hidden} erros")
+    print(f"✅ Concluído em {report.seconds:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
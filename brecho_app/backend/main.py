@@ -1,29 +1,69 @@
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+import asyncio
+import base64
 import uuid
-from typing import List
+from contextlib import asynccontextmanager, suppress
+from typing import List, Optional
 
 from config import settings
-from database import get_db, engine
+from database import get_db, get_session, engine, async_engine
 from models import Base
+from migrations import run_migrations
+from pagination import NEXT_CURSOR_HEADER, InvalidCursor
 from schemas import *
+import crud_async
 from ai_services import ai_service, qr_service
+from services.blob_store import BlobStore, InvalidImageError, is_blob_hash, run_blob_gc
+from request_context import REQUEST_ID_HEADER, request_id_var
 
 # Import audit routes
 from routes.auth_audit import router as auth_audit_router
-
-# Create tables
+from routes.media import MediaStaticFiles, router as media_router
+from routes.analytics import router as analytics_router
+from routes.payouts import router as payouts_router
+from routes.catalog_import import router as catalog_import_router
+from routes.export import router as export_router
+from services import media
+from services.index_outbox import run_index_worker, wake_worker as wake_index_worker
+from services.stats import run_stats_reconciler
+from services.analytics import run_analytics_scheduler
+
+# Create tables, then apply schema changes to existing databases
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled AI gateway client for the whole app lifetime
+    await ai_service.start()
+    index_worker = asyncio.create_task(run_index_worker())
+    stats_reconciler = asyncio.create_task(run_stats_reconciler())
+    analytics_scheduler = asyncio.create_task(run_analytics_scheduler())
+    blob_gc = asyncio.create_task(run_blob_gc())
+    yield
+    for task in (index_worker, stats_reconciler, analytics_scheduler, blob_gc):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await ai_service.close()
+    media.shutdown()
+    if async_engine is not None:
+        await async_engine.dispose()
+
 
 app = FastAPI(
-    title=settings.PROJECT_NAME, openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    title=settings.PROJECT_NAME,
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
-# Mount static files for image serving
-app.mount("/static", StaticFiles(directory=settings.UPLOAD_DIR), name="static")
+# Mount static files for image serving (immutable caching for blob store files)
+app.mount("/static", MediaStaticFiles(directory=settings.UPLOAD_DIR), name="static")
 
 # CORS middleware
 app.add_middleware(
@@ -32,10 +72,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Include audit routes
 app.include_router(auth_audit_router)
+app.include_router(media_router)
+app.include_router(analytics_router)
+app.include_router(payouts_router)
+app.include_router(catalog_import_router)
+app.include_router(export_router)
+
+
+# Propagate a request id to AI gateway calls so traces line up across services
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+    request_id_var.set(request_id)
+    response = await call_next(request)
+    response.headers[REQUEST_ID_HEADER] = request_id
+    return response
 
 security = HTTPBearer()
 
@@ -43,39 +99,43 @@ security = HTTPBearer()
 # Health check
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "brecho-api"}
+    return {
+        "status": "healthy",
+        "service": "brecho-api",
+        "ai_gateway": ai_service.breaker.state,
+    }
 
 
 # Dashboard endpoint
 @app.get(f"{settings.API_V1_STR}/dashboard/stats")
-async def get_dashboard_stats(db: Session = Depends(get_db)):
+async def get_dashboard_stats(db=Depends(get_session)):
     from crud import get_dashboard_stats
 
-    return get_dashboard_stats(db)
+    return await crud_async.run(get_dashboard_stats, db)
 
 
 # Consignors endpoints
 @app.post(f"{settings.API_V1_STR}/consignors/", response_model=Consignor)
-async def create_consignor(consignor: ConsignorCreate, db: Session = Depends(get_db)):
+async def create_consignor(consignor: ConsignorCreate, db=Depends(get_session)):
     from crud import create_consignor
 
-    return create_consignor(db=db, consignor=consignor)
+    return await crud_async.run(create_consignor, db, consignor=consignor)
 
 
 @app.get(f"{settings.API_V1_STR}/consignors/", response_model=List[Consignor])
 async def read_consignors(
-    skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
+    skip: int = 0, limit: int = 100, db=Depends(get_session)
 ):
     from crud import get_consignors
 
-    return get_consignors(db, skip=skip, limit=limit)
+    return await crud_async.run(get_consignors, db, skip=skip, limit=limit)
 
 
 @app.get(f"{settings.API_V1_STR}/consignors/{{consignor_id}}", response_model=Consignor)
-async def read_consignor(consignor_id: str, db: Session = Depends(get_db)):
+async def read_consignor(consignor_id: str, db=Depends(get_session)):
     from crud import get_consignor
 
-    consignor = get_consignor(db, consignor_id=consignor_id)
+    consignor = await crud_async.run(get_consignor, db, consignor_id=consignor_id)
     if consignor is None:
         raise HTTPException(status_code=404, detail="Consignor not found")
     return consignor
@@ -83,38 +143,84 @@ async def read_consignor(consignor_id: str, db: Session = Depends(get_db)):
 
 # Items endpoints
 @app.post(f"{settings.API_V1_STR}/items/", response_model=Item)
-async def create_item(item: ItemCreate, db: Session = Depends(get_db)):
+async def create_item(item: ItemCreate, db=Depends(get_session)):
     from crud import create_item
 
-    return create_item(db=db, item=item)
+    return await crud_async.run(create_item, db, item=item)
 
 
-@app.get(f"{settings.API_V1_STR}/items/", response_model=List[Item])
+@app.get(f"{settings.API_V1_STR}/items/", response_model=List[ItemListEntry])
 async def read_items(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
     consignor_id: str = None,
     category: str = None,
     active: bool = True,
+    skip: int = 0,
+    db=Depends(get_session),
+):
+    """
+    Items, newest first, as lean list rows (full fields on GET /items/{sku}).
+    Pass the X-Next-Cursor response header back as `cursor` for the next
+    page; the header is absent on the last page.
+    `skip` is kept for older clients and still costs a scan of the skipped rows.
+    """
+    from crud import get_items_page
+
+    try:
+        items, next_cursor = await crud_async.run(
+            get_items_page,
+            db,
+            limit=limit,
+            consignor_id=consignor_id,
+            category=category,
+            active=active,
+            cursor=cursor,
+            skip=skip,
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items
+
+
+@app.get(f"{settings.API_V1_STR}/items/search", response_model=List[ItemSearchResult])
+def search_items(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    active: bool = True,
     db: Session = Depends(get_db),
 ):
-    from crud import get_items
-
-    return get_items(
-        db,
-        skip=skip,
-        limit=limit,
-        consignor_id=consignor_id,
-        category=category,
-        active=active,
-    )
+    """Full-text search over titles, brand, category, color, notes, tags and dynamic fields"""
+    from services.search import ItemSearchService
 
+    return ItemSearchService(db).search(q, limit=limit, active=active)
 
-@app.get(f"{settings.API_V1_STR}/items/{{sku}}", response_model=Item)
-async def read_item(sku: str, db: Session = Depends(get_db)):
-    from crud import get_item
 
-    item = get_item(db, sku=sku)
+@app.get(f"{settings.API_V1_STR}/items/hybrid-search", response_model=HybridSearchResponse)
+async def hybrid_search_items(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    active: bool = True,
+    db: Session = Depends(get_db),
+):
+    """
+    Text and photo search fused into one ranking. Falls back to text-only
+    results (image_search=false) when the AI gateway is unavailable.
+    """
+    from services.hybrid_search import HybridSearchService
+
+    results, image_search = await HybridSearchService(db).search(q, limit=limit, active=active)
+    return HybridSearchResponse(results=results, image_search=image_search)
+
+
+@app.get(f"{settings.API_V1_STR}/items/{{sku}}", response_model=ItemDetail)
+async def read_item(sku: str, db=Depends(get_session)):
+    from crud import get_item_detail
+
+    item = await crud_async.run(get_item_detail, db, sku=sku)
     if item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     return item
@@ -132,63 +238,132 @@ async def ai_search_by_image(request: ImageSearchRequest):
     )
 
 
-@app.post(f"{settings.API_V1_STR}/ai/intake", response_model=AIIntakeResponse)
-async def ai_intake_autoregister(request: AIIntakeRequest):
-    """Auto-register items using AI analysis of photos"""
-    if len(request.images) < 1:
-        raise HTTPException(status_code=400, detail="At least 1 image required")
+async def _store_images(db: Session, sources: list) -> List[str]:
+    """Validate and write photos to the blob store in parallel, off the event loop"""
+    try:
+        blobs = await run_in_threadpool(BlobStore(db).put_many, sources)
+    except InvalidImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return [blob.hash for blob in blobs]
 
-    if len(request.images) > 10:
-        raise HTTPException(status_code=400, detail="Maximum 10 images allowed")
 
-    result = await ai_service.intake_autoregister(request.images, request.audio)
+def _unknown_hashes(db: Session, image_hashes: List[str]) -> List[str]:
+    store = BlobStore(db)
+    return [h for h in image_hashes if not is_blob_hash(h) or store.get(h) is None]
+
+
+def _create_intake_item(db: Session, sku: str, proposal: dict, ai_result, image_hashes: List[str]):
+    """Create an item from an intake proposal and reload it and its photos (thread pool)"""
+    from crud import create_item_from_ai_proposal
+
+    item = create_item_from_ai_proposal(db, sku, proposal, ai_result, image_hashes)
+    db.refresh(item)
+    store = BlobStore(db)
+    return item, [store.get(h) for h in image_hashes]
+
+
+def _intake_response(result: dict, image_hashes: List[str]) -> AIIntakeResponse:
     return AIIntakeResponse(
         consignor_id=result.get("consignor_id"),
         proposal=result.get("proposal", {}),
         similar_items=result.get("similar_items", []),
         success=result.get("success", False),
         message=result.get("error"),
+        image_hashes=image_hashes,
     )
 
 
+@app.post(f"{settings.API_V1_STR}/ai/intake", response_model=AIIntakeResponse)
+async def ai_intake_autoregister(request: AIIntakeRequest, db: Session = Depends(get_db)):
+    """Auto-register items using AI analysis of photos"""
+    if len(request.images) < 1:
+        raise HTTPException(status_code=400, detail="At least 1 image required")
+
+    if len(request.images) > 10:
+        raise HTTPException(status_code=400, detail="Maximum 10 images allowed")
+
+    image_hashes = await _store_images(db, request.images)
+    audio = ("audio.wav", base64.b64decode(request.audio), "audio/wav") if request.audio else None
+
+    result = await ai_service.intake_autoregister(image_hashes, audio)
+    return _intake_response(result, image_hashes)
+
+
+@app.post(f"{settings.API_V1_STR}/ai/intake/upload", response_model=AIIntakeResponse)
+async def ai_intake_upload(
+    images: List[UploadFile] = File(...),
+    audio: Optional[UploadFile] = File(None),
+    db: Session = Depends(get_db),
+):
+    """Auto-register items from multipart photo/audio uploads"""
+    if len(images) < 1:
+        raise HTTPException(status_code=400, detail="At least 1 image required")
+
+    if len(images) > 10:
+        raise HTTPException(status_code=400, detail="Maximum 10 images allowed")
+
+    # Photos are written once to the blob store; the gateway reads them by hash
+    image_hashes = await _store_images(db, [f.file for f in images])
+
+    result = await ai_service.intake_autoregister(
+        image_hashes,
+        (audio.filename, audio.file, audio.content_type or "audio/wav") if audio else None,
+    )
+    return _intake_response(result, image_hashes)
+
+
 @app.post(f"{settings.API_V1_STR}/ai/confirm-intake")
 async def confirm_ai_intake(request_data: dict, db: Session = Depends(get_db)):
     """Confirm and create item from AI intake proposal"""
-    from crud import create_item_from_ai_proposal
-
     sku = request_data.get("sku")
     proposal = request_data.get("proposal")
-    images = request_data.get("images", [])
+    image_hashes = request_data.get("image_hashes") or []
 
     if not sku or not proposal:
         raise HTTPException(status_code=400, detail="SKU and proposal required")
 
-    # Index item in AI vector database
-    ai_result = await ai_service.index_item(sku, images, proposal.get("cadastro", {}))
+    # Older clients still send the photos themselves
+    if not image_hashes and request_data.get("images"):
+        image_hashes = await _store_images(db, request_data["images"])
+
+    unknown = await run_in_threadpool(_unknown_hashes, db, image_hashes)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown image hash: {unknown[0]}")
 
-    # Create item in main database (pass images for saving)
-    item = create_item_from_ai_proposal(db, sku, proposal, ai_result, images)
+    # Create item in main database, referencing the stored photos; vector
+    # indexing is queued in the same transaction and runs in the background
+    item, blobs = await run_in_threadpool(
+        _create_intake_item, db, sku, proposal, None, image_hashes
+    )
+    wake_index_worker()
+    media.pregenerate(blobs)
 
     return {
         "success": True,
         "item": item,
-        "ai_indexed": ai_result.get("success", False) if ai_result else False,
+        "index_status": item.index_status,
     }
 
 
 @app.post(
     f"{settings.API_V1_STR}/ai/dynamic-fields", response_model=DynamicFieldsResponse
 )
-async def get_dynamic_fields(request: DynamicFieldsRequest):
+async def get_dynamic_fields(request: DynamicFieldsRequest, db: Session = Depends(get_db)):
     """Generate dynamic fields for item registration based on category"""
     from schemas import DynamicFieldsResponse
 
+    # Photos are referenced by the hashes returned from the intake analysis
+    image_hashes = request.image_hashes or []
+    unknown = await run_in_threadpool(_unknown_hashes, db, image_hashes)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown image hash: {unknown[0]}")
+
     try:
         result = await ai_service.generate_dynamic_fields(
             category=request.category,
             subcategory=request.subcategory,
             brand=request.brand,
-            images_b64=request.images,
+            image_hashes=image_hashes,
         )
 
         return DynamicFieldsResponse(
@@ -221,8 +396,9 @@ async def mobile_quick_intake(
 ):
     """Quick intake for mobile app - simplified workflow"""
 
-    # Run AI analysis
-    ai_result = await ai_service.intake_autoregister(request.images)
+    # Store photos once, then run AI analysis on them by hash
+    image_hashes = await _store_images(db, request.images)
+    ai_result = await ai_service.intake_autoregister(image_hashes)
 
     if not ai_result.get("success"):
         raise HTTPException(status_code=500, detail="AI analysis failed")
@@ -240,14 +416,11 @@ async def mobile_quick_intake(
 
     if not needs_review:
         # Auto-create item
-        from crud import create_item_from_ai_proposal
-
-        create_item_from_ai_proposal(db, item_sku, proposal, ai_result)
-
-        # Index in AI database
-        await ai_service.index_item(
-            item_sku, request.images, proposal.get("cadastro", {})
+        _, blobs = await run_in_threadpool(
+            _create_intake_item, db, item_sku, proposal, ai_result, image_hashes
         )
+        wake_index_worker()
+        media.pregenerate(blobs)
 
     return QuickIntakeResponse(
         item_sku=item_sku,
@@ -260,77 +433,136 @@ async def mobile_quick_intake(
 @app.patch(f"{settings.API_V1_STR}/items/{{sku}}", response_model=Item)
 async def update_item(sku: str, item_update: ItemUpdate, db: Session = Depends(get_db)):
     """Update an item (partial update)"""
-    from crud import get_item_by_sku, update_item
+    from crud import update_item
 
-    # Check if item exists
-    db_item = get_item_by_sku(db, sku=sku)
+    # Photos removed from the item release their stored blobs
+    try:
+        db_item = await run_in_threadpool(update_item, db, sku, item_update)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if db_item is None:
         raise HTTPException(status_code=404, detail="Item not found")
+    return db_item
+
+
+@app.post(f"{settings.API_V1_STR}/items/{{sku}}/reindex")
+async def reindex_item(sku: str, db: Session = Depends(get_db)):
+    """Queue an item's photos for AI vector indexing again (e.g. after a failed index)"""
+    from crud import get_item_by_sku
+    from services.blob_store import hash_from_url
+    from services.index_outbox import IndexOutboxService
+
+    def requeue() -> str:
+        db_item = get_item_by_sku(db, sku=sku)
+        if db_item is None:
+            raise HTTPException(status_code=404, detail="Item not found")
 
-    # Update item
-    return update_item(db=db, sku=sku, item_update=item_update)
+        photos = Item.model_validate(db_item).photos or []
+        image_hashes = [h for h in map(hash_from_url, photos) if h]
+        if not image_hashes:
+            raise HTTPException(status_code=400, detail="Item has no stored photos to index")
+
+        IndexOutboxService(db).enqueue(db_item, image_hashes)
+        db.commit()
+        return db_item.index_status
+
+    index_status = await run_in_threadpool(requeue)
+    wake_index_worker()
+    return {"success": True, "index_status": index_status}
 
 
 # Sales endpoints
 @app.get(f"{settings.API_V1_STR}/sales/", response_model=List[Sale])
-async def read_sales(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def read_sales(skip: int = 0, limit: int = 100, db=Depends(get_session)):
     """Get all sales"""
     from crud import get_sales
 
-    return get_sales(db, skip=skip, limit=limit)
+    return await crud_async.run(get_sales, db, skip=skip, limit=limit)
 
 
 @app.get(f"{settings.API_V1_STR}/sales/{{sale_id}}", response_model=Sale)
-async def read_sale(sale_id: str, db: Session = Depends(get_db)):
+async def read_sale(sale_id: str, db=Depends(get_session)):
     """Get a specific sale by ID"""
     from crud import get_sale
 
-    db_sale = get_sale(db, sale_id=sale_id)
+    db_sale = await crud_async.run(get_sale, db, sale_id=sale_id)
     if db_sale is None:
         raise HTTPException(status_code=404, detail="Sale not found")
     return db_sale
 
 
+def _sale_error(e):
+    from crud import ItemNotFound
+
+    status_code = 404 if isinstance(e, ItemNotFound) else 409
+    return HTTPException(status_code=status_code, detail=str(e))
+
+
 @app.post(f"{settings.API_V1_STR}/sales/", response_model=Sale)
 async def create_sale(sale: SaleCreate, db: Session = Depends(get_db)):
-    """Create a new sale"""
-    from crud import create_sale
+    """Create a new sale; 409 if the item is already sold"""
+    from crud import SaleError, create_sale
 
-    return create_sale(db=db, sale=sale)
+    try:
+        db_sale = await run_in_threadpool(create_sale, db, sale)
+    except SaleError as e:
+        raise _sale_error(e)
+
+    # Sold prices reach the gateway's neighbor-based pricing through the outbox
+    wake_index_worker()
+    return db_sale
+
+
+@app.post(f"{settings.API_V1_STR}/sales/checkout", response_model=CheckoutResponse)
+async def checkout(payload: SaleCheckout, db: Session = Depends(get_db)):
+    """Sell several items to one customer: all of them are sold, or none"""
+    from datetime import datetime
+    from crud import SaleError, register_sales
+
+    shared = payload.dict(exclude={"items", "date"})
+    when = payload.date or datetime.now()
+    sales = [
+        SaleCreate(id=str(uuid.uuid4())[:8].upper(), date=when, **shared, **item.dict())
+        for item in payload.items
+    ]
+    try:
+        db_sales = await run_in_threadpool(register_sales, db, sales)
+    except SaleError as e:
+        raise _sale_error(e)
+
+    wake_index_worker()
+    return CheckoutResponse(
+        sales=db_sales, total=round(sum(sale.sale_price for sale in db_sales), 2)
+    )
 
 
 @app.put(f"{settings.API_V1_STR}/sales/{{sale_id}}", response_model=Sale)
 async def update_sale(sale_id: str, sale: SaleCreate, db: Session = Depends(get_db)):
-    """Update a sale"""
-    from crud import get_sale, update_sale
+    """Update a sale and its item's sold price, channel and date"""
+    from crud import SaleError, update_sale
 
-    # Check if sale exists
-    db_sale = get_sale(db, sale_id=sale_id)
+    try:
+        db_sale = await run_in_threadpool(update_sale, db, sale_id, sale)
+    except SaleError as e:
+        raise _sale_error(e)
     if db_sale is None:
         raise HTTPException(status_code=404, detail="Sale not found")
-
-    # Update sale
-    for field, value in sale.dict(exclude_unset=True).items():
-        setattr(db_sale, field, value)
-
-    db.commit()
-    db.refresh(db_sale)
+    wake_index_worker()
     return db_sale
 
 
 @app.delete(f"{settings.API_V1_STR}/sales/{{sale_id}}")
 async def delete_sale(sale_id: str, db: Session = Depends(get_db)):
-    """Delete a sale"""
-    from crud import get_sale
+    """Delete a sale and put its item back on sale"""
+    from crud import SaleError, delete_sale
 
-    # Check if sale exists
-    db_sale = get_sale(db, sale_id=sale_id)
-    if db_sale is None:
+    try:
+        deleted = await run_in_threadpool(delete_sale, db, sale_id)
+    except SaleError as e:
+        raise _sale_error(e)
+    if not deleted:
         raise HTTPException(status_code=404, detail="Sale not found")
-
-    # Delete sale
-    db.delete(db_sale)
-    db.commit()
+    wake_index_worker()
     return {"message": "Sale deleted successfully"}
 
 
@@ -0,0 +1,194 @@
+"""
+Schema changes that Base.metadata.create_all cannot make on an existing
+database (new columns, indexes on existing tables).
+
+Each step runs once and is recorded in the schema_migrations table. Steps
+check before altering, so a database freshly created from the current
+models runs them as no-ops. A step that returns False could not be applied
+yet (e.g. data must be fixed first); it is not recorded and runs again on
+the next startup.
+"""
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+
+def _add_column(conn: Connection, table: str, column: str, ddl: str):
+    if column not in {c["name"] for c in inspect(conn).get_columns(table)}:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def _create_index(conn: Connection, name: str, table: str, columns: str, unique: bool = False):
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    conn.execute(text(f"CREATE {kind} IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+def add_item_index_status(conn: Connection):
+    _add_column(conn, "items", "index_status", "VARCHAR")
+
+
+def add_item_list_indexes(conn: Connection):
+    # Keyset pagination needs a sort key on every row
+    conn.execute(text(
+        "UPDATE items SET created_at = COALESCE(acquired_at, CURRENT_TIMESTAMP) "
+        "WHERE created_at IS NULL"
+    ))
+    _create_index(conn, "ix_items_active_created", "items", "active, created_at, sku")
+    _create_index(
+        conn, "ix_items_consignor_active_created", "items", "consignor_id, active, created_at, sku"
+    )
+    _create_index(
+        conn, "ix_items_category_active_created", "items", "category, active, created_at, sku"
+    )
+    _create_index(conn, "ix_items_sold_at", "items", "sold_at")
+
+
+# Catalog text search (SQLite FTS5). Accents are folded by the tokenizer
+# and prefix indexes make "vestid" match "vestidos". Rows share the items
+# rowid; that is not stable across VACUUM, so rebuild_items_fts after one.
+ITEMS_FTS_COLUMNS = ("title_ig", "summary_title", "brand", "category", "color", "notes", "tags")
+
+# BM25 weight per FTS column: sku, the columns above, then dynamic field values
+ITEMS_FTS_WEIGHTS = (0.0, 10.0, 8.0, 5.0, 4.0, 3.0, 1.0, 2.0, 1.0)
+
+_DYNAMIC_VALUES = (
+    "(SELECT group_concat(field_value, ' ') FROM item_dynamic_fields "
+    "WHERE item_sku = {sku})"
+)
+
+
+def _fts_values(row: str) -> str:
+    columns = ", ".join(f"{row}.{c}" for c in ITEMS_FTS_COLUMNS)
+    return f"{row}.rowid, {row}.sku, {columns}, {_DYNAMIC_VALUES.format(sku=row + '.sku')}"
+
+
+def rebuild_items_fts(conn: Connection):
+    """Refill items_fts from items and item_dynamic_fields"""
+    columns = ", ".join(ITEMS_FTS_COLUMNS)
+    conn.execute(text("DELETE FROM items_fts"))
+    conn.execute(text(
+        f"INSERT INTO items_fts (rowid, sku, {columns}, dynamic) "
+        f"SELECT {_fts_values('items')} FROM items"
+    ))
+
+
+def add_items_fts(conn: Connection):
+    if conn.dialect.name != "sqlite":
+        return  # other databases use the LIKE fallback in services/search.py
+
+    # Triggers look up an item's dynamic field values on every write
+    _create_index(
+        conn, "ix_item_dynamic_fields_item_sku", "item_dynamic_fields", "item_sku"
+    )
+
+    columns = ", ".join(ITEMS_FTS_COLUMNS)
+    weights = ", ".join(str(w) for w in ITEMS_FTS_WEIGHTS)
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5("
+        f"sku UNINDEXED, {columns}, dynamic, "
+        f"tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    ))
+    conn.execute(text(f"INSERT INTO items_fts (items_fts, rank) VALUES ('rank', 'bm25({weights})')"))
+
+    new_values = _fts_values("NEW")
+    refresh_dynamic = (
+        "UPDATE items_fts SET dynamic = {values} "
+        "WHERE rowid = (SELECT rowid FROM items WHERE sku = {sku});"
+    )
+    for ddl in (
+        f"CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON items BEGIN "
+        f"INSERT INTO items_fts (rowid, sku, {columns}, dynamic) VALUES ({new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS items_fts_update AFTER UPDATE OF sku, {columns} ON items BEGIN "
+        f"DELETE FROM items_fts WHERE rowid = OLD.rowid; "
+        f"INSERT INTO items_fts (rowid, sku, {columns}, dynamic) VALUES ({new_values}); END",
+        "CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON items BEGIN "
+        "DELETE FROM items_fts WHERE rowid = OLD.rowid; END",
+        "CREATE TRIGGER IF NOT EXISTS items_fts_dynamic_insert AFTER INSERT ON item_dynamic_fields BEGIN "
+        + refresh_dynamic.format(values=_DYNAMIC_VALUES.format(sku="NEW.item_sku"), sku="NEW.item_sku")
+        + " END",
+        "CREATE TRIGGER IF NOT EXISTS items_fts_dynamic_update AFTER UPDATE ON item_dynamic_fields BEGIN "
+        + refresh_dynamic.format(values=_DYNAMIC_VALUES.format(sku="OLD.item_sku"), sku="OLD.item_sku")
+        + refresh_dynamic.format(values=_DYNAMIC_VALUES.format(sku="NEW.item_sku"), sku="NEW.item_sku")
+        + " END",
+        "CREATE TRIGGER IF NOT EXISTS items_fts_dynamic_delete AFTER DELETE ON item_dynamic_fields BEGIN "
+        + refresh_dynamic.format(values=_DYNAMIC_VALUES.format(sku="OLD.item_sku"), sku="OLD.item_sku")
+        + " END",
+    ):
+        conn.execute(text(ddl))
+
+    rebuild_items_fts(conn)
+
+
+def add_sales_date_index(conn: Connection):
+    # Recent sales on the dashboard; stats_counters itself comes from create_all
+    _create_index(conn, "ix_sales_date", "sales", "date")
+
+
+def add_sale_payout_period(conn: Connection):
+    # payout_periods/payout_statements themselves come from create_all
+    _add_column(conn, "sales", "payout_period_id", "INTEGER REFERENCES payout_periods(id)")
+    _create_index(conn, "ix_sales_payout_period_date", "sales", "payout_period_id, date")
+
+
+def add_sales_sku_unique(conn: Connection):
+    duplicated = conn.execute(text(
+        "SELECT sku FROM sales GROUP BY sku HAVING COUNT(*) > 1 ORDER BY sku"
+    )).scalars().all()
+    if duplicated:
+        # Which sale is the real one is for the shop to decide, not a migration.
+        # register_sales still refuses to sell an item twice without the index.
+        logger.warning(
+            f"Items sold more than once: {', '.join(duplicated)}. "
+            "Delete the wrong sales (DELETE /api/v1/sales/{id}); the unique "
+            "index on sales.sku is created on the first startup without duplicates."
+        )
+        return False
+    _create_index(conn, "ux_sales_sku", "sales", "sku", unique=True)
+
+
+def add_index_outbox_kind(conn: Connection):
+    # Sold-price reports share the outbox with vector-index jobs
+    _add_column(conn, "index_outbox", "kind", "VARCHAR NOT NULL DEFAULT 'index'")
+
+
+def add_blob_last_seen(conn: Connection):
+    # SQLite cannot add a column defaulting to CURRENT_TIMESTAMP; backfill instead
+    _add_column(conn, "blobs", "last_seen_at", "TIMESTAMP")
+    conn.execute(text("UPDATE blobs SET last_seen_at = created_at WHERE last_seen_at IS NULL"))
+
+
+# (id, step) in application order; never reorder or rename applied ids
+MIGRATIONS = [
+    ("0001_item_index_status", add_item_index_status),
+    ("0002_item_list_indexes", add_item_list_indexes),
+    ("0003_items_fts", add_items_fts),
+    ("0004_sales_date_index", add_sales_date_index),
+    ("0005_sale_payout_period", add_sale_payout_period),
+    ("0006_sales_sku_unique", add_sales_sku_unique),
+    ("0007_index_outbox_kind", add_index_outbox_kind),
+    ("0008_blob_last_seen", add_blob_last_seen),
+]
+
+
+def run_migrations(engine: Engine):
+    """Apply pending migrations, each in the same transaction as its record"""
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "id VARCHAR PRIMARY KEY, applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        ))
+    for migration_id, step in MIGRATIONS:
+        with engine.begin() as conn:
+            applied = conn.execute(
+                text("SELECT 1 FROM schema_migrations WHERE id = :id"), {"id": migration_id}
+            ).first()
+            if applied:
+                continue
+            if step(conn) is False:
+                continue
+            conn.execute(
+                text("INSERT INTO schema_migrations (id) VALUES (:id)"), {"id": migration_id}
+            )
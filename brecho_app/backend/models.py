@@ -4,9 +4,12 @@ from sqlalchemy import (
     Float,
     Integer,
     Text,
+    Date,
     DateTime,
     Boolean,
     ForeignKey,
+    Index,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -33,6 +36,13 @@ class Consignor(Base):
 
 class Item(Base):
     __tablename__ = "items"
+    # List filters (crud.item_list_query) followed by its (created_at, sku) order
+    __table_args__ = (
+        Index("ix_items_active_created", "active", "created_at", "sku"),
+        Index("ix_items_consignor_active_created", "consignor_id", "active", "created_at", "sku"),
+        Index("ix_items_category_active_created", "category", "active", "created_at", "sku"),
+        Index("ix_items_sold_at", "sold_at"),
+    )
 
     sku = Column(String, primary_key=True, index=True)
     consignor_id = Column(String, ForeignKey("consignors.id"))
@@ -88,6 +98,7 @@ class Item(Base):
     # AI fields
     ai_confidence = Column(Float)  # Confidence in AI categorization
     ai_similar_items = Column(Text)  # JSON of similar items found
+    index_status = Column(String)  # pending | indexed | failed (AI vector index)
 
     # Relationships
     consignor = relationship("Consignor", back_populates="items")
@@ -100,7 +111,7 @@ class ItemDynamicField(Base):
     __tablename__ = "item_dynamic_fields"
 
     id = Column(Integer, primary_key=True, index=True)
-    item_sku = Column(String, ForeignKey("items.sku"), nullable=False)
+    item_sku = Column(String, ForeignKey("items.sku"), nullable=False, index=True)
     field_name = Column(String, nullable=False)
     field_value = Column(Text)
     field_type = Column(String, default="text")  # text, select, number, etc.
@@ -116,15 +127,62 @@ Item.dynamic_fields = relationship(
 )
 
 
+class Blob(Base):
+    """Content-addressed file in the upload store, named by its SHA-256"""
+
+    __tablename__ = "blobs"
+
+    hash = Column(String, primary_key=True)
+    size = Column(Integer, nullable=False)
+    content_type = Column(String)
+    ext = Column(String, nullable=False)
+    refcount = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, server_default=func.now())
+    last_seen_at = Column(DateTime, server_default=func.now())  # last upload or release
+
+
+class BlobRef(Base):
+    """One owner (e.g. an item SKU) holding a reference to a blob"""
+
+    __tablename__ = "blob_refs"
+
+    blob_hash = Column(String, ForeignKey("blobs.hash"), primary_key=True)
+    owner = Column(String, primary_key=True, index=True)
+    created_at = Column(DateTime, server_default=func.now())
+
+
+class IndexOutbox(Base):
+    """AI gateway job for an item, written with the item or sale and run by the index worker"""
+
+    __tablename__ = "index_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    item_sku = Column(String, ForeignKey("items.sku"), nullable=False, index=True)
+    kind = Column(String, nullable=False, default="index", server_default="index")  # index | sold | unsold
+    payload = Column(Text, nullable=False)  # JSON: image_hashes, metadata | sale_price, ...
+    status = Column(String, nullable=False, default="pending", index=True)  # pending | done | failed | superseded
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, server_default=func.now())
+    last_error = Column(Text)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
 class Sale(Base):
     __tablename__ = "sales"
+    __table_args__ = (
+        # Unsettled sales up to a period end (services/payouts.py)
+        Index("ix_sales_payout_period_date", "payout_period_id", "date"),
+        # An item is sold at most once (crud.register_sales)
+        Index("ux_sales_sku", "sku", unique=True),
+    )
 
     id = Column(String, primary_key=True, index=True)
     sku = Column(String, ForeignKey("items.sku"), nullable=False)
     consignor_id = Column(String, ForeignKey("consignors.id"))
 
     # Sale details
-    date = Column(DateTime, nullable=False)
+    date = Column(DateTime, nullable=False, index=True)
     sale_price = Column(Float, nullable=False)
     discount_value = Column(Float, default=0)
 
@@ -136,6 +194,9 @@ class Sale(Base):
     # Payment
     payment_method = Column(String)
 
+    # Settlement
+    payout_period_id = Column(Integer, ForeignKey("payout_periods.id"))  # set when closed
+
     # Meta
     notes = Column(Text)
     created_at = Column(DateTime, server_default=func.now())
@@ -144,6 +205,45 @@ class Sale(Base):
     item = relationship("Item", back_populates="sales")
 
 
+class PayoutPeriod(Base):
+    """Closed consignor settlement (repasse) period; dates are inclusive"""
+
+    __tablename__ = "payout_periods"
+
+    id = Column(Integer, primary_key=True, index=True)
+    start_date = Column(Date)  # None for the first period: every earlier sale
+    end_date = Column(Date, nullable=False, unique=True)
+    closed_at = Column(DateTime, server_default=func.now())
+
+    statements = relationship("PayoutStatement", back_populates="period")
+
+
+class PayoutStatement(Base):
+    """What one consignor is owed for the sales settled in a period"""
+
+    __tablename__ = "payout_statements"
+    __table_args__ = (UniqueConstraint("period_id", "consignor_id"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    period_id = Column(Integer, ForeignKey("payout_periods.id"), nullable=False)
+    consignor_id = Column(String, ForeignKey("consignors.id"), nullable=False, index=True)
+    items_sold = Column(Integer, nullable=False)
+    net_sales = Column(Float, nullable=False)
+    percent = Column(Float, nullable=False)  # consignor's share when the period closed
+    consignor_amount = Column(Float, nullable=False)
+    store_amount = Column(Float, nullable=False)
+    pix_key = Column(String)
+    status = Column(String, nullable=False, default="pendente")  # pendente | pago
+    paid_at = Column(DateTime)
+
+    period = relationship("PayoutPeriod", back_populates="statements")
+    consignor = relationship("Consignor")
+
+    @property
+    def consignor_name(self):
+        return self.consignor.name if self.consignor else None
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -235,3 +335,13 @@ class UserActivity(Base):
 
     # Relacionamento
     access_log = relationship("UserAccessLog")
+
+
+class StatsCounter(Base):
+    """Dashboard counter kept up to date on item/sale writes (services/stats.py)"""
+
+    __tablename__ = "stats_counters"
+
+    name = Column(String, primary_key=True)  # e.g. items.active, channel.loja.revenue
+    value = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,57 @@
+"""
+Opaque cursors for keyset pagination.
+
+A cursor encodes the sort key of the last row of a page, so the next page
+starts with an indexed range condition instead of OFFSET, which has to
+read and discard every row before it.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+from sqlalchemy import DateTime, String
+from sqlalchemy.types import TypeDecorator
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, key: str) -> str:
+    raw = json.dumps([created_at.isoformat(), key], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, key = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(key)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+class CursorTimestamp(TypeDecorator):
+    """
+    Binds a cursor's timestamp the way the column stores it.
+
+    SQLite keeps DateTime as text: CURRENT_TIMESTAMP defaults have no
+    fraction while SQLAlchemy binds ".000000", which would make a row
+    compare greater than its own cursor.
+    """
+
+    impl = DateTime
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(String())
+        return dialect.type_descriptor(DateTime())
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and dialect.name == "sqlite":
+            return value.isoformat(sep=" ")
+        return value
@@ -0,0 +1,13 @@
+"""Request id shared between incoming API requests and outgoing AI gateway calls"""
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+def outgoing_headers() -> Dict[str, str]:
+    """Headers that propagate the current request id to the AI gateway"""
+    request_id = request_id_var.get()
+    return {REQUEST_ID_HEADER: request_id} if request_id else {}
@@ -0,0 +1,79 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Response
+from config import settings
+from services import analytics
+
+router = APIRouter(prefix=f"{settings.API_V1_STR}/analytics", tags=["analytics"])
+
+# Reports only change when a new snapshot lands (at most daily)
+REPORT_CACHE = "private, max-age=300"
+
+
+def _report(response: Response, name: str, **params) -> dict:
+    try:
+        report = analytics.engine.report(name, **params)
+    except analytics.SnapshotMissing as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    response.headers["Cache-Control"] = REPORT_CACHE
+    return report
+
+
+def _dimension(by: str, allowed: set) -> str:
+    if by not in allowed:
+        raise HTTPException(status_code=400, detail=f"by must be one of {sorted(allowed)}")
+    return by
+
+
+@router.get("/sell-through")
+def sell_through(
+    response: Response,
+    by: str = "category",
+    days: Optional[int] = Query(None, ge=1, description="only items received in the last N days"),
+):
+    """Received vs sold items and average days to sell, per group"""
+    by = _dimension(by, analytics.SELL_THROUGH_DIMENSIONS)
+    return _report(response, "sell_through", by=by, days=days)
+
+
+@router.get("/aging")
+def aging(response: Response, by: Optional[str] = None):
+    """Unsold stock (count, list value, cost) by days on hand"""
+    if by is not None:
+        _dimension(by, analytics.SELL_THROUGH_DIMENSIONS)
+    return _report(response, "aging", by=by)
+
+
+@router.get("/revenue")
+def revenue(
+    response: Response,
+    by: str = "category",
+    days: Optional[int] = Query(None, ge=1, description="only sales in the last N days"),
+):
+    """Revenue, sales count, average ticket and discounts per group"""
+    by = _dimension(by, analytics.REVENUE_DIMENSIONS)
+    return _report(response, "revenue", by=by, days=days)
+
+
+@router.get("/markdown")
+def markdown(response: Response):
+    """Sell-through, days to sell and price realization per markdown stage"""
+    return _report(response, "markdown")
+
+
+@router.get("/snapshot")
+def snapshot_status():
+    try:
+        return {"snapshot_at": analytics.engine.snapshot_at()}
+    except analytics.SnapshotMissing:
+        return {"snapshot_at": None}
+
+
+@router.post("/snapshot")
+async def take_snapshot(force: bool = False):
+    """Refresh the Parquet snapshot now; refused in business hours unless forced"""
+    if analytics.in_business_hours() and not force:
+        raise HTTPException(
+            status_code=409,
+            detail="Snapshots read the whole database; run outside business hours or pass force=true",
+        )
+    return {"snapshot_at": await analytics.refresh_snapshot()}
@@ -0,0 +1,26 @@
+import zipfile
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from openpyxl.utils.exceptions import InvalidFileException
+from sqlalchemy.orm import Session
+from config import settings
+from database import get_db
+from schemas import ImportReport
+from services.catalog_import import CatalogImporter
+
+router = APIRouter(prefix=f"{settings.API_V1_STR}/import", tags=["import"])
+
+
+@router.post("/catalog", response_model=ImportReport)
+def import_catalog(
+    file: UploadFile = File(..., description="Spreadsheet kit (.xlsx) with Consignantes/Itens sheets"),
+    update: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    Bulk import consignors and items from the spreadsheet kit. Existing
+    IDs/SKUs are skipped unless `update=true`; invalid rows are reported.
+    """
+    try:
+        return CatalogImporter(db, update=update).run(file.file)
+    except (InvalidFileException, zipfile.BadZipFile) as e:
+        raise HTTPException(status_code=400, detail=f"Not a readable .xlsx workbook: {e}")
@@ -0,0 +1,54 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from config import settings
+from services import export
+
+router = APIRouter(prefix=f"{settings.API_V1_STR}/export", tags=["export"])
+
+
+def export_response(data: export.Export, fmt: str) -> StreamingResponse:
+    """Chunked download of an export as CSV or XLSX"""
+    if fmt not in export.MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of {sorted(export.MEDIA_TYPES)}")
+    return StreamingResponse(
+        export.encode(data, fmt),
+        media_type=export.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{data.name}.{fmt}"'},
+    )
+
+
+@router.get("/items.{fmt}")
+def export_items(
+    fmt: str,
+    active: Optional[bool] = None,
+    consignor_id: Optional[str] = None,
+    category: Optional[str] = None,
+    sold: Optional[bool] = None,
+):
+    """Items in the columns of the kit's Itens sheet (re-importable)"""
+    return export_response(export.items_export(active, consignor_id, category, sold), fmt)
+
+
+@router.get("/sales.{fmt}")
+def export_sales(
+    fmt: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    consignor_id: Optional[str] = None,
+    channel: Optional[str] = None,
+):
+    """Sales in the columns of the kit's Vendas sheet; dates are inclusive"""
+    return export_response(export.sales_export(start_date, end_date, consignor_id, channel), fmt)
+
+
+@router.get("/statements.{fmt}")
+def export_statements(
+    fmt: str,
+    period_id: Optional[int] = None,
+    consignor_id: Optional[str] = None,
+    status: Optional[str] = None,
+):
+    """Consignor payout statements in the columns of the Repasses sheet"""
+    return export_response(export.statements_export(period_id, consignor_id, status), fmt)
@@ -0,0 +1,132 @@
+import os
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse, RedirectResponse, Response
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from sqlalchemy.orm import Session
+from database import get_db
+from services.blob_store import BlobStore, is_blob_hash
+from services import media
+
+router = APIRouter()
+
+# Content-addressed URLs never change meaning, so browsers and the CDN may keep them forever
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+def negotiate_format(accept: str) -> str:
+    """Best derivative format the client accepts: AVIF, then WebP, then JPEG"""
+    accept = accept or ""
+    if "image/avif" in accept and "avif" in media.FORMATS:
+        return "avif"
+    if "image/webp" in accept:
+        return "webp"
+    return "jpeg"
+
+
+def etag_matches(request_headers: Headers, etag: str) -> bool:
+    if_none_match = request_headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def _redirect_to_current(request: Request, blob_hash: str, size: str, ext: str) -> Response:
+    url = media.media_url(blob_hash, size, ext or None)
+    if request.url.query:
+        url = f"{url}?{request.url.query}"
+    return RedirectResponse(url, status_code=301)
+
+
+@router.get("/media/v{version:int}/{blob_hash}/{variant}")
+async def get_media(
+    request: Request,
+    version: int,
+    blob_hash: str,
+    variant: str,
+    format: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Serve a resized photo derivative, rendering it on first request.
+
+    `variant` is a size (thumb, medium, full), optionally with the format as
+    extension (thumb.webp). Without one the format is negotiated from the
+    Accept header and the response varies on it. URLs of an older
+    media.MEDIA_VERSION redirect to the current rendering.
+    """
+    size, _, ext = variant.partition(".")
+    fmt = ext or format
+    negotiated = fmt is None
+    if negotiated:
+        fmt = negotiate_format(request.headers.get("accept"))
+    if size not in media.SIZES:
+        raise HTTPException(status_code=404, detail="Unknown size")
+    if fmt not in media.FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported format")
+    if not is_blob_hash(blob_hash):
+        raise HTTPException(status_code=404, detail="Image not found")
+    if version != media.MEDIA_VERSION:
+        return _redirect_to_current(request, blob_hash, size, ext)
+
+    headers = {
+        "Cache-Control": IMMUTABLE,
+        "ETag": f'"{blob_hash}-{size}.{fmt}.v{media.MEDIA_VERSION}"',
+    }
+    if negotiated:
+        headers["Vary"] = "Accept"
+
+    # The URL identifies the bytes, so a revalidation needs neither the DB nor a render
+    if etag_matches(request.headers, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    blob = await run_in_threadpool(BlobStore(db).get, blob_hash)
+    if blob is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    try:
+        path = await media.ensure_derivative(blob, size, fmt)
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Could not render image: {str(e)}")
+
+    # FileResponse answers Range requests with 206 partial content
+    return FileResponse(path, media_type=media.FORMATS[fmt][1], headers=headers)
+
+
+@router.get("/media/{blob_hash}/{variant}")
+async def get_unversioned_media(request: Request, blob_hash: str, variant: str):
+    """Derivative URLs from before MEDIA_VERSION: redirect to the current rendering"""
+    if not is_blob_hash(blob_hash):
+        raise HTTPException(status_code=404, detail="Image not found")
+    size, _, ext = variant.partition(".")
+    return _redirect_to_current(request, blob_hash, size, ext)
+
+
+class MediaStaticFiles(StaticFiles):
+    """
+    Uploads mount with cache headers.
+
+    Blob store files are named by their SHA-256, so they get a strong ETag and
+    an immutable Cache-Control; legacy per-item uploads can be overwritten in
+    place and are revalidated on every use.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+
+        name = os.path.basename(str(full_path))
+        blob_hash = name.split(".", 1)[0]
+        if is_blob_hash(blob_hash):
+            response.headers["ETag"] = f'"{blob_hash}"'
+            response.headers["Cache-Control"] = IMMUTABLE
+        else:
+            response.headers["Cache-Control"] = REVALIDATE
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,70 @@
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from config import settings
+from database import get_db
+from schemas import PayoutClose, PayoutPeriod, PayoutPeriodDetail, PayoutPreview, PayoutStatement, Sale
+from routes.export import export_response
+from services.export import statements_export
+from services.payouts import PayoutError, PayoutService
+
+router = APIRouter(prefix=f"{settings.API_V1_STR}/payouts", tags=["payouts"])
+
+
+def _period_or_404(service: PayoutService, period_id: int):
+    period = service.get_period(period_id)
+    if period is None:
+        raise HTTPException(status_code=404, detail="Payout period not found")
+    return period
+
+
+@router.get("/preview", response_model=List[PayoutPreview])
+def preview_payouts(end_date: date, db: Session = Depends(get_db)):
+    """Payouts that closing a period at end_date would produce"""
+    return PayoutService(db).preview(end_date)
+
+
+@router.post("/periods", response_model=PayoutPeriodDetail)
+def close_period(payload: PayoutClose, db: Session = Depends(get_db)):
+    """Close a period: settle all unsettled sales up to end_date into statements"""
+    try:
+        return PayoutService(db).close(payload.end_date)
+    except PayoutError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/periods", response_model=List[PayoutPeriod])
+def list_periods(skip: int = 0, limit: int = 24, db: Session = Depends(get_db)):
+    return PayoutService(db).list_periods(skip=skip, limit=limit)
+
+
+@router.get("/periods/{period_id}", response_model=PayoutPeriodDetail)
+def read_period(period_id: int, db: Session = Depends(get_db)):
+    return _period_or_404(PayoutService(db), period_id)
+
+
+@router.get("/periods/{period_id}/sales", response_model=List[Sale])
+def read_period_sales(
+    period_id: int, consignor_id: Optional[str] = None, db: Session = Depends(get_db)
+):
+    """Sales settled in a period, optionally for one consignor"""
+    service = PayoutService(db)
+    _period_or_404(service, period_id)
+    return service.period_sales(period_id, consignor_id)
+
+
+@router.get("/periods/{period_id}/export.{fmt}")
+def export_period(period_id: int, fmt: str, db: Session = Depends(get_db)):
+    """Statements as CSV or XLSX in the layout of the Repasses spreadsheet"""
+    period = _period_or_404(PayoutService(db), period_id)
+    data = statements_export(period_id=period_id)
+    return export_response(data._replace(name=f"repasses_{period.end_date.isoformat()}"), fmt)
+
+
+@router.post("/statements/{statement_id}/paid", response_model=PayoutStatement)
+def mark_statement_paid(statement_id: int, db: Session = Depends(get_db)):
+    statement = PayoutService(db).mark_paid(statement_id)
+    if statement is None:
+        raise HTTPException(status_code=404, detail="Payout statement not found")
+    return statement
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field, validator
-from typing import Optional, List
-from datetime import datetime
+from pydantic import BaseModel, Field, computed_field, validator
+from typing import Optional, List, Dict
+from datetime import date, datetime
 import json
 
 
@@ -39,6 +39,35 @@ class Consignor(ConsignorBase):
 
 
 # Item schemas
+def parse_photo_list(v):
+    """Stored photos (JSON array, comma-separated or single URL) as a list"""
+    if v is None:
+        return None
+    if isinstance(v, str):
+        try:
+            # Se for uma string JSON, converter para lista
+            if v.startswith("[") and v.endswith("]"):
+                return json.loads(v)
+            # Se for uma string com vírgulas, dividir
+            elif "," in v:
+                return [photo.strip() for photo in v.split(",") if photo.strip()]
+            # Se for uma string única
+            else:
+                return [v] if v else None
+        except (json.JSONDecodeError, AttributeError):
+            # Se falhar, tentar dividir por vírgula
+            return [photo.strip() for photo in str(v).split(",") if photo.strip()]
+    return v
+
+
+def photo_variant_urls(photos: Optional[List[str]]) -> Optional[List[Dict[str, str]]]:
+    from services.media import variant_urls
+
+    if not photos:
+        return None
+    return [variant_urls(photo) for photo in photos]
+
+
 class ItemBase(BaseModel):
     consignor_id: Optional[str] = None
     acquisition_type: Optional[str] = None
@@ -108,33 +137,93 @@ class Item(ItemBase):
     days_on_hand: Optional[int] = None
     ai_confidence: Optional[float] = None
     ai_similar_items: Optional[str] = None
+    index_status: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
     @validator("photos", pre=True)
     def parse_photos(cls, v):
-        if v is None:
-            return None
-        if isinstance(v, str):
-            try:
-                # Se for uma string JSON, converter para lista
-                if v.startswith("[") and v.endswith("]"):
-                    return json.loads(v)
-                # Se for uma string com vírgulas, dividir
-                elif "," in v:
-                    return [photo.strip() for photo in v.split(",") if photo.strip()]
-                # Se for uma string única
-                else:
-                    return [v] if v else None
-            except (json.JSONDecodeError, AttributeError):
-                # Se falhar, tentar dividir por vírgula
-                return [photo.strip() for photo in str(v).split(",") if photo.strip()]
-        return v
+        return parse_photo_list(v)
+
+    @computed_field
+    @property
+    def photo_variants(self) -> Optional[List[Dict[str, str]]]:
+        """thumb/medium/full/original URLs for each photo, in the same order"""
+        return photo_variant_urls(self.photos)
+
+    class Config:
+        from_attributes = True
+
+
+class ItemListEntry(BaseModel):
+    """
+    Row of the item list: the columns crud.ITEM_LIST_COLUMNS selects.
+    Measurements, notes, AI neighbours and related rows come from the
+    detail endpoint.
+    """
+
+    sku: str
+    consignor_id: Optional[str] = None
+    category: Optional[str] = None
+    subcategory: Optional[str] = None
+    brand: Optional[str] = None
+    size: Optional[str] = None
+    color: Optional[str] = None
+    condition: Optional[str] = None
+    title_ig: Optional[str] = None
+    summary_title: Optional[str] = None
+    list_price: Optional[float] = None
+    markdown_stage: int = 0
+    photos: Optional[List[str]] = None
+    active: bool = True
+    sold_at: Optional[datetime] = None
+    index_status: Optional[str] = None
+    acquired_at: Optional[datetime] = None
+    created_at: datetime
+
+    @validator("photos", pre=True)
+    def parse_photos(cls, v):
+        return parse_photo_list(v)
+
+    @computed_field
+    @property
+    def photo_variants(self) -> Optional[List[Dict[str, str]]]:
+        """thumb/medium/full/original URLs for each photo, in the same order"""
+        return photo_variant_urls(self.photos)
+
+    class Config:
+        from_attributes = True
+
+
+class ItemSearchResult(ItemListEntry):
+    score: float  # BM25 rank, lower is more relevant
+
+
+class HybridSearchResult(ItemListEntry):
+    score: float  # reciprocal rank fusion, higher is more relevant
+    text_rank: Optional[int] = None  # position in the full-text ranking
+    image_rank: Optional[int] = None  # position in the CLIP image ranking
+
+
+class HybridSearchResponse(BaseModel):
+    results: List[HybridSearchResult]
+    image_search: bool  # False when the AI gateway could not be reached
+
+
+class ItemDynamicField(BaseModel):
+    field_name: str
+    field_value: Optional[str] = None
+    field_type: str = "text"
 
     class Config:
         from_attributes = True
 
 
+class ItemDetail(Item):
+    consignor: Optional[Consignor] = None
+    dynamic_fields: List[ItemDynamicField] = []
+
+
 # Sale schemas
 class SaleBase(BaseModel):
     sku: str
@@ -161,6 +250,113 @@ class Sale(SaleBase):
         from_attributes = True
 
 
+# Multi-item sale at the counter (POST /sales/checkout)
+class CheckoutItem(BaseModel):
+    sku: str
+    sale_price: float
+    discount_value: float = 0
+
+
+class SaleCheckout(BaseModel):
+    date: Optional[datetime] = None  # now if omitted
+    channel: Optional[str] = None
+    customer_name: Optional[str] = None
+    customer_whatsapp: Optional[str] = None
+    payment_method: Optional[str] = None
+    notes: Optional[str] = None
+    items: List[CheckoutItem] = Field(..., min_length=1)
+
+
+class CheckoutResponse(BaseModel):
+    sales: List[Sale]
+    total: float
+
+
+# Spreadsheet import schemas (services/catalog_import.py)
+class ConsignorImport(ConsignorCreate):
+    class Config:
+        coerce_numbers_to_str = True  # phone numbers typed as numbers
+
+
+class ItemImport(ItemCreate):
+    """Item row of the spreadsheet kit, lifecycle columns included"""
+
+    acquired_at: Optional[datetime] = None
+    listed_at: Optional[datetime] = None
+    sold_at: Optional[datetime] = None
+    sale_price: Optional[float] = None
+    channel_sold: Optional[str] = None
+    days_on_hand: Optional[int] = None
+
+    @validator("photos", pre=True)
+    def parse_photos(cls, v):
+        return parse_photo_list(v)
+
+    class Config:
+        coerce_numbers_to_str = True  # sizes like 40 typed as numbers
+
+
+class ImportCounts(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0  # SKU/ID already in the database
+    failed: int = 0
+
+
+class ImportRowError(BaseModel):
+    sheet: str
+    row: int
+    key: Optional[str] = None
+    error: str
+
+
+class ImportReport(BaseModel):
+    consignors: ImportCounts = Field(default_factory=ImportCounts)
+    items: ImportCounts = Field(default_factory=ImportCounts)
+    errors: List[ImportRowError] = []  # first MAX_REPORTED_ERRORS; counts cover all
+    seconds: float = 0
+
+
+# Payout (repasse) schemas
+class PayoutClose(BaseModel):
+    end_date: date = Field(..., description="Last sale date included (inclusive)")
+
+
+class PayoutPreview(BaseModel):
+    consignor_id: str
+    consignor_name: Optional[str] = None
+    pix_key: Optional[str] = None
+    items_sold: int
+    net_sales: float
+    percent: float
+    consignor_amount: float
+    store_amount: float
+
+
+class PayoutStatement(PayoutPreview):
+    id: int
+    period_id: int
+    status: str
+    paid_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class PayoutPeriod(BaseModel):
+    id: int
+    start_date: Optional[date] = None
+    end_date: date
+    closed_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class PayoutPeriodDetail(PayoutPeriod):
+    statements: List[PayoutStatement] = []
+
+
 # AI Integration schemas
 class AIIntakeRequest(BaseModel):
     images: List[str] = Field(..., description="Base64 encoded images")
@@ -175,13 +371,14 @@ class AIIntakeResponse(BaseModel):
     success: bool
     message: Optional[str] = None
     dynamic_fields: Optional[dict] = None  # New field for dynamic fields
+    image_hashes: Optional[List[str]] = None  # Blob store hashes to send back on confirm
 
 
 class DynamicFieldsRequest(BaseModel):
     category: str
     subcategory: Optional[str] = None
     brand: Optional[str] = None
-    images: Optional[List[str]] = None  # Base64 images for analysis
+    image_hashes: Optional[List[str]] = None  # Photos already in the blob store
 
 
 class DynamicFieldsResponse(BaseModel):
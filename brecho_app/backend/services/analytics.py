@@ -0,0 +1,307 @@
+"""
+Columnar analytics over Parquet snapshots of the items and sales tables.
+
+A scheduled job copies both tables into Parquet outside business hours.
+The reports (sell-through, aging, revenue, markdown effectiveness) are
+vectorized pyarrow group-bys over those files, memoized until the next
+snapshot, so report traffic never reads the OLTP database.
+"""
+import asyncio
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from models import Item, Sale
+
+logger = logging.getLogger(__name__)
+
+ITEMS_SCHEMA = pa.schema([
+    ("sku", pa.string()),
+    ("consignor_id", pa.string()),
+    ("category", pa.string()),
+    ("brand", pa.string()),
+    ("condition", pa.string()),
+    ("cost", pa.float64()),
+    ("list_price", pa.float64()),
+    ("sale_price", pa.float64()),
+    ("markdown_stage", pa.int32()),
+    ("acquired_at", pa.timestamp("ms")),
+    ("sold_at", pa.timestamp("ms")),
+    ("days_on_hand", pa.int32()),
+    ("channel_sold", pa.string()),
+    ("active", pa.bool_()),
+])
+
+SALES_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("sku", pa.string()),
+    ("consignor_id", pa.string()),
+    ("date", pa.timestamp("ms")),
+    ("sale_price", pa.float64()),
+    ("discount_value", pa.float64()),
+    ("channel", pa.string()),
+    ("payment_method", pa.string()),
+])
+
+SNAPSHOT_TABLES = {"items": (Item, ITEMS_SCHEMA), "sales": (Sale, SALES_SCHEMA)}
+
+# (label, lower bound in days, upper bound or None) for unsold stock
+AGING_BUCKETS = [
+    ("0-30", 0, 31),
+    ("31-60", 31, 61),
+    ("61-90", 61, 91),
+    ("91-180", 91, 181),
+    ("180+", 181, None),
+]
+
+REVENUE_DIMENSIONS = {"category", "brand", "channel", "consignor_id"}
+SELL_THROUGH_DIMENSIONS = {"category", "brand", "consignor_id", "condition"}
+
+
+class SnapshotMissing(Exception):
+    """No Parquet snapshot has been taken yet"""
+
+
+def snapshot_path(name: str) -> str:
+    return os.path.join(settings.ANALYTICS_DIR, f"{name}.parquet")
+
+
+def in_business_hours(now: Optional[datetime] = None) -> bool:
+    hour = (now or datetime.now()).hour
+    return settings.ANALYTICS_BUSINESS_HOURS_START <= hour < settings.ANALYTICS_BUSINESS_HOURS_END
+
+
+def take_snapshot(db: Session) -> datetime:
+    """Stream items and sales into Parquet files, replacing the previous snapshot atomically"""
+    os.makedirs(settings.ANALYTICS_DIR, exist_ok=True)
+    taken_at = datetime.now().replace(microsecond=0)
+    metadata = {b"taken_at": taken_at.isoformat().encode()}
+
+    for name, (model, schema) in SNAPSHOT_TABLES.items():
+        schema = schema.with_metadata(metadata)
+        columns = [getattr(model, field.name) for field in schema]
+        rows = db.execute(select(*columns)).yield_per(settings.ANALYTICS_BATCH_SIZE)
+        tmp_path = f"{snapshot_path(name)}.{uuid.uuid4().hex}.tmp"
+        with pq.ParquetWriter(tmp_path, schema, compression="zstd") as writer:
+            for batch in rows.partitions():
+                records = [row._asdict() for row in batch]
+                writer.write_batch(pa.RecordBatch.from_pylist(records, schema))
+        os.replace(tmp_path, snapshot_path(name))
+    return taken_at
+
+
+def _divide(numerator: pa.Array, denominator: pa.Array) -> pa.Array:
+    """Element-wise ratio, null where the denominator is zero"""
+    denominator = pc.cast(denominator, pa.float64())
+    zero = pc.equal(denominator, 0)
+    return pc.if_else(zero, None, pc.divide(pc.cast(numerator, pa.float64()), denominator))
+
+
+def _records(table: pa.Table, rename: Dict[str, str], sort_by: str) -> List[dict]:
+    table = table.rename_columns([rename.get(c, c) for c in table.column_names])
+    return table.sort_by([(sort_by, "descending")]).to_pylist()
+
+
+class AnalyticsEngine:
+    """Reports computed from the current snapshot and cached until it changes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tables: Dict[str, pa.Table] = {}
+        self._mtimes: Dict[str, float] = {}
+        self._reports: Dict[tuple, dict] = {}
+
+    def _load(self) -> Tuple[tuple, Dict[str, pa.Table]]:
+        """(snapshot version, tables), reloading the files when they change"""
+        with self._lock:
+            for name in SNAPSHOT_TABLES:
+                path = snapshot_path(name)
+                if not os.path.exists(path):
+                    raise SnapshotMissing(f"No analytics snapshot yet ({path})")
+                mtime = os.path.getmtime(path)
+                if self._mtimes.get(name) != mtime:
+                    self._tables[name] = pq.read_table(path)
+                    self._mtimes[name] = mtime
+                    self._reports.clear()
+            return self._version(), dict(self._tables)
+
+    def _version(self) -> tuple:
+        return tuple(self._mtimes[name] for name in SNAPSHOT_TABLES)
+
+    @staticmethod
+    def _taken_at(tables: Dict[str, pa.Table]) -> datetime:
+        return datetime.fromisoformat(tables["items"].schema.metadata[b"taken_at"].decode())
+
+    def snapshot_at(self) -> datetime:
+        return self._taken_at(self._load()[1])
+
+    def report(self, name: str, **params) -> dict:
+        """Named report for the current snapshot, memoized per parameters"""
+        version, tables = self._load()
+        # Keyed on the snapshot version: a report computed from tables that
+        # were replaced meanwhile is never served for the new snapshot
+        key = (version, name, tuple(sorted(params.items())))
+        with self._lock:
+            cached = self._reports.get(key)
+        if cached is None:
+            snapshot_at = self._taken_at(tables)
+            rows = getattr(self, f"_{name}")(tables, snapshot_at, **params)
+            cached = {"snapshot_at": snapshot_at, "params": params, "rows": rows}
+            with self._lock:
+                if version == self._version():
+                    self._reports[key] = cached
+        return cached
+
+    def _sell_through(self, tables, snapshot_at, by: str, days: Optional[int]):
+        """Share of the items received (optionally in the last `days`) that have sold"""
+        items = tables["items"]
+        if days:
+            since = pa.scalar(snapshot_at - timedelta(days=days), pa.timestamp("ms"))
+            items = items.filter(pc.greater_equal(items["acquired_at"], since))
+        items = items.append_column("sold", pc.is_valid(items["sold_at"]))
+        grouped = items.group_by(by).aggregate([
+            ("sku", "count"),
+            ("sold", "sum"),
+            ("days_on_hand", "mean"),
+        ])
+        grouped = grouped.append_column(
+            "sell_through", _divide(grouped["sold_sum"], grouped["sku_count"])
+        )
+        return _records(
+            grouped,
+            {"sku_count": "received", "sold_sum": "sold", "days_on_hand_mean": "avg_days_to_sell"},
+            "received",
+        )
+
+    def _aging(self, tables, snapshot_at, by: Optional[str]):
+        """Unsold active stock by days on hand"""
+        items = tables["items"]
+        items = items.filter(pc.and_(pc.is_null(items["sold_at"]), pc.equal(items["active"], True)))
+        age = pc.days_between(items["acquired_at"], pa.scalar(snapshot_at, pa.timestamp("ms")))
+        bucket = pa.nulls(len(items), pa.string())
+        for label, low, high in AGING_BUCKETS:
+            in_bucket = pc.greater_equal(age, low)
+            if high is not None:
+                in_bucket = pc.and_(in_bucket, pc.less(age, high))
+            bucket = pc.if_else(in_bucket, label, bucket)
+        items = items.append_column("age_bucket", bucket)
+        keys = ["age_bucket"] + ([by] if by else [])
+        grouped = items.group_by(keys).aggregate([
+            ("sku", "count"),
+            ("list_price", "sum"),
+            ("cost", "sum"),
+        ])
+        order = {label: i for i, (label, _, _) in enumerate(AGING_BUCKETS)}
+        rows = _records(
+            grouped,
+            {"sku_count": "items", "list_price_sum": "list_value", "cost_sum": "cost"},
+            "items",
+        )
+        return sorted(rows, key=lambda row: order.get(row["age_bucket"], len(order)))
+
+    def _revenue(self, tables, snapshot_at, by: str, days: Optional[int]):
+        """Sales revenue joined to item attributes"""
+        sales = tables["sales"]
+        if days:
+            since = pa.scalar(snapshot_at - timedelta(days=days), pa.timestamp("ms"))
+            sales = sales.filter(pc.greater_equal(sales["date"], since))
+        if by in ("category", "brand"):
+            sales = sales.join(tables["items"].select(["sku", by]), "sku", join_type="left outer")
+        grouped = sales.group_by(by).aggregate([
+            ("sale_price", "sum"),
+            ("sale_price", "count"),
+            ("sale_price", "mean"),
+            ("discount_value", "sum"),
+        ])
+        return _records(
+            grouped,
+            {
+                "sale_price_sum": "revenue",
+                "sale_price_count": "sales",
+                "sale_price_mean": "avg_ticket",
+                "discount_value_sum": "discounts",
+            },
+            "revenue",
+        )
+
+    def _markdown(self, tables, snapshot_at):
+        """Sell-through, time to sell and realized price per markdown stage"""
+        items = tables["items"]
+        sold = pc.is_valid(items["sold_at"])
+        items = items.append_column("sold", sold).append_column(
+            "realized", _divide(items["sale_price"], items["list_price"])
+        )
+        grouped = items.group_by("markdown_stage").aggregate([
+            ("sku", "count"),
+            ("sold", "sum"),
+            ("days_on_hand", "mean"),
+            ("realized", "mean"),
+        ])
+        grouped = grouped.append_column(
+            "sell_through", _divide(grouped["sold_sum"], grouped["sku_count"])
+        )
+        rows = _records(
+            grouped,
+            {
+                "sku_count": "items",
+                "sold_sum": "sold",
+                "days_on_hand_mean": "avg_days_to_sell",
+                "realized_mean": "avg_price_realization",
+            },
+            "items",
+        )
+        unmarked = -1
+        return sorted(
+            rows, key=lambda row: unmarked if row["markdown_stage"] is None else row["markdown_stage"]
+        )
+
+
+engine = AnalyticsEngine()
+
+
+def _snapshot_job():
+    db = SessionLocal()
+    try:
+        taken_at = take_snapshot(db)
+        logger.info(f"Analytics snapshot taken at {taken_at.isoformat()}")
+        return taken_at
+    finally:
+        db.close()
+
+
+async def refresh_snapshot() -> datetime:
+    return await asyncio.to_thread(_snapshot_job)
+
+
+def _next_run(now: datetime) -> datetime:
+    run_at = now.replace(hour=settings.ANALYTICS_SNAPSHOT_HOUR, minute=0, second=0, microsecond=0)
+    return run_at if run_at > now else run_at + timedelta(days=1)
+
+
+async def run_analytics_scheduler():
+    """Daily snapshot at ANALYTICS_SNAPSHOT_HOUR; a first one at startup if none exists off-hours"""
+    if not os.path.exists(snapshot_path("items")) and not in_business_hours():
+        try:
+            await refresh_snapshot()
+        except Exception as e:
+            logger.error(f"Analytics snapshot error: {str(e)}")
+    while True:
+        now = datetime.now()
+        await asyncio.sleep((_next_run(now) - now).total_seconds())
+        try:
+            await refresh_snapshot()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Analytics snapshot error: {str(e)}")
@@ -0,0 +1,351 @@
+import asyncio
+import base64
+import binascii
+import glob
+import hashlib
+import logging
+import os
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import BinaryIO, Iterable, Iterator, List, NamedTuple, Optional, Union
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from models import Blob, BlobRef
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = os.path.join(settings.UPLOAD_DIR, "blobs")
+BLOB_URL_PREFIX = "/static/blobs"
+CHUNK_SIZE = 1024 * 1024
+
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+_URL_RE = re.compile(r"/blobs/[0-9a-f]{2}/([0-9a-f]{64})\.\w+$")
+
+# (magic prefix, offset, extension, content type)
+_SIGNATURES = [
+    (b"\xff\xd8\xff", 0, "jpg", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", 0, "png", "image/png"),
+    (b"WEBP", 8, "webp", "image/webp"),
+    (b"GIF8", 0, "gif", "image/gif"),
+    (b"ftypavif", 4, "avif", "image/avif"),
+    (b"ftypheic", 4, "heic", "image/heic"),
+    (b"ftypmif1", 4, "heic", "image/heic"),
+]
+
+
+def sniff_type(head: bytes):
+    """(extension, content type) from the first bytes of a file"""
+    for magic, offset, ext, content_type in _SIGNATURES:
+        if head[offset : offset + len(magic)] == magic:
+            return ext, content_type
+    return "bin", "application/octet-stream"
+
+
+IMAGE_TYPES = {ext for _, _, ext, _ in _SIGNATURES}
+
+
+class InvalidImageError(ValueError):
+    """Upload rejected before storing: not an image, or over MAX_FILE_SIZE"""
+
+
+class _TempFile(NamedTuple):
+    path: str
+    hash: str
+    size: int
+    ext: str
+    content_type: str
+
+
+Source = Union[bytes, str, BinaryIO]
+
+_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _io_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=settings.BLOB_WRITE_WORKERS, thread_name_prefix="blob-io"
+        )
+    return _pool
+
+
+def _chunks(source: Source) -> Iterator[bytes]:
+    if isinstance(source, str):
+        if source.startswith("data:"):
+            source = source.split(",", 1)[1]
+        try:
+            source = base64.b64decode(source)
+        except binascii.Error:
+            raise InvalidImageError("Invalid base64 image")
+    if isinstance(source, bytes):
+        for start in range(0, len(source), CHUNK_SIZE):
+            yield source[start : start + CHUNK_SIZE]
+        return
+    while True:
+        chunk = source.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _write_tmp(source: Source) -> _TempFile:
+    """Validate, hash and write one image in a single pass over its bytes"""
+    digest = hashlib.sha256()
+    size = 0
+    ext = content_type = None
+    tmp_dir = os.path.join(BLOB_DIR, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+    try:
+        with open(tmp_path, "wb") as f:
+            for chunk in _chunks(source):
+                if ext is None:
+                    ext, content_type = sniff_type(chunk[:16])
+                    if ext not in IMAGE_TYPES:
+                        raise InvalidImageError("File is not a supported image")
+                size += len(chunk)
+                if size > settings.MAX_FILE_SIZE:
+                    raise InvalidImageError(
+                        f"Image larger than {settings.MAX_FILE_SIZE // (1024 * 1024)}MB"
+                    )
+                digest.update(chunk)
+                f.write(chunk)
+            if ext is None:
+                raise InvalidImageError("Empty file")
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        _unlink(tmp_path)
+        raise
+    return _TempFile(tmp_path, digest.hexdigest(), size, ext, content_type)
+
+
+def _unlink(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _fsync_dir(path: str):
+    """Persist renames into a directory (no-op where directories can't be opened)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def is_blob_hash(value: str) -> bool:
+    return bool(value) and bool(_HASH_RE.match(value))
+
+
+def hash_from_url(url: str) -> Optional[str]:
+    """Blob hash from a photo URL, or None for legacy per-item upload paths"""
+    match = _URL_RE.search(url or "")
+    return match.group(1) if match else None
+
+
+class BlobStore:
+    """
+    Content-addressed image store shared by the backend and the AI gateway.
+
+    Files live at <UPLOAD_DIR>/blobs/<hash[:2]>/<hash>.<ext>, so the same photo
+    is stored once no matter how many times it is uploaded or confirmed.
+    Owners (item SKUs) take references; blobs without references are removed
+    by gc() once they have not been uploaded again or released for the grace
+    period.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def path_for(blob_hash: str, ext: str) -> str:
+        return os.path.join(BLOB_DIR, blob_hash[:2], f"{blob_hash}.{ext}")
+
+    @staticmethod
+    def url_for(blob: Blob) -> str:
+        return f"{BLOB_URL_PREFIX}/{blob.hash[:2]}/{blob.hash}.{blob.ext}"
+
+    def get(self, blob_hash: str) -> Optional[Blob]:
+        return self.db.query(Blob).filter(Blob.hash == blob_hash).first()
+
+    def put_many(self, sources: List[Source]) -> List[Blob]:
+        """
+        Store several images at once, in the order given.
+
+        Each source (raw bytes, base64 text or a file object) is validated,
+        hashed and written to a fsynced temp file on the I/O thread pool, so
+        the photos of one intake are written in parallel. The new files are
+        then renamed into place, their directories fsynced once per batch,
+        and all new rows committed together; blobs that were already stored
+        get their last_seen_at refreshed, so gc() keeps them while the intake
+        that re-uploaded them is pending. Raises InvalidImageError before
+        anything is stored if any source is not an accepted image.
+        """
+        futures = [_io_pool().submit(_write_tmp, source) for source in sources]
+        written = []
+        errors = []
+        for future in futures:
+            try:
+                written.append(future.result())
+            except InvalidImageError as e:
+                errors.append(e)
+        if errors:
+            for tmp in written:
+                _unlink(tmp.path)
+            raise errors[0]
+
+        blobs = {}
+        existing = set()
+        new_dirs = set()
+        for tmp in written:
+            if tmp.hash in blobs or tmp.hash in existing:
+                _unlink(tmp.path)
+                continue
+            # Refreshing last_seen_at both finds a stored blob and keeps gc() off it
+            refreshed = self.db.execute(
+                update(Blob).where(Blob.hash == tmp.hash).values(last_seen_at=func.now())
+            ).rowcount
+            if refreshed:
+                existing.add(tmp.hash)
+                _unlink(tmp.path)
+                continue
+            final_path = self.path_for(tmp.hash, tmp.ext)
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(tmp.path, final_path)
+            new_dirs.add(os.path.dirname(final_path))
+            blobs[tmp.hash] = Blob(
+                hash=tmp.hash, size=tmp.size, content_type=tmp.content_type, ext=tmp.ext
+            )
+        for directory in new_dirs:
+            _fsync_dir(directory)
+
+        if existing:
+            self.db.commit()
+        if blobs:
+            self.db.add_all(blobs.values())
+            try:
+                self.db.commit()
+            except IntegrityError:
+                # Some were stored concurrently by another request (same content,
+                # same file): insert the rest one by one
+                self.db.rollback()
+                for blob in blobs.values():
+                    if self.get(blob.hash) is None:
+                        self.db.add(blob)
+                        try:
+                            self.db.commit()
+                        except IntegrityError:
+                            self.db.rollback()
+        return [self.get(tmp.hash) for tmp in written]
+
+    def acquire(self, owner: str, hashes: Iterable[str]) -> List[Blob]:
+        """
+        Reference blobs from an owner; re-acquiring the same pair is a no-op.
+        The references join the current transaction (caller commits), so they
+        are only kept if the owner itself is saved.
+        """
+        blobs = []
+        for blob_hash in dict.fromkeys(hashes):
+            blob = self.get(blob_hash)
+            if blob is None:
+                raise ValueError(f"Unknown image hash: {blob_hash}")
+            exists = (
+                self.db.query(BlobRef)
+                .filter(BlobRef.blob_hash == blob_hash, BlobRef.owner == owner)
+                .first()
+            )
+            if not exists:
+                self.db.add(BlobRef(blob_hash=blob_hash, owner=owner))
+                self.db.flush()  # visible to the next lookup (autoflush is off)
+                # In SQL, not read-modify-write: concurrent acquires both count
+                self.db.execute(
+                    update(Blob)
+                    .where(Blob.hash == blob_hash)
+                    .values(refcount=Blob.refcount + 1)
+                )
+            blobs.append(blob)
+        return blobs
+
+    def release(self, owner: str, hashes: Iterable[str]):
+        """Drop an owner's references (caller commits); unreferenced files are removed by gc()"""
+        for blob_hash in set(hashes):
+            ref = (
+                self.db.query(BlobRef)
+                .filter(BlobRef.blob_hash == blob_hash, BlobRef.owner == owner)
+                .first()
+            )
+            if ref:
+                self.db.delete(ref)
+                self.db.flush()
+                # The grace period before gc() restarts from the release
+                self.db.execute(
+                    update(Blob)
+                    .where(Blob.hash == blob_hash, Blob.refcount > 0)
+                    .values(refcount=Blob.refcount - 1, last_seen_at=func.now())
+                )
+
+    def gc(self, older_than: Optional[timedelta] = None) -> int:
+        """Delete unreferenced blobs (e.g. intakes never confirmed) past the grace period"""
+        from services.media import MEDIA_DIR
+
+        older_than = older_than or timedelta(seconds=settings.BLOB_GC_GRACE)
+        cutoff = datetime.utcnow() - older_than
+        orphans = self.db.execute(
+            select(Blob.hash, Blob.ext).where(Blob.refcount == 0, Blob.last_seen_at < cutoff)
+        ).all()
+        removed = 0
+        for blob_hash, ext in orphans:
+            # Only if still unreferenced and unseen: an intake may have been
+            # confirmed, or the same photo uploaded again, meanwhile
+            deleted = self.db.execute(
+                delete(Blob).where(
+                    Blob.hash == blob_hash, Blob.refcount == 0, Blob.last_seen_at < cutoff
+                )
+            ).rowcount
+            self.db.commit()
+            if not deleted:
+                continue
+            _unlink(self.path_for(blob_hash, ext))
+            for path in glob.glob(os.path.join(MEDIA_DIR, blob_hash[:2], f"{blob_hash}_*")):
+                _unlink(path)
+            removed += 1
+        return removed
+
+
+def _gc_job() -> int:
+    # The session lives in the worker thread: cancelling the loop at shutdown
+    # must not close it while gc is still using it
+    db = SessionLocal()
+    try:
+        return BlobStore(db).gc()
+    finally:
+        db.close()
+
+
+async def run_blob_gc(interval: Optional[float] = None):
+    """Collect unreferenced blobs every BLOB_GC_INTERVAL seconds (started by the app lifespan)"""
+    interval = interval or settings.BLOB_GC_INTERVAL
+    while True:
+        try:
+            removed = await asyncio.to_thread(_gc_job)
+            if removed:
+                logger.info(f"Removed {removed} unreferenced blobs")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Blob garbage collection error: {str(e)}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,274 @@
+"""
+Bulk import of consignors and items from the shop's spreadsheet kit
+(brecho_kit_pt.xlsx: sheets Consignantes and Itens).
+
+The workbook is read row by row in read-only mode and each row is
+validated into ConsignorImport/ItemImport. Valid rows are written in
+batches, one executemany INSERT and one transaction per batch. Rows whose
+ID/SKU already exists are skipped, or overwritten with `update=True`, so
+re-running an import is idempotent. Bulk inserts bypass the ORM, so the
+dashboard counters are reconciled once at the end; FTS triggers still fire.
+"""
+import json
+import time
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+import openpyxl
+from pydantic import ValidationError
+from sqlalchemy import Column, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import Consignor, Item
+from schemas import ConsignorImport, ImportCounts, ImportReport, ImportRowError, ItemImport
+from services.stats import StatsService
+
+CONSIGNORS_SHEET = "Consignantes"
+ITEMS_SHEET = "Itens"
+
+# Spreadsheet column -> model field
+CONSIGNOR_COLUMNS = {
+    "ConsignanteID": "id",
+    "Nome": "name",
+    "WhatsApp": "whatsapp",
+    "Email": "email",
+    "DadosPagamento": "pix_key",  # only when FormaPagamento is Pix
+    "PercentualConsignante": "percent",
+    "Observações": "notes",
+    "Ativo": "active",
+}
+
+ITEM_COLUMNS = {
+    "SKU": "sku",
+    "ConsignanteID": "consignor_id",
+    "TipoAquisição": "acquisition_type",
+    "Categoria": "category",
+    "Subcategoria": "subcategory",
+    "Marca": "brand",
+    "Gênero": "gender",
+    "Tamanho": "size",
+    "Modelagem": "fit",
+    "Cor": "color",
+    "Tecido": "fabric",
+    "Condição": "condition",
+    "Defeitos": "flaws",
+    "Medidas(cm)_Busto": "bust",
+    "Medidas(cm)_Cintura": "waist",
+    "Medidas(cm)_Comprimento": "length",
+    "Custo": "cost",
+    "PreçoLista": "list_price",
+    "EtapaDesconto": "markdown_stage",
+    "EntradaEm": "acquired_at",
+    "ListadoEm": "listed_at",
+    "CanalListagem": "channel_listed",
+    "VendidoEm": "sold_at",
+    "PreçoVenda": "sale_price",
+    "CanalVenda": "channel_sold",
+    "DiasEmEstoque": "days_on_hand",
+    "URLFotos": "photos",
+    "Observações": "notes",
+    "Ativo": "active",
+}
+
+# Older kits name the consignor instead of giving the ID
+OWNER_COLUMN = "ProprietárioConsignação"
+
+# Placeholders the kit uses for "no value"
+EMPTY_MARKERS = {"", "—", "–", "-"}
+
+# Ativo column written out by hand
+BOOLEAN_WORDS = {"sim": True, "s": True, "não": False, "nao": False, "n": False}
+
+MAX_REPORTED_ERRORS = 1000
+
+Source = Union[str, BinaryIO]
+
+
+def _clean(value):
+    if isinstance(value, str):
+        value = value.strip()
+        if value in EMPTY_MARKERS:
+            return None
+    return value
+
+
+def _sheet_rows(sheet) -> Tuple[List[str], Iterator[Tuple[int, dict]]]:
+    """Header and (row number, {column: value}) for each non-blank row"""
+    rows = sheet.iter_rows(values_only=True)
+    header = [str(name).strip() if name is not None else "" for name in next(rows, ())]
+
+    def records():
+        for row_number, values in enumerate(rows, start=2):
+            record = {name: _clean(value) for name, value in zip(header, values) if name}
+            # The kit's sheets carry hundreds of formatted but empty rows
+            if any(value is not None for value in record.values()):
+                yield row_number, record
+
+    return header, records()
+
+
+def _mapped(record: dict, columns: Dict[str, str]) -> dict:
+    data = {
+        field: record[column]
+        for column, field in columns.items()
+        if record.get(column) is not None
+    }
+    if isinstance(data.get("active"), str):
+        data["active"] = BOOLEAN_WORDS.get(data["active"].lower(), data["active"])
+    return data
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()
+    )
+
+
+def _insert(db: Session, model):
+    if db.get_bind().dialect.name == "postgresql":
+        return pg_insert(model)
+    return sqlite_insert(model)
+
+
+class CatalogImporter:
+    def __init__(self, db: Session, update: bool = False, batch_size: Optional[int] = None):
+        self.db = db
+        self.update = update
+        self.batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        self.report = ImportReport()
+        self._consignor_ids: Set[str] = set()
+        self._owner_ids: Dict[str, Optional[str]] = {}  # lowercased name -> ID, None if ambiguous
+
+    def run(self, source: Source) -> ImportReport:
+        """Import the Consignantes sheet, then Itens, from a path or binary file"""
+        started = time.perf_counter()
+        for consignor_id, name in self.db.execute(select(Consignor.id, Consignor.name)):
+            self._remember_consignor(consignor_id, name)
+
+        workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+        try:
+            if CONSIGNORS_SHEET in workbook.sheetnames:
+                self._import_sheet(
+                    workbook[CONSIGNORS_SHEET], CONSIGNOR_COLUMNS, Consignor.id,
+                    self._consignor_row, self.report.consignors,
+                )
+            if ITEMS_SHEET in workbook.sheetnames:
+                self._import_sheet(
+                    workbook[ITEMS_SHEET], ITEM_COLUMNS, Item.sku,
+                    self._item_row, self.report.items,
+                )
+        finally:
+            workbook.close()
+
+        if self.report.items.inserted or self.report.items.updated:
+            StatsService(self.db).reconcile()
+        self.report.seconds = round(time.perf_counter() - started, 3)
+        return self.report
+
+    def _remember_consignor(self, consignor_id: str, name: Optional[str]):
+        self._consignor_ids.add(consignor_id)
+        if name:
+            key = name.strip().lower()
+            known = self._owner_ids.get(key, consignor_id)
+            self._owner_ids[key] = consignor_id if known == consignor_id else None
+
+    def _error(self, sheet: str, row: int, key: Optional[str], error: str, counts: ImportCounts):
+        counts.failed += 1
+        if len(self.report.errors) < MAX_REPORTED_ERRORS:
+            self.report.errors.append(
+                ImportRowError(sheet=sheet, row=row, key=key, error=error)
+            )
+
+    def _import_sheet(
+        self,
+        sheet,
+        columns: Dict[str, str],
+        key: Column,
+        to_values: Callable[[dict], dict],
+        counts: ImportCounts,
+    ):
+        header, records = _sheet_rows(sheet)
+        # On update, only overwrite what the sheet actually has
+        update_fields = [
+            field for column, field in columns.items()
+            if column in header or (field == "consignor_id" and OWNER_COLUMN in header)
+        ]
+        key_column = next(column for column, field in columns.items() if field == key.name)
+        seen: Dict[str, int] = {}
+        batch: List[dict] = []
+        for row_number, record in records:
+            row_key = record.get(key_column)
+            row_key = str(row_key) if row_key is not None else None
+            if row_key in seen:
+                self._error(
+                    sheet.title, row_number, row_key,
+                    f"duplicated in the sheet (row {seen[row_key]})", counts,
+                )
+                continue
+            try:
+                values = to_values(record)
+            except ValidationError as e:
+                self._error(sheet.title, row_number, row_key, _validation_message(e), counts)
+                continue
+            except ValueError as e:
+                self._error(sheet.title, row_number, row_key, str(e), counts)
+                continue
+            seen[row_key] = row_number
+            batch.append(values)
+            if len(batch) >= self.batch_size:
+                self._write(key, batch, update_fields, counts)
+                batch = []
+        if batch:
+            self._write(key, batch, update_fields, counts)
+
+    def _write(self, key: Column, rows: List[dict], update_fields: List[str], counts: ImportCounts):
+        """One transaction: find existing keys, then a single executemany INSERT"""
+        keys = [row[key.name] for row in rows]
+        existing = set(self.db.execute(select(key).where(key.in_(keys))).scalars())
+        stmt = _insert(self.db, key.table)
+        if self.update:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[key],
+                set_={field: stmt.excluded[field] for field in update_fields if field != key.name},
+            )
+            counts.updated += len(existing)
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=[key])
+            rows = [row for row in rows if row[key.name] not in existing]
+            counts.skipped += len(existing)
+        if rows:
+            self.db.execute(stmt, rows)
+        self.db.commit()
+        counts.inserted += len(keys) - len(existing)
+
+    def _consignor_row(self, record: dict) -> dict:
+        data = _mapped(record, CONSIGNOR_COLUMNS)
+        method = record.get("FormaPagamento")
+        if method is not None and str(method).lower() != "pix":
+            data.pop("pix_key", None)
+        consignor = ConsignorImport(**data)
+        self._remember_consignor(consignor.id, consignor.name)
+        return consignor.dict()
+
+    def _item_row(self, record: dict) -> dict:
+        data = _mapped(record, ITEM_COLUMNS)
+        owner = record.get(OWNER_COLUMN)
+        if "consignor_id" not in data and owner is not None:
+            consignor_id = self._owner_ids.get(str(owner).strip().lower())
+            if consignor_id is None:
+                problem = "ambiguous" if str(owner).strip().lower() in self._owner_ids else "unknown"
+                raise ValueError(f"{problem} consignor {owner!r}")
+            data["consignor_id"] = consignor_id
+        if data.get("consignor_id") is not None and data["consignor_id"] not in self._consignor_ids:
+            raise ValueError(f"unknown consignor {data['consignor_id']!r}")
+
+        item = ItemImport(**data).dict()
+        item["photos"] = json.dumps(item["photos"]) if item["photos"] else None
+        if item["sold_at"] and item["acquired_at"] and item["days_on_hand"] is None:
+            item["days_on_hand"] = (item["sold_at"] - item["acquired_at"]).days
+        # executemany rows share one column list, so the server default cannot apply
+        item["acquired_at"] = item["acquired_at"] or datetime.now().replace(microsecond=0)
+        return item
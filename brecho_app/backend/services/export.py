@@ -0,0 +1,313 @@
+"""
+Streaming CSV/XLSX exports of items, sales and payout statements.
+
+Rows are read with yield_per (a server-side cursor on Postgres) and
+encoded as they arrive, so memory stays flat whatever the export size and
+the first bytes go out before the query is exhausted. XLSX files are
+written as a zip stream (data descriptors instead of a seekable file) with
+inline strings, so no shared-string table has to be held in memory.
+Column names follow the spreadsheet kit, so an items export can be
+imported back with import_catalog.py.
+"""
+import csv
+import io
+import math
+import zipfile
+from datetime import date, datetime
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional
+from xml.sax.saxutils import escape
+
+from sqlalchemy import Select, select
+
+from config import settings
+from database import SessionLocal
+from models import Consignor, Item, PayoutPeriod, PayoutStatement, Sale
+from schemas import parse_photo_list
+from services.catalog_import import ITEM_COLUMNS, ITEMS_SHEET
+from services.payouts import end_of_day, sale_consignor
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+SALE_COLUMNS = {
+    "VendaID": Sale.id,
+    "Data": Sale.date,
+    "SKU": Sale.sku,
+    "PreçoVenda": Sale.sale_price,
+    "Desconto": Sale.discount_value,
+    "Canal": Sale.channel,
+    "ClienteNome": Sale.customer_name,
+    "ClienteWhatsApp": Sale.customer_whatsapp,
+    "FormaPagamento": Sale.payment_method,
+    "Observações": Sale.notes,
+    "ConsignanteID": sale_consignor(),
+}
+
+# Same columns as the Repasses sheet, plus when it was paid
+STATEMENT_COLUMNS = {
+    "ConsignanteID": PayoutStatement.consignor_id,
+    "Nome": Consignor.name,
+    "PeríodoInício": PayoutPeriod.start_date,
+    "PeríodoFim": PayoutPeriod.end_date,
+    "PeçasVendidas": PayoutStatement.items_sold,
+    "VendasLíquidas": PayoutStatement.net_sales,
+    "PercentualConsignante": PayoutStatement.percent,
+    "ValorConsignante": PayoutStatement.consignor_amount,
+    "ValorLoja": PayoutStatement.store_amount,
+    "ChavePix": PayoutStatement.pix_key,
+    "Status": PayoutStatement.status,
+    "PagoEm": PayoutStatement.paid_at,
+}
+
+
+class Export(NamedTuple):
+    name: str  # file name, without extension
+    sheet: str  # kit sheet the columns come from
+    header: List[str]
+    query: Select
+    to_row: Callable[[tuple], list] = list
+
+
+def items_export(
+    active: Optional[bool] = None,
+    consignor_id: Optional[str] = None,
+    category: Optional[str] = None,
+    sold: Optional[bool] = None,
+) -> Export:
+    query = select(*[getattr(Item, field) for field in ITEM_COLUMNS.values()]).order_by(Item.sku)
+    if active is not None:
+        query = query.where(Item.active == active)
+    if consignor_id:
+        query = query.where(Item.consignor_id == consignor_id)
+    if category:
+        query = query.where(Item.category == category)
+    if sold is not None:
+        query = query.where(Item.sold_at.isnot(None) if sold else Item.sold_at.is_(None))
+
+    photos = list(ITEM_COLUMNS.values()).index("photos")
+
+    def to_row(row) -> list:
+        values = list(row)
+        values[photos] = ", ".join(parse_photo_list(values[photos]) or [])
+        return values
+
+    return Export("itens", ITEMS_SHEET, list(ITEM_COLUMNS), query, to_row)
+
+
+def sales_export(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    consignor_id: Optional[str] = None,
+    channel: Optional[str] = None,
+) -> Export:
+    query = (
+        select(*SALE_COLUMNS.values())
+        .outerjoin(Item, Item.sku == Sale.sku)
+        .order_by(Sale.date, Sale.id)
+    )
+    if start_date:
+        query = query.where(Sale.date >= datetime.combine(start_date, datetime.min.time()))
+    if end_date:
+        query = query.where(Sale.date < end_of_day(end_date))
+    if consignor_id:
+        query = query.where(sale_consignor() == consignor_id)
+    if channel:
+        query = query.where(Sale.channel == channel)
+    return Export("vendas", "Vendas", list(SALE_COLUMNS), query)
+
+
+def statements_export(
+    period_id: Optional[int] = None,
+    consignor_id: Optional[str] = None,
+    status: Optional[str] = None,
+) -> Export:
+    query = (
+        select(*STATEMENT_COLUMNS.values())
+        .join(PayoutPeriod, PayoutPeriod.id == PayoutStatement.period_id)
+        .outerjoin(Consignor, Consignor.id == PayoutStatement.consignor_id)
+        .order_by(PayoutPeriod.end_date, PayoutStatement.consignor_id)
+    )
+    if period_id is not None:
+        query = query.where(PayoutStatement.period_id == period_id)
+    if consignor_id:
+        query = query.where(PayoutStatement.consignor_id == consignor_id)
+    if status:
+        query = query.where(PayoutStatement.status == status)
+    return Export("repasses", "Repasses", list(STATEMENT_COLUMNS), query)
+
+
+def export_rows(export: Export) -> Iterator[list]:
+    """Rows of the export, fetched in batches on a session of its own"""
+    # A streamed response outlives the request's session
+    db = SessionLocal()
+    try:
+        rows = db.execute(export.query.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        for row in rows:
+            yield export.to_row(row)
+    finally:
+        db.close()
+
+
+class _Chunks:
+    """Write-only, unseekable sink collecting bytes until they are taken"""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self._parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        self.size = 0
+        return data
+
+
+def csv_chunks(header: List[str], rows: Iterable[list]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def take() -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    buffer.write("\ufeff")  # lets Excel detect UTF-8 (accents)
+    writer.writerow(header)
+    yield take()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= settings.EXPORT_CHUNK_SIZE:
+            yield take()
+    if buffer.tell():
+        yield take()
+
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    "</Types>"
+)
+
+_XLSX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Target="xl/workbook.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+    "</Relationships>"
+)
+
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+)
+
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+    '<Relationship Id="rId2" Target="styles.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"/>'
+    "</Relationships>"
+)
+
+# Cell formats: 0 general, 1 date (built-in 14), 2 date and time (built-in 22)
+_XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    "</cellXfs>"
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    "</styleSheet>"
+)
+
+_XLSX_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" '
+    'activePane="bottomLeft" state="frozen"/></sheetView></sheetViews><sheetData>'
+)
+
+_XLSX_SHEET_TAIL = "</sheetData></worksheet>"
+
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+
+# XML 1.0 has no representation for most control characters
+_ILLEGAL_XML = dict.fromkeys(c for c in range(32) if c not in (9, 10, 13))
+
+
+def _xlsx_cell(value) -> str:
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, float) and not math.isfinite(value):
+        return "<c/>"  # Excel rejects nan/inf numeric cells as a corrupt workbook
+    if isinstance(value, (int, float)):
+        return f"<c><v>{value!r}</v></c>"
+    if isinstance(value, datetime):
+        serial = (value - _EXCEL_EPOCH).total_seconds() / 86400
+        return f'<c s="2"><v>{serial!r}</v></c>'
+    if isinstance(value, date):
+        return f'<c s="1"><v>{(value - _EXCEL_EPOCH.date()).days}</v></c>'
+    text = escape(str(value).translate(_ILLEGAL_XML))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values: Iterable) -> bytes:
+    return ("<row>" + "".join(_xlsx_cell(v) for v in values) + "</row>").encode("utf-8")
+
+
+def xlsx_chunks(sheet: str, header: List[str], rows: Iterable[list]) -> Iterator[bytes]:
+    sink = _Chunks()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _XLSX_CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _XLSX_RELS)
+        archive.writestr("xl/workbook.xml", _XLSX_WORKBOOK.format(name=escape(sheet[:31])))
+        archive.writestr("xl/_rels/workbook.xml.rels", _XLSX_WORKBOOK_RELS)
+        archive.writestr("xl/styles.xml", _XLSX_STYLES)
+        with archive.open("xl/worksheets/sheet1.xml", "w") as worksheet:
+            worksheet.write(_XLSX_SHEET_HEAD.encode("utf-8"))
+            worksheet.write(_xlsx_row(header))
+            yield sink.take()
+            for row in rows:
+                worksheet.write(_xlsx_row(row))
+                if sink.size >= settings.EXPORT_CHUNK_SIZE:
+                    yield sink.take()
+            worksheet.write(_XLSX_SHEET_TAIL.encode("utf-8"))
+    yield sink.take()
+
+
+def encode(export: Export, fmt: str) -> Iterator[bytes]:
+    """The export as a stream of `fmt` ("csv" or "xlsx") chunks"""
+    if fmt == "xlsx":
+        return xlsx_chunks(export.sheet, export.header, export_rows(export))
+    return csv_chunks(export.header, export_rows(export))
@@ -0,0 +1,139 @@
+import asyncio
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from ai_services import ai_service
+from config import settings
+from crud import ITEM_LIST_COLUMNS
+from models import Item
+from services.search import ItemSearchService
+
+
+class FusedHit(NamedTuple):
+    sku: str
+    score: float
+    text_rank: Optional[int]
+    image_rank: Optional[int]
+
+
+def normalize_query(q: str) -> str:
+    """Cache key for a query: lowercase, without accents or extra spaces"""
+    folded = unicodedata.normalize("NFKD", q.lower())
+    folded = "".join(ch for ch in folded if not unicodedata.combining(ch))
+    return re.sub(r"\s+", " ", folded).strip()
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[str]], k: int
+) -> List[Tuple[str, float, List[Optional[int]]]]:
+    """
+    Sum 1 / (k + rank) over every ranking a SKU appears in.
+
+    Only positions are used, so BM25 scores and cosine distances never
+    have to be put on the same scale.
+    """
+    scores: Dict[str, float] = {}
+    ranks: Dict[str, List[Optional[int]]] = {}
+    for source, ranking in enumerate(rankings):
+        for rank, sku in enumerate(dict.fromkeys(ranking), start=1):
+            scores[sku] = scores.get(sku, 0.0) + 1.0 / (k + rank)
+            ranks.setdefault(sku, [None] * len(rankings))[source] = rank
+    fused = sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+    return [(sku, score, ranks[sku]) for sku, score in fused]
+
+
+class TTLCache:
+    """Small in-process LRU whose entries also expire after `ttl` seconds"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, object]]" = OrderedDict()
+
+    def get(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+
+_cache = TTLCache(settings.HYBRID_SEARCH_CACHE_SIZE, settings.HYBRID_SEARCH_CACHE_TTL)
+
+
+class HybridSearchService:
+    """
+    Customer-style queries ("vestido azul tamanho G") answered by both the
+    catalog full-text index and the gateway's CLIP image vectors, run
+    concurrently and merged with reciprocal rank fusion.
+
+    The fused SKU ranking is cached per normalized query; item rows are
+    always read fresh, so a sold or edited item never shows stale data.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    async def search(self, q: str, limit: int = 20, active: bool = True):
+        """(rows with fusion scores, whether the image ranking was available)"""
+        key = f"{active}:{normalize_query(q)}"
+        hits = _cache.get(key)
+        image_ok = True
+        if hits is None:
+            hits, image_ok = await self._rank(q, active)
+            if image_ok:
+                _cache.set(key, hits)
+        rows = await run_in_threadpool(self._rows, hits, active)
+        return rows[:limit], image_ok
+
+    async def _rank(self, q: str, active: bool) -> Tuple[List[FusedHit], bool]:
+        candidates = settings.HYBRID_SEARCH_CANDIDATES
+        text_hits, image = await asyncio.gather(
+            run_in_threadpool(ItemSearchService(self.db).search, q, candidates, active),
+            ai_service.search_by_text(q, top_k=candidates),
+        )
+        text_ranking = [hit.sku for hit in text_hits]
+        image_ranking = [
+            r["metadata"]["sku"] for r in image["results"] if (r.get("metadata") or {}).get("sku")
+        ]
+        fused = reciprocal_rank_fusion(
+            [text_ranking, image_ranking], settings.HYBRID_SEARCH_RRF_K
+        )
+        hits = [FusedHit(sku, score, *ranks) for sku, score, ranks in fused]
+        return hits, image["success"]
+
+    def _rows(self, hits: List[FusedHit], active: bool) -> List[dict]:
+        """List rows for the hits, in fused order, dropping items no longer listable"""
+        if not hits:
+            return []
+        rows = self.db.execute(
+            select(*ITEM_LIST_COLUMNS).where(
+                Item.sku.in_([hit.sku for hit in hits]), Item.active == active
+            )
+        ).all()
+        by_sku = {row.sku: row for row in rows}
+        return [
+            {**by_sku[hit.sku]._mapping, **hit._asdict()}
+            for hit in hits
+            if hit.sku in by_sku
+        ]
@@ -0,0 +1,215 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from ai_services import ai_service
+from config import settings
+from database import SessionLocal
+from models import IndexOutbox, Item
+
+logger = logging.getLogger(__name__)
+
+# Created by the running worker, in its event loop
+_wakeup: Optional[asyncio.Event] = None
+
+
+def wake_worker():
+    """Let the worker pick up a just-committed job without waiting for the next poll"""
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+async def _in_thread(func, *args):
+    # The worker closes its session once cancelled: a step already running in
+    # its thread finishes first instead of having the session closed under it
+    step = asyncio.ensure_future(asyncio.to_thread(func, *args))
+    try:
+        return await asyncio.shield(step)
+    except asyncio.CancelledError:
+        await asyncio.wait([step])
+        raise
+
+
+def index_metadata(item: Item) -> dict:
+    """Item fields the AI gateway stores next to the vector"""
+    fields = {
+        "consignor_id": item.consignor_id,
+        "category": item.category,
+        "brand": item.brand,
+        "size": item.size,
+        "condition": item.condition,
+        "list_price": item.list_price,
+    }
+    return {k: v for k, v in fields.items() if v is not None}
+
+
+class IndexOutboxService:
+    """
+    Durable queue of AI gateway jobs: vector indexing of new items and
+    sold-price reports of sales (and their withdrawal when a sale is deleted).
+
+    Jobs are added in the same transaction as the item or sale they come
+    from, so neither is saved without its job. The worker claims due jobs with a
+    lease (a conditional UPDATE on the attempt counter), so several backend
+    processes can run it and a crashed attempt is retried once the lease
+    expires.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def enqueue(self, item: Item, image_hashes: List[str]) -> IndexOutbox:
+        """Add an index job for the item to the current transaction (caller commits)"""
+        job = IndexOutbox(
+            item_sku=item.sku,
+            payload=json.dumps({"image_hashes": image_hashes, "metadata": index_metadata(item)}),
+            status="pending",
+            attempts=0,
+            next_attempt_at=datetime.utcnow(),
+        )
+        item.index_status = "pending"
+        self.db.add(job)
+        return job
+
+    def enqueue_sold(
+        self, sku: str, sale_price: float, days_on_hand: Optional[int], condition: Optional[str]
+    ) -> IndexOutbox:
+        """Add a sold-price report for the gateway to the current transaction (caller commits)"""
+        self._supersede_sale_reports(sku)
+        job = IndexOutbox(
+            item_sku=sku,
+            kind="sold",
+            payload=json.dumps(
+                {"sale_price": sale_price, "days_on_hand": days_on_hand, "condition": condition}
+            ),
+            status="pending",
+            attempts=0,
+            next_attempt_at=datetime.utcnow(),
+        )
+        self.db.add(job)
+        return job
+
+    def enqueue_unsold(self, sku: str) -> IndexOutbox:
+        """Withdraw the item's sold-price report (its sale was deleted; caller commits)"""
+        self._supersede_sale_reports(sku)
+        job = IndexOutbox(
+            item_sku=sku,
+            kind="unsold",
+            payload="{}",
+            status="pending",
+            attempts=0,
+            next_attempt_at=datetime.utcnow(),
+        )
+        self.db.add(job)
+        return job
+
+    def _supersede_sale_reports(self, sku: str):
+        # Only the latest report may reach the gateway: a retried older one
+        # would otherwise land after it and undo it
+        self.db.query(IndexOutbox).filter(
+            IndexOutbox.item_sku == sku,
+            IndexOutbox.kind.in_(("sold", "unsold")),
+            IndexOutbox.status == "pending",
+        ).update({"status": "superseded"}, synchronize_session=False)
+
+    def claim(self, limit: int = 10) -> List[IndexOutbox]:
+        """Due jobs this process now owns until the lease expires"""
+        now = datetime.utcnow()
+        due = (
+            self.db.query(IndexOutbox.id, IndexOutbox.attempts)
+            .filter(IndexOutbox.status == "pending", IndexOutbox.next_attempt_at <= now)
+            .order_by(IndexOutbox.id)
+            .limit(limit)
+            .all()
+        )
+        lease_until = now + timedelta(seconds=settings.INDEX_OUTBOX_LEASE)
+        claimed = []
+        for job_id, attempts in due:
+            result = self.db.execute(
+                update(IndexOutbox)
+                .where(IndexOutbox.id == job_id, IndexOutbox.attempts == attempts)
+                .values(next_attempt_at=lease_until, attempts=attempts + 1)
+            )
+            if result.rowcount == 1:
+                claimed.append(job_id)
+        self.db.commit()
+        if not claimed:
+            return []
+        return self.db.query(IndexOutbox).filter(IndexOutbox.id.in_(claimed)).all()
+
+    def complete(self, job: IndexOutbox):
+        job.status = "done"
+        job.last_error = None
+        if job.kind == "index":
+            self._set_item_status(job.item_sku, "indexed")
+        self.db.commit()
+
+    def fail(self, job: IndexOutbox, error: str):
+        """Schedule a retry with exponential backoff, or give up after the last attempt"""
+        job.last_error = error
+        if job.attempts >= settings.INDEX_OUTBOX_MAX_ATTEMPTS:
+            job.status = "failed"
+            if job.kind == "index":
+                self._set_item_status(job.item_sku, "failed")
+        else:
+            delay = settings.INDEX_OUTBOX_BACKOFF * 2 ** (job.attempts - 1)
+            job.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        self.db.commit()
+
+    def _set_item_status(self, sku: str, status: str):
+        self.db.query(Item).filter(Item.sku == sku).update({"index_status": status})
+
+    async def process(self, job: IndexOutbox):
+        payload = json.loads(job.payload)
+        if job.kind == "sold":
+            result = await ai_service.mark_sold(
+                job.item_sku, payload["sale_price"], payload["days_on_hand"], payload["condition"]
+            )
+        elif job.kind == "unsold":
+            result = await ai_service.mark_unsold(job.item_sku)
+        else:
+            result = await ai_service.index_item(
+                job.item_sku, payload["image_hashes"], payload["metadata"]
+            )
+        # Session work runs in a thread so the event loop keeps serving requests
+        if result.get("success"):
+            await _in_thread(self.complete, job)
+        else:
+            logger.warning(
+                f"Gateway {job.kind} job for {job.item_sku} failed "
+                f"(attempt {job.attempts}): {result.get('error')}"
+            )
+            await _in_thread(self.fail, job, result.get("error") or "unknown error")
+
+
+async def run_index_worker(poll_interval: Optional[float] = None):
+    """Process due index jobs until cancelled (started by the app lifespan)"""
+    global _wakeup
+    _wakeup = asyncio.Event()
+    poll_interval = poll_interval or settings.INDEX_OUTBOX_POLL_INTERVAL
+    while True:
+        _wakeup.clear()
+        jobs = []
+        db = SessionLocal()
+        try:
+            outbox = IndexOutboxService(db)
+            jobs = await _in_thread(outbox.claim)
+            for job in jobs:
+                await outbox.process(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Index worker error: {str(e)}")
+        finally:
+            db.close()
+
+        if not jobs:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
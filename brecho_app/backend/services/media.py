@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Iterable, Optional
+
+from PIL import Image, ImageOps, features
+
+from config import settings
+from services.blob_store import BlobStore, hash_from_url
+from models import Blob
+
+logger = logging.getLogger(__name__)
+
+MEDIA_DIR = os.path.join(settings.UPLOAD_DIR, "media")
+MEDIA_URL_PREFIX = "/media"
+
+# Longest side in pixels for each derivative
+SIZES = {"thumb": 320, "medium": 960, "full": 1920}
+
+# format -> (Pillow format, content type, save options)
+FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+if features.check("avif"):
+    FORMATS["avif"] = ("AVIF", "image/avif", {"quality": 60})
+
+DEFAULT_FORMAT = "webp"
+
+# Part of every derivative URL, ETag and file name. URLs are cached as
+# immutable, so bump this whenever SIZES or the FORMATS options change the bytes.
+MEDIA_VERSION = 1
+
+_executor: Optional[ProcessPoolExecutor] = None
+_pending: Dict[str, Future] = {}
+_pending_lock = threading.Lock()
+
+
+def _render(src_path: str, dst_path: str, max_side: int, fmt: str) -> str:
+    """Resize one original into one derivative (runs in a worker process)"""
+    pil_format, _, options = FORMATS[fmt]
+    with Image.open(src_path) as img:
+        img = ImageOps.exif_transpose(img)
+        has_alpha = "A" in img.getbands() and fmt != "jpeg"
+        img = img.convert("RGBA" if has_alpha else "RGB")
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+        tmp_path = f"{dst_path}.{uuid.uuid4().hex}.tmp"
+        img.save(tmp_path, pil_format, **options)
+    os.replace(tmp_path, dst_path)
+    return dst_path
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.MEDIA_WORKERS)
+    return _executor
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def derivative_path(blob_hash: str, size: str, fmt: str) -> str:
+    return os.path.join(MEDIA_DIR, blob_hash[:2], f"{blob_hash}_{size}.v{MEDIA_VERSION}.{fmt}")
+
+
+def _submit(blob: Blob, size: str, fmt: str) -> Future:
+    """Schedule a render, sharing the job with any request already waiting on it"""
+    dst_path = derivative_path(blob.hash, size, fmt)
+    with _pending_lock:
+        future = _pending.get(dst_path)
+        if future is None:
+            future = get_executor().submit(
+                _render, BlobStore.path_for(blob.hash, blob.ext), dst_path, SIZES[size], fmt
+            )
+            _pending[dst_path] = future
+            future.add_done_callback(lambda f, key=dst_path: _finished(key, f))
+    return future
+
+
+def _finished(key: str, future: Future):
+    with _pending_lock:
+        _pending.pop(key, None)
+    if not future.cancelled() and future.exception():
+        logger.error(f"Derivative {key} failed: {future.exception()}")
+
+
+async def ensure_derivative(blob: Blob, size: str, fmt: str = DEFAULT_FORMAT) -> str:
+    """Path of a derivative, rendering it on first request and caching it on disk"""
+    path = derivative_path(blob.hash, size, fmt)
+    if os.path.exists(path):
+        return path
+    return await asyncio.wrap_future(_submit(blob, size, fmt))
+
+
+def pregenerate(blobs: Iterable[Blob], fmt: str = DEFAULT_FORMAT):
+    """Render every size in the background so the first page view is already cached"""
+    for blob in blobs:
+        for size in SIZES:
+            if not os.path.exists(derivative_path(blob.hash, size, fmt)):
+                _submit(blob, size, fmt)
+
+
+def media_url(blob_hash: str, size: str, fmt: Optional[str] = None) -> str:
+    variant = f"{size}.{fmt}" if fmt else size
+    return f"{MEDIA_URL_PREFIX}/v{MEDIA_VERSION}/{blob_hash}/{variant}"
+
+
+def variant_urls(photo_url: str) -> Dict[str, str]:
+    """Derivative URLs for a stored photo; legacy uploads only have the original"""
+    blob_hash = hash_from_url(photo_url)
+    if blob_hash is None:
+        return {size: photo_url for size in [*SIZES, "original"]}
+    urls = {size: media_url(blob_hash, size, DEFAULT_FORMAT) for size in SIZES}
+    urls["original"] = photo_url
+    return urls
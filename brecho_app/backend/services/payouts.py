@@ -0,0 +1,157 @@
+"""
+Consignor settlement (repasse), replacing the Repasses sheet of the shop's
+spreadsheet kit.
+
+Closing a period claims every sale not yet settled up to its end date with
+one UPDATE, then builds the statements from one GROUP BY over the claimed
+sales joined to items and consignors. Each sale is settled exactly once,
+so a month-end close only touches that month's new sales; a sale recorded
+late with a date inside a closed period is picked up by the next close.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session, selectinload
+
+from models import Consignor, Item, PayoutPeriod, PayoutStatement, Sale
+
+# Share used for consignors without a percent (as the spreadsheet's IFERROR default)
+DEFAULT_PERCENT = 0.5
+
+
+class PayoutError(ValueError):
+    """A period cannot be closed or a statement changed as requested"""
+
+
+def end_of_day(day: date) -> datetime:
+    """Exclusive upper bound for sales dated on or before `day`"""
+    return datetime.combine(day + timedelta(days=1), time.min)
+
+
+def sale_consignor():
+    # Sales recorded without a consignor belong to the item's consignor
+    return func.coalesce(Sale.consignor_id, Item.consignor_id)
+
+
+def _statement_columns(statement: dict) -> dict:
+    return {k: v for k, v in statement.items() if k != "consignor_name"}
+
+
+class PayoutService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def last_period(self) -> Optional[PayoutPeriod]:
+        return self.db.execute(
+            select(PayoutPeriod).order_by(PayoutPeriod.end_date.desc()).limit(1)
+        ).scalar_one_or_none()
+
+    def _aggregate(self, sales_filter) -> List[dict]:
+        """Statement values per consignor for the sales matching `sales_filter`"""
+        consignor_id = sale_consignor()
+        rows = self.db.execute(
+            select(
+                consignor_id.label("consignor_id"),
+                Consignor.name.label("consignor_name"),
+                Consignor.pix_key,
+                func.coalesce(Consignor.percent, DEFAULT_PERCENT).label("percent"),
+                func.count(Sale.id).label("items_sold"),
+                func.coalesce(func.sum(Sale.sale_price), 0).label("net_sales"),
+            )
+            .select_from(Sale)
+            .outerjoin(Item, Item.sku == Sale.sku)
+            .join(Consignor, Consignor.id == consignor_id)
+            .where(sales_filter)
+            .group_by(consignor_id, Consignor.name, Consignor.pix_key, Consignor.percent)
+            .order_by(consignor_id)
+        ).all()
+
+        statements = []
+        for row in rows:
+            net_sales = round(float(row.net_sales), 2)
+            consignor_amount = round(net_sales * row.percent, 2)
+            statements.append({
+                "consignor_id": row.consignor_id,
+                "consignor_name": row.consignor_name,
+                "pix_key": row.pix_key,
+                "items_sold": row.items_sold,
+                "net_sales": net_sales,
+                "percent": row.percent,
+                "consignor_amount": consignor_amount,
+                "store_amount": round(net_sales - consignor_amount, 2),
+            })
+        return statements
+
+    def preview(self, end_date: date) -> List[dict]:
+        """What closing a period at `end_date` would settle, without writing"""
+        return self._aggregate(
+            Sale.payout_period_id.is_(None) & (Sale.date < end_of_day(end_date))
+        )
+
+    def close(self, end_date: date) -> PayoutPeriod:
+        """Settle every unsettled sale dated up to `end_date` into a new period"""
+        last = self.last_period()
+        if last is not None and end_date <= last.end_date:
+            raise PayoutError(f"Period already closed up to {last.end_date.isoformat()}")
+
+        period = PayoutPeriod(
+            start_date=last.end_date + timedelta(days=1) if last else None,
+            end_date=end_date,
+        )
+        self.db.add(period)
+        self.db.flush()
+
+        self.db.execute(
+            update(Sale)
+            .where(Sale.payout_period_id.is_(None), Sale.date < end_of_day(end_date))
+            .values(payout_period_id=period.id)
+            .execution_options(synchronize_session=False)
+        )
+        statements = self._aggregate(Sale.payout_period_id == period.id)
+        if statements:
+            self.db.execute(
+                insert(PayoutStatement),
+                [
+                    {"period_id": period.id, **_statement_columns(statement)}
+                    for statement in statements
+                ],
+            )
+        self.db.commit()
+        return self.get_period(period.id)
+
+    def get_period(self, period_id: int) -> Optional[PayoutPeriod]:
+        return self.db.execute(
+            select(PayoutPeriod)
+            .options(selectinload(PayoutPeriod.statements).selectinload(PayoutStatement.consignor))
+            .where(PayoutPeriod.id == period_id)
+        ).scalar_one_or_none()
+
+    def list_periods(self, skip: int = 0, limit: int = 24) -> List[PayoutPeriod]:
+        return self.db.execute(
+            select(PayoutPeriod).order_by(PayoutPeriod.end_date.desc()).offset(skip).limit(limit)
+        ).scalars().all()
+
+    def period_sales(self, period_id: int, consignor_id: Optional[str] = None) -> List[Sale]:
+        """Sales settled in a period, e.g. to send a consignor their sold items"""
+        query = (
+            select(Sale)
+            .outerjoin(Item, Item.sku == Sale.sku)
+            .where(Sale.payout_period_id == period_id)
+            .order_by(Sale.date)
+        )
+        if consignor_id:
+            query = query.where(sale_consignor() == consignor_id)
+        return self.db.execute(query).scalars().all()
+
+    def mark_paid(self, statement_id: int) -> Optional[PayoutStatement]:
+        statement = self.db.get(PayoutStatement, statement_id)
+        if statement is None:
+            return None
+        if statement.status != "pago":
+            statement.status = "pago"
+            statement.paid_at = datetime.now()
+            self.db.commit()
+            self.db.refresh(statement)
+        return statement
+
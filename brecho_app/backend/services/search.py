@@ -0,0 +1,74 @@
+import re
+from typing import List
+
+from sqlalchemy import column, literal_column, or_, select, table, text
+from sqlalchemy.orm import Session
+
+from crud import ITEM_LIST_COLUMNS
+from migrations import ITEMS_FTS_COLUMNS, rebuild_items_fts
+from models import Item, ItemDynamicField
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+items_fts = table("items_fts", column("rowid"))
+
+
+def fts_query(q: str) -> str:
+    """
+    FTS5 MATCH expression for free text: every word must match, as a
+    prefix, so operators and quotes typed by staff are never parsed.
+    """
+    return " ".join(f'"{token}"*' for token in _TOKEN.findall(q))
+
+
+class ItemSearchService:
+    """
+    Catalog text search ranked by BM25 over the items_fts table created in
+    migrations (kept in sync by triggers). Databases without FTS5 fall back
+    to unranked LIKE matching.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def search(self, q: str, limit: int = 20, active: bool = True) -> List:
+        match = fts_query(q)
+        if not match:
+            return []
+        if self.db.get_bind().dialect.name != "sqlite":
+            return self._search_like(q, limit, active)
+
+        # rank uses the column weights configured on the table
+        query = (
+            select(*ITEM_LIST_COLUMNS, literal_column("items_fts.rank").label("score"))
+            .select_from(items_fts)
+            .join(Item.__table__, literal_column("items.rowid") == items_fts.c.rowid)
+            .where(text("items_fts MATCH :match").bindparams(match=match))
+            .where(Item.active == active)
+            .order_by(literal_column("items_fts.rank"))
+            .limit(limit)
+        )
+        return self.db.execute(query).all()
+
+    def _search_like(self, q: str, limit: int, active: bool) -> List:
+        query = select(*ITEM_LIST_COLUMNS, literal_column("0.0").label("score")).where(
+            Item.active == active
+        )
+        for token in _TOKEN.findall(q):
+            pattern = f"%{token}%"
+            query = query.where(
+                or_(
+                    *(getattr(Item, name).ilike(pattern) for name in ITEMS_FTS_COLUMNS),
+                    Item.sku.in_(
+                        select(ItemDynamicField.item_sku).where(
+                            ItemDynamicField.field_value.ilike(pattern)
+                        )
+                    ),
+                )
+            )
+        return self.db.execute(query.order_by(Item.created_at.desc()).limit(limit)).all()
+
+    def rebuild(self):
+        """Refill the index, e.g. after VACUUM renumbered item rowids"""
+        rebuild_items_fts(self.db.connection())
+        self.db.commit()
@@ -0,0 +1,246 @@
+"""
+Dashboard counters kept in the stats_counters table.
+
+Every flush that adds, changes or deletes an Item or Sale adds its delta
+to the affected counters in the same transaction, so reading the
+dashboard is a lookup of a few dozen rows. A background task recomputes
+them from the base tables now and then, which also fixes drift from writes
+that bypass the ORM (raw SQL, bulk updates).
+"""
+import asyncio
+import logging
+from collections import Counter
+from typing import Dict, Optional
+
+from sqlalchemy import case, delete, event, func, inspect, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from models import Item, Sale, StatsCounter
+
+logger = logging.getLogger(__name__)
+
+
+def _item_counts(active, sold_at, category) -> Counter:
+    active = active is not False  # Item.active defaults to True
+    available = active and sold_at is None
+    counts = Counter(
+        {"items.active": active, "items.sold": sold_at is not None, "items.available": available}
+    )
+    if category:
+        counts[f"category.{category}.active"] += active
+        counts[f"category.{category}.available"] += available
+    return counts
+
+
+def _sale_counts(sale_price, channel) -> Counter:
+    channel = channel or "sem canal"
+    return Counter({
+        "sales.count": 1,
+        "sales.revenue": sale_price or 0,
+        f"channel.{channel}.count": 1,
+        f"channel.{channel}.revenue": sale_price or 0,
+    })
+
+
+# Counted columns of each tracked model and the function turning them into counts
+_TRACKED = {
+    Item: (("active", "sold_at", "category"), _item_counts),
+    Sale: (("sale_price", "channel"), _sale_counts),
+}
+
+
+def _values(obj, columns, previous: bool):
+    """Column values as this flush will write them, or as they were before"""
+    state = inspect(obj)
+    values = []
+    for name in columns:
+        history = state.attrs[name].history
+        if previous and history.has_changes():
+            values.append(history.deleted[0] if history.deleted else None)
+        else:
+            values.append(getattr(obj, name))
+    return values
+
+
+def _keep_previous_values(model, columns):
+    # Load the old value when an expired column is assigned, so deltas can subtract it
+    for name in columns:
+        event.listen(getattr(model, name), "set", lambda *args: None, active_history=True)
+
+
+for _model, (_columns, _) in _TRACKED.items():
+    _keep_previous_values(_model, _columns)
+
+
+def _flush_deltas(session: Session) -> Counter:
+    deltas = Counter()
+    for obj in session.new:
+        if type(obj) in _TRACKED:
+            columns, counts = _TRACKED[type(obj)]
+            deltas.update(counts(*_values(obj, columns, previous=False)))
+    for obj in session.deleted:
+        if type(obj) in _TRACKED:
+            columns, counts = _TRACKED[type(obj)]
+            deltas.subtract(counts(*_values(obj, columns, previous=True)))
+    for obj in session.dirty:
+        if type(obj) in _TRACKED and session.is_modified(obj):
+            columns, counts = _TRACKED[type(obj)]
+            deltas.update(counts(*_values(obj, columns, previous=False)))
+            deltas.subtract(counts(*_values(obj, columns, previous=True)))
+    return Counter({name: value for name, value in deltas.items() if value})
+
+
+def _upsert(dialect_name: str):
+    if dialect_name == "postgresql":
+        return pg_insert(StatsCounter)
+    return sqlite_insert(StatsCounter)
+
+
+def add_to_counters(conn: Connection, deltas: Counter):
+    """Add deltas to the counters within the transaction of `conn`"""
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not deltas:
+        return
+    stmt = _upsert(conn.dialect.name)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[StatsCounter.name],
+        set_={"value": StatsCounter.value + stmt.excluded.value, "updated_at": func.now()},
+    )
+    conn.execute(stmt, [{"name": name, "value": float(value)} for name, value in deltas.items()])
+
+
+def item_deltas(before: tuple, after: tuple) -> Counter:
+    """
+    Counter changes for an item whose (active, sold_at, category) went from
+    `before` to `after`, for writes made with UPDATE statements instead of
+    the ORM.
+    """
+    deltas = _item_counts(*after)
+    deltas.subtract(_item_counts(*before))
+    return deltas
+
+
+@event.listens_for(Session, "before_flush")
+def _track_counters(session: Session, flush_context, instances):
+    add_to_counters(session.connection(), _flush_deltas(session))
+
+
+def dashboard_stats(counters: Dict[str, float], recent_sales) -> dict:
+    """Dashboard payload from the counter rows"""
+    by_category: Dict[str, Dict[str, int]] = {}
+    by_channel: Dict[str, Dict[str, float]] = {}
+    for name, value in counters.items():
+        group, _, field = name.rpartition(".")
+        kind, _, key = group.partition(".")
+        if kind == "category":
+            by_category.setdefault(key, {"active": 0, "available": 0})[field] = int(value)
+        elif kind == "channel":
+            group = by_channel.setdefault(key, {"count": 0, "revenue": 0.0})
+            group[field] = int(value) if field == "count" else float(value)
+
+    return {
+        "total_items": int(counters.get("items.active", 0)),
+        "total_sold": int(counters.get("items.sold", 0)),
+        "total_available": int(counters.get("items.available", 0)),
+        "total_sales_value": float(counters.get("sales.revenue", 0)),
+        # Groups whose items/sales were all removed keep zeroed counters until reconciled
+        "by_category": {k: v for k, v in by_category.items() if any(v.values())},
+        "by_channel": {k: v for k, v in by_channel.items() if any(v.values())},
+        "recent_sales": recent_sales,
+    }
+
+
+class StatsService:
+    """Reads and reconciles the incrementally maintained dashboard counters"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def counters(self) -> Dict[str, float]:
+        return dict(self.db.execute(select(StatsCounter.name, StatsCounter.value)).all())
+
+    def compute(self) -> Counter:
+        """Counter values recomputed from the items and sales tables"""
+        totals = Counter()
+        active = Item.active.isnot(False)
+        available = active & Item.sold_at.is_(None)
+        items = self.db.execute(
+            select(
+                Item.category,
+                func.count(case((active, 1))),
+                func.count(Item.sold_at),
+                func.count(case((available, 1))),
+            ).group_by(Item.category)
+        )
+        for category, n_active, n_sold, n_available in items:
+            totals.update(
+                {"items.active": n_active, "items.sold": n_sold, "items.available": n_available}
+            )
+            if category:
+                totals.update({
+                    f"category.{category}.active": n_active,
+                    f"category.{category}.available": n_available,
+                })
+
+        sales = self.db.execute(
+            select(Sale.channel, func.count(), func.coalesce(func.sum(Sale.sale_price), 0))
+            .group_by(Sale.channel)
+        )
+        for channel, count, revenue in sales:
+            channel = channel or "sem canal"
+            totals.update({
+                "sales.count": count,
+                "sales.revenue": revenue,
+                f"channel.{channel}.count": count,
+                f"channel.{channel}.revenue": revenue,
+            })
+        return Counter({name: value for name, value in totals.items() if value})
+
+    def reconcile(self) -> Dict[str, float]:
+        """Replace the counters with recomputed values; returns the drift found"""
+        expected = self.compute()
+        current = self.counters()
+        drift = {
+            name: expected.get(name, 0) - current.get(name, 0)
+            for name in set(expected) | set(current)
+            if abs(expected.get(name, 0) - current.get(name, 0)) > 1e-6
+        }
+        if drift:
+            self.db.execute(delete(StatsCounter))
+            if expected:
+                self.db.execute(
+                    insert(StatsCounter),
+                    [{"name": name, "value": float(value)} for name, value in expected.items()],
+                )
+        self.db.commit()
+        return drift
+
+
+def _reconcile_job() -> Dict[str, float]:
+    # The session lives in the worker thread: cancelling the loop at shutdown
+    # must not close it while reconcile is still using it
+    db = SessionLocal()
+    try:
+        return StatsService(db).reconcile()
+    finally:
+        db.close()
+
+
+async def run_stats_reconciler(interval: Optional[float] = None):
+    """Reconcile at startup and then every STATS_RECONCILE_INTERVAL seconds"""
+    interval = interval or settings.STATS_RECONCILE_INTERVAL
+    while True:
+        try:
+            drift = await asyncio.to_thread(_reconcile_job)
+            if drift:
+                logger.warning(f"Dashboard counters drifted, corrected: {drift}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Stats reconciliation error: {str(e)}")
+        await asyncio.sleep(interval)
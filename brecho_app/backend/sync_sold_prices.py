@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Script para enviar ao AI Gateway os preços de venda já registrados,
+alimentando a precificação por vizinhos com o histórico existente.
+"""
+
+import asyncio
+import sys
+import os
+
+# Adicionar o diretório do backend ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import SessionLocal
+from models import Item
+from ai_services import ai_service
+
+
+async def sync_sold_prices():
+    """Envia sale_price, days_on_hand e condition de todos os itens vendidos"""
+
+    db = SessionLocal()
+    try:
+        sold_items = (
+            db.query(Item.sku, Item.sale_price, Item.days_on_hand, Item.condition)
+            .filter(Item.sold_at.isnot(None), Item.sale_price.isnot(None))
+            .all()
+        )
+        print(f"🔄 Sincronizando {len(sold_items)} itens vendidos com o AI Gateway...")
+
+        synced = 0
+        for sku, sale_price, days_on_hand, condition in sold_items:
+            result = await ai_service.mark_sold(sku, sale_price, days_on_hand, condition)
+            if result.get("success"):
+                synced += 1
+
+        print(f"✅ {synced} de {len(sold_items)} itens sincronizados")
+        if synced < len(sold_items):
+            print("⚠️  Itens não sincronizados provavelmente não estão indexados no gateway")
+    finally:
+        db.close()
+        await ai_service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(sync_sold_prices())
@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from ai_services import AIGatewayService, GatewayUnavailableError
+from config import settings
+
+
+def gateway(monkeypatch, status_code=200, delay=0.0):
+    """Service whose gateway answers every POST with `status_code`, and its call log"""
+    monkeypatch.setattr(settings, "AI_GATEWAY_BACKOFF", 0.0)
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.path)
+        await asyncio.sleep(delay)
+        return httpx.Response(status_code, json={})
+
+    service = AIGatewayService()
+    service._client = httpx.AsyncClient(
+        base_url="http://gateway", transport=httpx.MockTransport(handler)
+    )
+    return service, calls
+
+
+def cooled_down(service):
+    breaker = service.breaker
+    breaker.failures = breaker.failure_threshold
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout - 1
+    assert breaker.state == "half-open"
+
+
+async def post_concurrently(service, n):
+    return await asyncio.gather(
+        *(service._post("sold", data={"sku": str(i)}) for i in range(n)),
+        return_exceptions=True,
+    )
+
+
+def test_half_open_lets_one_probe_through(monkeypatch):
+    service, calls = gateway(monkeypatch, delay=0.05)
+    cooled_down(service)
+
+    results = asyncio.run(post_concurrently(service, 10))
+
+    assert len(calls) == 1
+    assert sum(isinstance(r, httpx.Response) for r in results) == 1
+    assert sum(isinstance(r, GatewayUnavailableError) for r in results) == 9
+    assert service.breaker.state == "closed"
+
+
+def test_failed_probe_reopens_the_circuit(monkeypatch):
+    service, calls = gateway(monkeypatch, status_code=500, delay=0.05)
+    cooled_down(service)
+
+    results = asyncio.run(post_concurrently(service, 10))
+
+    assert len(calls) == 1
+    assert sum(isinstance(r, httpx.HTTPStatusError) for r in results) == 1
+    assert service.breaker.state == "open"
+    assert not service.breaker.probing
+
+
+def test_probe_without_verdict_frees_the_slot(monkeypatch):
+    service, calls = gateway(monkeypatch, status_code=404)
+    cooled_down(service)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(service._post("sold", data={"sku": "X"}))
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(service._post("sold", data={"sku": "X"}))
+
+    assert len(calls) == 2
+    assert service.breaker.state == "half-open"
+
+
+def test_server_errors_trip_the_breaker(monkeypatch):
+    service, calls = gateway(monkeypatch, status_code=500)
+    threshold = service.breaker.failure_threshold
+
+    for _ in range(threshold):
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(service._post("sold", data={"sku": "X"}))
+    with pytest.raises(GatewayUnavailableError):
+        asyncio.run(service._post("sold", data={"sku": "X"}))
+
+    assert len(calls) == threshold
+    assert service.breaker.state == "open"
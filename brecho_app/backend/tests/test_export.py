@@ -0,0 +1,21 @@
+import io
+import math
+import zipfile
+
+import openpyxl
+
+from services.export import xlsx_chunks
+
+
+def test_xlsx_non_finite_floats_are_empty_cells():
+    rows = [["A1", math.nan, 1.5], ["A2", math.inf, -math.inf]]
+    data = b"".join(xlsx_chunks("Itens", ["SKU", "Preço", "Custo"], rows))
+
+    sheet_xml = zipfile.ZipFile(io.BytesIO(data)).read("xl/worksheets/sheet1.xml").decode()
+    assert "nan" not in sheet_xml and "inf" not in sheet_xml
+
+    sheet = openpyxl.load_workbook(io.BytesIO(data)).active
+    assert [list(row) for row in sheet.iter_rows(min_row=2, values_only=True)] == [
+        ["A1", None, 1.5],
+        ["A2", None, None],
+    ]
@@ -99,19 +99,6 @@ const AIIntake: React.FC = () => {
         multiple: true,
     });
 
-    const convertToBase64 = (file: File): Promise<string> => {
-        return new Promise((resolve, reject) => {
-            const reader = new FileReader();
-            reader.readAsDataURL(file);
-            reader.onload = () => {
-                const result = reader.result as string;
-                // Remove data URL prefix to get just base64
-                resolve(result.split(',')[1]);
-            };
-            reader.onerror = error => reject(error);
-        });
-    };
-
     // Audio recording functions
     const startRecording = async () => {
         try {
@@ -201,17 +188,7 @@ const AIIntake: React.FC = () => {
         setError(null);
 
         try {
-            const base64Images = await Promise.all(
-                selectedFiles.map(file => convertToBase64(file))
-            );
-
-            // Convert audio to base64 if present
-            let audioBase64: string | undefined = undefined;
-            if (audioBlob) {
-                audioBase64 = await convertToBase64(audioBlob as any);
-            }
-
-            const response = await aiAPI.intakeAutoregister(base64Images, audioBase64);
+            const response = await aiAPI.intakeUpload(selectedFiles, audioBlob || undefined);
             setAiResponse(response);
 
             // Inicializar dados editáveis de forma DINÂMICA
@@ -692,11 +669,7 @@ const AIIntake: React.FC = () => {
     // Load dynamic fields when category changes
     const loadDynamicFields = async (category: string, subcategory?: string, brand?: string) => {
         try {
-            const base64Images = await Promise.all(
-                selectedFiles.map(file => convertToBase64(file))
-            );
-
-            const response = await aiAPI.getDynamicFields(category, subcategory, brand, base64Images);
+            const response = await aiAPI.getDynamicFields(category, subcategory, brand, aiResponse?.image_hashes);
             if (response.success) {
                 setDynamicFields(response.fields || []);
                 setDynamicFieldsValues({}); // Reset values
@@ -793,10 +766,6 @@ const AIIntake: React.FC = () => {
         }
 
         try {
-            const base64Images = await Promise.all(
-                selectedFiles.map(file => convertToBase64(file))
-            );
-
             // Adicionar consignante e campos dinâmicos à proposta
             const proposalWithConsignor = {
                 ...aiResponse.proposal,
@@ -812,7 +781,7 @@ const AIIntake: React.FC = () => {
             await aiAPI.confirmIntake(
                 aiResponse.proposal.sku,
                 proposalWithConsignor,
-                base64Images
+                aiResponse.image_hashes || []  // Fotos já gravadas no servidor durante a análise
             );
 
             // Reset form
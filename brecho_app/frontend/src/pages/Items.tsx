@@ -120,6 +120,7 @@ interface Item {
     location?: string;
     description?: string;
     photos?: string[] | string;
+    photo_variants?: Array<{ thumb: string; medium: string; full: string; original: string }>;
     flaws?: string;
     bust?: number;
     waist?: number;
@@ -373,6 +374,14 @@ const ItemsPage: React.FC = () => {
         return result;
     };
 
+    // Resized WebP derivatives when the backend has them, otherwise the original photos
+    const getPhotoVariantUrls = (item: Item, size: 'thumb' | 'medium' | 'full'): string[] => {
+        if (item.photo_variants && item.photo_variants.length > 0) {
+            return item.photo_variants.map(variant => getImageUrl(variant[size]));
+        }
+        return getNormalizedPhotosWithUrls(item.photos);
+    };
+
     // Helper function to get item display title
     const getItemTitle = (item: Item): string => {
         return item.title_ig || item.name || `Item ${item.sku}` || 'Sem título';
@@ -465,14 +474,22 @@ const ItemsPage: React.FC = () => {
 
     const handleImageClick = (photos: string[], index = 0) => {
         if (photos && photos.length > 0) {
-            setSelectedItem({ ...selectedItem!, photos });
+            setSelectedItem({ ...selectedItem!, photos, photo_variants: undefined });
             setCurrentImageIndex(index);
             setImageViewerOpen(true);
         }
     };
 
-    const handleEditItem = (item: Item) => {
-        console.log('✏️ Abrindo modal de edição para item:', item.sku);
+    const handleEditItem = async (listItem: Item) => {
+        console.log('✏️ Abrindo modal de edição para item:', listItem.sku);
+        // The list only carries summary columns; load every field before editing
+        let item = listItem;
+        try {
+            const response = await api.get(`/items/${listItem.sku}`);
+            item = { ...listItem, ...response.data };
+        } catch (error) {
+            console.error('Erro ao carregar item:', error);
+        }
         setEditingItem(item);
         setEditFormData({
             name: item.name || '',
@@ -972,9 +989,9 @@ const ItemsPage: React.FC = () => {
                                             >
                                                 <TableCell onClick={() => handleViewItem(item)}>
                                                     <PhotoDisplay
-                                                        photos={getNormalizedPhotosWithUrls(item.photos)}
+                                                        photos={getPhotoVariantUrls(item, 'thumb')}
                                                         alt={getItemTitle(item)}
-                                                        onClick={() => handleImageClick(getNormalizedPhotosWithUrls(item.photos))}
+                                                        onClick={() => handleImageClick(getPhotoVariantUrls(item, 'full'))}
                                                     />
                                                 </TableCell>
 
@@ -1113,7 +1130,7 @@ const ItemsPage: React.FC = () => {
                                             overflow: 'hidden',
                                             cursor: 'pointer'
                                         }}
-                                        onClick={() => handleImageClick(getNormalizedPhotosWithUrls(item.photos))}
+                                        onClick={() => handleImageClick(getPhotoVariantUrls(item, 'full'))}
                                     >
                                         {(() => {
                                             // Debug logging for magic cube
@@ -1128,7 +1145,7 @@ const ItemsPage: React.FC = () => {
                                         {getNormalizedPhotosWithUrls(item.photos).length > 0 ? (
                                             <Box
                                                 component="img"
-                                                src={getNormalizedPhotosWithUrls(item.photos)[0] || DEFAULT_PLACEHOLDER}
+                                                src={getPhotoVariantUrls(item, 'thumb')[0] || DEFAULT_PLACEHOLDER}
                                                 alt={getItemTitle(item)}
                                                 sx={{
                                                     width: '100%',
@@ -1351,7 +1368,7 @@ const ItemsPage: React.FC = () => {
                                             <Box>
                                                 <Box
                                                     component="img"
-                                                    src={getNormalizedPhotosWithUrls(selectedItem.photos)[0] || DEFAULT_PLACEHOLDER}
+                                                    src={getPhotoVariantUrls(selectedItem, 'medium')[0] || DEFAULT_PLACEHOLDER}
                                                     alt="Foto principal"
                                                     onError={(e) => {
                                                         const target = e.target as HTMLImageElement;
@@ -1390,7 +1407,7 @@ const ItemsPage: React.FC = () => {
 
                                                 {getNormalizedPhotosWithUrls(selectedItem.photos).length > 1 && (
                                                     <Stack direction="row" spacing={1} sx={{ mt: 2 }} flexWrap="wrap">
-                                                        {getNormalizedPhotosWithUrls(selectedItem.photos).slice(1, 5).map((photo: string, index: number) => (
+                                                        {getPhotoVariantUrls(selectedItem, 'thumb').slice(1, 5).map((photo: string, index: number) => (
                                                             <Box
                                                                 key={index + 1}
                                                                 component="img"
@@ -1406,7 +1423,7 @@ const ItemsPage: React.FC = () => {
                                                                     '&:hover': { borderColor: 'primary.main' },
                                                                     transition: 'all 0.2s'
                                                                 }}
-                                                                onClick={() => handleImageClick(getNormalizedPhotosWithUrls(selectedItem.photos), index + 1)}
+                                                                onClick={() => handleImageClick(getPhotoVariantUrls(selectedItem, 'full'), index + 1)}
                                                             />
                                                         ))}
                                                         {getNormalizedPhotosWithUrls(selectedItem.photos).length > 5 && (
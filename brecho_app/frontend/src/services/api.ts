@@ -61,6 +61,19 @@ export interface Item {
     updated_at: string;
 }
 
+// Row of GET /items/: summary columns only, the rest comes from getById
+export type ItemListEntry = Pick<
+    Item,
+    | 'sku' | 'consignor_id' | 'category' | 'subcategory' | 'brand' | 'size' | 'color' | 'condition'
+    | 'title_ig' | 'summary_title' | 'list_price' | 'markdown_stage' | 'photos' | 'active'
+    | 'sold_at' | 'acquired_at' | 'created_at'
+> & { photo_variants?: Array<Record<string, string>>; index_status?: string };
+
+export interface ItemDetail extends Item {
+    consignor?: Consignor;
+    dynamic_fields: Array<{ field_name: string; field_value?: string; field_type: string }>;
+}
+
 export interface Sale {
     id: string;
     sku: string;
@@ -117,6 +130,7 @@ export interface AIIntakeResponse {
     }>;
     success: boolean;
     message?: string;
+    image_hashes?: string[];
 }
 
 // API functions
@@ -152,12 +166,33 @@ export const itemAPI = {
         consignor_id?: string;
         category?: string;
         active?: boolean;
-    }): Promise<Item[]> => {
+    }): Promise<ItemListEntry[]> => {
+        const response = await api.get('/items/', { params });
+        return response.data;
+    },
+
+    // Keyset pagination: pass nextCursor back as cursor; null on the last page
+    getPage: async (params?: {
+        limit?: number;
+        cursor?: string;
+        consignor_id?: string;
+        category?: string;
+        active?: boolean;
+    }): Promise<{ items: ItemListEntry[]; nextCursor: string | null }> => {
         const response = await api.get('/items/', { params });
+        return { items: response.data, nextCursor: response.headers['x-next-cursor'] ?? null };
+    },
+
+    // Full-text + photo search fused into one ranking
+    hybridSearch: async (q: string, limit = 20): Promise<{
+        results: Array<ItemListEntry & { score: number; text_rank?: number; image_rank?: number }>;
+        image_search: boolean;
+    }> => {
+        const response = await api.get('/items/hybrid-search', { params: { q, limit } });
         return response.data;
     },
 
-    getById: async (sku: string): Promise<Item> => {
+    getById: async (sku: string): Promise<ItemDetail> => {
         const response = await api.get(`/items/${sku}`);
         return response.data;
     },
@@ -178,6 +213,19 @@ export const saleAPI = {
         const response = await api.post('/sales/', sale);
         return response.data;
     },
+
+    checkout: async (checkout: {
+        items: { sku: string; sale_price: number; discount_value?: number }[];
+        date?: string;
+        channel?: string;
+        customer_name?: string;
+        customer_whatsapp?: string;
+        payment_method?: string;
+        notes?: string;
+    }): Promise<{ sales: Sale[]; total: number }> => {
+        const response = await api.post('/sales/checkout', checkout);
+        return response.data;
+    },
 };
 
 export const aiAPI = {
@@ -197,21 +245,34 @@ export const aiAPI = {
         return response.data;
     },
 
-    confirmIntake: async (sku: string, proposal: any, images: string[]) => {
+    // Binary multipart upload: no base64 inflation, streamed through to the AI gateway
+    intakeUpload: async (images: File[], audio?: Blob): Promise<AIIntakeResponse> => {
+        const form = new FormData();
+        images.forEach(image => form.append('images', image, image.name));
+        if (audio) {
+            form.append('audio', audio, 'audio.webm');
+        }
+        const response = await api.post('/ai/intake/upload', form, {
+            headers: { 'Content-Type': 'multipart/form-data' },
+        });
+        return response.data;
+    },
+
+    confirmIntake: async (sku: string, proposal: any, imageHashes: string[]) => {
         const response = await api.post('/ai/confirm-intake', {
             sku,
             proposal,
-            images,
+            image_hashes: imageHashes,
         });
         return response.data;
     },
 
-    getDynamicFields: async (category: string, subcategory?: string, brand?: string, images?: string[]) => {
+    getDynamicFields: async (category: string, subcategory?: string, brand?: string, imageHashes?: string[]) => {
         const response = await api.post('/ai/dynamic-fields', {
             category,
             subcategory,
             brand,
-            images,
+            image_hashes: imageHashes,
         });
         return response.data;
     },